@@ -0,0 +1,88 @@
+"""
+Helpers shared by the benchmarks, every benchmark prints (or writes)
+its results as JSON so they can be compared between runs.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+
+
+def measure(function, *, min_time: float = 0.2, repeat: int = 5) -> dict:
+    """Call function in a loop, report the best of repeat runs."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append(time.perf_counter() - start)
+
+    return summarize(min(timings), number)
+
+
+async def measure_async(coroutine_function, *, number: int = 1) -> dict:
+    """Await coroutine_function number times, report per call timing."""
+    start = time.perf_counter()
+    for _ in range(number):
+        await coroutine_function()
+    return summarize(time.perf_counter() - start, number)
+
+
+def summarize(elapsed: float, number: int) -> dict:
+    return {
+        "calls": number,
+        "seconds": elapsed,
+        "ops_per_sec": number / elapsed if elapsed else None,
+        "usec_per_op": elapsed / number * 1e6,
+    }
+
+
+def percentiles(samples, points=(50, 95, 99)) -> dict:
+    if not samples:
+        return {f"p{point}": None for point in points}
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, int(round(point / 100 * (len(ordered) - 1))))
+        result[f"p{point}"] = ordered[index]
+    return result
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-o", "--output", help="write JSON results to this file instead of stdout"
+    )
+    return parser
+
+
+def write_results(name: str, results, output: str = None):
+    document = {
+        "benchmark": name,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
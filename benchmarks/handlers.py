@@ -0,0 +1,227 @@
+"""
+Discovery, issue listing, ApplicationHandler and process_application
+against a BasicStorage and a local PDS, with the catalog and the
+issue list seeded to each of the given sizes.
+
+    python -m benchmarks.handlers -o bench_handlers.json
+    python -m benchmarks.handlers --sizes 10 1000 --pds sqlite --pds-latency 0.005
+"""
+import json
+import uuid
+
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.connections.models.connection_record import ConnectionRecord
+from aries_cloudagent.issuer.base import BaseIssuer
+from aries_cloudagent.messaging.responder import MockResponder
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from aries_cloudagent.wallet.base import BaseWallet
+from aries_cloudagent.wallet.basic import BasicWallet
+from asynctest import mock as async_mock
+
+from services.catalog.cache import CATALOG_CACHE
+from services.consents.models.defined_consent import DefinedConsentRecord
+from services.discovery.handlers import DiscoveryHandler
+from services.discovery.message_types import Discovery
+from services.issue import handlers as issue_handlers
+from services.issue.handlers import ApplicationHandler
+from services.issue.message_types import Application
+from services.issue.models import ServiceIssueRecord
+from services.issue.routes import get_issue_self_, process_application_
+from services.local_pds import LocalPDS, MemoryPDS, SQLitePDS
+from services.models import ServiceRecord
+
+from .common import argument_parser, measure_async, run, write_results
+
+PUBLIC_DID = "did:key:z6MkjCo3Xq6g4QmSsBBbkjwbJyqGrzUJJx9W1rtdKbbQdJWT"
+SERVICE_SCHEMA = {"oca_schema_dri": "bench-service", "oca_schema_namespace": "bench"}
+USER_DATA = json.dumps({"DRI:bench-service": {"p": {"name": "John"}}})
+REPORT_DATA = {"result": "ok"}
+
+
+def calls_for(size: int, calls: int = None) -> int:
+    if calls:
+        return calls
+    return max(5, min(200, 20000 // size))
+
+
+def consent_schema(index: int) -> dict:
+    return {
+        "oca_schema_dri": f"bench-consent-{index}",
+        "oca_schema_namespace": "bench",
+        "oca_data_dri": None,
+    }
+
+
+def new_pds(args) -> LocalPDS:
+    options = {
+        "latency": args.pds_latency,
+        "error_rate": getattr(args, "pds_error_rate", 0.0),
+    }
+    if args.pds == "sqlite":
+        return SQLitePDS(**options)
+    return MemoryPDS(**options)
+
+
+def add_pds_arguments(parser):
+    parser.add_argument("--pds", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument(
+        "--pds-latency", type=float, default=0.0, help="seconds added to PDS calls"
+    )
+
+
+async def new_context(pds: LocalPDS):
+    context = InjectionContext(enforce_typing=False)
+    context.injector.bind_instance(BaseStorage, BasicStorage())
+    context.injector.bind_instance(LocalPDS, pds)
+    context.injector.bind_instance(BaseWallet, BasicWallet())
+
+    issuer = async_mock.MagicMock()
+    issuer.create_credential_ex = async_mock.CoroutineMock(
+        side_effect=lambda values, **kwargs: json.dumps(
+            {"credentialSubject": values, "proof": {"jws": "bench"}}
+        )
+    )
+    context.injector.bind_instance(BaseIssuer, issuer)
+
+    connection = ConnectionRecord(state=ConnectionRecord.STATE_ACTIVE)
+    await connection.save(context)
+    context.connection_ready = True
+    context.connection_record = connection
+    return context
+
+
+async def seed_catalog(context, pds: LocalPDS, size: int) -> list:
+    services = []
+    for index in range(size):
+        schema = consent_schema(index)
+        schema["oca_data_dri"] = await pds.pds_save_a(
+            {"consent": index}, oca_schema_dri=schema["oca_schema_dri"]
+        )
+        consent = DefinedConsentRecord(label=f"consent-{index}", **schema)
+        await consent.save(context)
+
+        service = ServiceRecord(
+            label=f"service-{index}",
+            service_schema=SERVICE_SCHEMA,
+            consent_id=consent.consent_id,
+        )
+        services.append((await service.save(context), schema))
+    return services
+
+
+def application_message(service_id: str, schema: dict, pds: LocalPDS):
+    consent_credential = json.dumps(
+        {"credentialSubject": dict(schema), "proof": {"jws": "bench"}}
+    )
+    return Application(
+        service_id=service_id,
+        exchange_id=str(uuid.uuid4()),
+        service_user_data=USER_DATA,
+        service_user_data_dri=pds.dri_of(USER_DATA),
+        service_consent_match_id=str(uuid.uuid4()),
+        consent_credential=consent_credential,
+        public_did=PUBLIC_DID,
+    )
+
+
+async def seed_issues(context, pds: LocalPDS, services: list, size: int) -> list:
+    service_id, schema = services[0]
+    responder = MockResponder()
+    exchange_ids = []
+    for _ in range(size):
+        context.message = application_message(service_id, schema, pds)
+        await ApplicationHandler().handle(context, responder)
+        exchange_ids.append(context.message.exchange_id)
+    return exchange_ids
+
+
+async def bench_size(size: int, pds: LocalPDS, calls: int = None) -> dict:
+    # no latency while seeding
+    latency = pds.latency
+    pds.latency = 0.0
+    try:
+        context = await new_context(pds)
+        CATALOG_CACHE.invalidate()
+        services = await seed_catalog(context, pds, size)
+        exchange_ids = await seed_issues(context, pds, services, size)
+        exchange_id = exchange_ids[len(exchange_ids) // 2]
+        service_id, schema = services[0]
+        number = calls_for(size, calls)
+        pds.latency = latency
+        responder = MockResponder()
+        outbound = async_mock.CoroutineMock()
+
+        async def discovery(cold: bool):
+            if cold:
+                CATALOG_CACHE.invalidate()
+            context.message = Discovery()
+            await DiscoveryHandler().handle(context, responder)
+            responder.messages.clear()
+
+        async def application():
+            context.message = application_message(service_id, schema, pds)
+            await ApplicationHandler().handle(context, responder)
+            responder.messages.clear()
+            pending.append(context.message.exchange_id)
+
+        async def process():
+            issue = await ServiceIssueRecord.retrieve_by_exchange_id_and_connection_id(
+                context, pending.pop(), context.connection_record.connection_id
+            )
+            await process_application_(context, outbound, issue, "accept", REPORT_DATA)
+
+        pending = []
+        results = {
+            "discovery_cold": await measure_async(
+                lambda: discovery(True), number=number
+            ),
+            "discovery_warm": await measure_async(
+                lambda: discovery(False), number=number
+            ),
+            "query_fully_serialized": await measure_async(
+                lambda: ServiceRecord.query_fully_serialized(context), number=number
+            ),
+            "get_issue_self_all": await measure_async(
+                lambda: get_issue_self_(context, {}), number=number
+            ),
+            "get_issue_self_by_exchange": await measure_async(
+                lambda: get_issue_self_(context, {"exchange_id": exchange_id}),
+                number=number,
+            ),
+            "application_handler": await measure_async(application, number=number),
+            "process_application": await measure_async(process, number=number),
+        }
+        return results
+    finally:
+        CATALOG_CACHE.invalidate()
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 1000, 10000],
+        help="catalog and issue list sizes",
+    )
+    parser.add_argument(
+        "--calls", type=int, help="calls per measurement, default depends on size"
+    )
+    add_pds_arguments(parser)
+    args = parser.parse_args()
+
+    with async_mock.patch.object(
+        issue_handlers, "verify_proof", async_mock.CoroutineMock(return_value=True)
+    ):
+        results = {
+            str(size): run(bench_size(size, new_pds(args), args.calls))
+            for size in args.sizes
+        }
+
+    write_results("handlers", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold import time of the plugin entry points acapy loads on start.
+
+Every measurement runs in a fresh interpreter, the modules acapy itself
+needs (agent message, base record, aiohttp) are imported first so the
+result only counts what the plugin adds on top.
+
+    python -m benchmarks.import_time -o bench_output.txt
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+from .common import argument_parser, write_results
+
+MODULES = ("services.message_types", "services.routes")
+
+PRELOAD = (
+    "aiohttp.web",
+    "aries_cloudagent.messaging.agent_message",
+    "aries_cloudagent.messaging.models.base_record",
+)
+
+PROBE = """
+import importlib, json, sys, time
+for name in {preload!r}:
+    importlib.import_module(name)
+before = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+loaded = set(sys.modules) - before
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules_loaded": len(loaded),
+    "plugin_modules_loaded": sorted(m for m in loaded if m.startswith("services")),
+}}))
+"""
+
+
+def probe(module: str) -> dict:
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(preload=PRELOAD, module=module)]
+    )
+    return json.loads(output)
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for module in MODULES:
+        runs = [probe(module) for _ in range(args.repeat)]
+        seconds = [run["seconds"] for run in runs]
+        results[module] = {
+            "repeat": args.repeat,
+            "median_seconds": statistics.median(seconds),
+            "min_seconds": min(seconds),
+            "modules_loaded": runs[-1]["modules_loaded"],
+            "plugin_modules_loaded": runs[-1]["plugin_modules_loaded"],
+        }
+
+    write_results("import_time", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Load generator for full service exchanges between two in-process agents,
+a holder and an issuer, wired together by an in-memory outbound router.
+
+Every exchange runs discovery -> apply -> ApplicationHandler ->
+Confirmation -> process_application -> ApplicationResponseHandler through
+the real handlers. Messages are serialized and deserialized on the way
+like on the wire. Throughput and latency percentiles are reported per
+stage and per handler, a handler's time includes handling the replies it
+triggers (delivery is synchronous).
+
+    python -m benchmarks.loopback --exchanges 1000 --concurrency 50
+    python -m benchmarks.loopback --pds-latency 0.01 --pds-error-rate 0.01
+"""
+import asyncio
+import json
+import time
+import uuid
+
+from aries_cloudagent.holder.base import BaseHolder
+from aries_cloudagent.messaging.responder import BaseResponder
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.wallet.base import BaseWallet
+from asynctest import mock as async_mock
+
+from services.discovery.message_types import Discovery
+from services.issue import handlers as issue_handlers
+from services.issue.models import ServiceIssueRecord
+from services.issue.routes import apply_, process_application_
+from services.webhooks import WEBHOOK_QUEUE
+
+from .common import argument_parser, percentiles, run, write_results
+from .handlers import (
+    REPORT_DATA,
+    USER_DATA,
+    add_pds_arguments,
+    new_context,
+    new_pds,
+    seed_catalog,
+)
+
+
+class Agent:
+    def __init__(self, name: str, context):
+        self.name = name
+        self.context = context
+        self.connection = context.connection_record
+        self.connection_id = self.connection.connection_id
+
+
+class LoopbackResponder(BaseResponder):
+    """Replies go straight to the handlers of the peer agent"""
+
+    def __init__(self, router, agent: Agent):
+        super().__init__(connection_id=agent.connection_id)
+        self.router = router
+        self.agent = agent
+
+    async def send_reply(self, message, **kwargs):
+        await self.router.deliver(self.agent, message)
+
+    async def send(self, message, **kwargs):
+        await self.router.deliver(self.agent, message)
+
+    async def send_outbound(self, message):
+        raise NotImplementedError("Loopback agents only exchange agent messages")
+
+    async def send_webhook(self, topic: str, payload: dict):
+        self.router.webhooks += 1
+
+
+class LoopbackRouter:
+    def __init__(self, stats):
+        self.stats = stats
+        self.peers = {}
+        self.webhooks = 0
+
+    def connect(self, first: Agent, second: Agent):
+        self.peers[first.name] = second
+        self.peers[second.name] = first
+
+    def outbound_handler(self, sender: Agent):
+        """Replacement of app["outbound_message_router"] of the sender"""
+
+        async def outbound_handler(message, connection_id=None):
+            await self.deliver(sender, message)
+
+        return outbound_handler
+
+    async def deliver(self, sender: Agent, message):
+        receiver = self.peers[sender.name]
+        message = type(message).deserialize(message.serialize())
+
+        context = receiver.context.copy()
+        context.message = message
+        context.connection_record = receiver.connection
+        context.connection_ready = True
+
+        handler = message.Handler()
+        start = time.perf_counter()
+        try:
+            await handler.handle(context, LoopbackResponder(self, receiver))
+        finally:
+            self.stats.observe(
+                "handler." + type(handler).__name__, time.perf_counter() - start
+            )
+
+
+class StageStats:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def observe(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def error(self, stage: str):
+        self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def report(self, wall_seconds: float) -> dict:
+        report = {}
+        for stage, samples in self.samples.items():
+            latency = {
+                key + "_ms": value * 1e3 for key, value in percentiles(samples).items()
+            }
+            report[stage] = {
+                "count": len(samples),
+                "errors": self.errors.get(stage, 0),
+                "throughput_per_sec": len(samples) / wall_seconds,
+                **latency,
+            }
+        return report
+
+
+async def service_list(holder: Agent) -> list:
+    storage = await holder.context.inject(BaseStorage)
+    record = await storage.search_records(
+        "service_list", {"connection_id": holder.connection_id}
+    ).fetch_single()
+    return json.loads(record.value)
+
+
+async def exchange(holder: Agent, issuer: Agent, router: LoopbackRouter):
+    stats = router.stats
+    stage = "discovery"
+    try:
+        start = time.perf_counter()
+        await router.deliver(holder, Discovery())
+        services = await service_list(holder)
+        stats.observe(stage, time.perf_counter() - start)
+
+        stage = "apply"
+        params = {
+            "connection_id": holder.connection_id,
+            "user_data": USER_DATA,
+            "service": services[0],
+        }
+        exchange_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        await apply_(
+            holder.context, router.outbound_handler(holder), params, exchange_id
+        )
+        stats.observe(stage, time.perf_counter() - start)
+
+        stage = "process_application"
+        start = time.perf_counter()
+        issue = await ServiceIssueRecord.retrieve_by_exchange_id_and_connection_id(
+            issuer.context, exchange_id, issuer.connection_id
+        )
+        await process_application_(
+            issuer.context,
+            router.outbound_handler(issuer),
+            issue,
+            "accept",
+            REPORT_DATA,
+        )
+        stats.observe(stage, time.perf_counter() - start)
+    except Exception:
+        stats.error(stage)
+        raise
+
+
+async def new_agent(name: str, pds) -> Agent:
+    context = await new_context(pds)
+    wallet = await context.inject(BaseWallet)
+    await wallet.create_public_did()
+
+    holder = async_mock.MagicMock()
+    holder.store_credential = async_mock.CoroutineMock(
+        side_effect=lambda **kwargs: str(uuid.uuid4())
+    )
+    context.injector.bind_instance(BaseHolder, holder)
+    return Agent(name, context)
+
+
+async def load(args) -> dict:
+    exchanges, concurrency = args.exchanges, args.concurrency
+    stats = StageStats()
+    router = LoopbackRouter(stats)
+    holder = await new_agent("holder", new_pds(args))
+    issuer_pds = new_pds(args)
+    issuer = await new_agent("issuer", issuer_pds)
+    router.connect(holder, issuer)
+
+    latency, error_rate = issuer_pds.latency, issuer_pds.error_rate
+    issuer_pds.latency, issuer_pds.error_rate = 0.0, 0.0
+    await seed_catalog(issuer.context, issuer_pds, args.services)
+    issuer_pds.latency, issuer_pds.error_rate = latency, error_rate
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with semaphore:
+            await exchange(holder, issuer, router)
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(bounded() for _ in range(exchanges)), return_exceptions=True
+    )
+    wall = time.perf_counter() - start
+    await WEBHOOK_QUEUE.join()
+
+    failed = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    return {
+        "exchanges": exchanges,
+        "concurrency": concurrency,
+        "failed": len(failed),
+        "first_error": repr(failed[0]) if failed else None,
+        "wall_seconds": wall,
+        "exchanges_per_sec": (exchanges - len(failed)) / wall,
+        "webhooks": router.webhooks,
+        "stages": stats.report(wall),
+    }
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument("-n", "--exchanges", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--services", type=int, default=10, help="services the issuer provides"
+    )
+    add_pds_arguments(parser)
+    parser.add_argument(
+        "--pds-error-rate", type=float, default=0.0, help="share of failed PDS calls"
+    )
+    args = parser.parse_args()
+
+    with async_mock.patch.object(
+        issue_handlers, "verify_proof", async_mock.CoroutineMock(return_value=True)
+    ):
+        results = run(load(args))
+
+    write_results("loopback", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
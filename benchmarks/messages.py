@@ -0,0 +1,106 @@
+"""
+Construct / serialize / deserialize throughput of the generated agent messages.
+
+Every message type is also generated with generic_init so the compiled
+__init__ can be compared with the old one.
+
+    python -m benchmarks.messages -o bench_output.txt
+"""
+import json
+
+from aries_cloudagent.messaging.agent_message import AgentMessageSchema
+
+from services.util import generate_model_schema, generic_init
+from services.issue.message_types import Application, ApplicationResponse, Confirmation
+from services.discovery.message_types import Discovery
+
+from .common import argument_parser, measure, write_results
+
+CREDENTIAL = json.dumps(
+    {
+        "credentialSubject": {
+            "oca_schema_dri": "8UtBoS7sPeZbKPRBGpHJzwuhkBuKxa3R4BPwTsQVbTZf",
+            "oca_schema_namespace": "consent",
+            "oca_data_dri": "zQmcZ7FCSXkERmpTTyKV2dGLBx8yJfEmmAFWHG2iBX7jrbL",
+        },
+        "proof": {"jws": "x" * 128},
+    }
+)
+
+SAMPLES = {
+    Application: {
+        "service_id": "5ab5e5c1a0e8a6e4b2b2a1d1c0f6c6e5",
+        "exchange_id": "c3d0b0b6-6f76-4c6c-9b0a-0a8f5e1f1a2b",
+        "service_user_data": json.dumps({"DRI:1234": {"p": {"name": "John"}}}),
+        "service_user_data_dri": "zQmT5NvUtoM5nWFfrQdVrFtvGfKFmG7AHE8P34isapyhCxX",
+        "service_consent_match_id": "6d4a3f3a-4c1c-4d28-9d8b-4a1c7d1b0e0f",
+        "consent_credential": CREDENTIAL,
+        "public_did": "did:key:z6MkjCo3Xq6g4QmSsBBbkjwbJyqGrzUJJx9W1rtdKbbQdJWT",
+    },
+    ApplicationResponse: {
+        "report_data": {"result": "positive", "date": "2020-10-10"},
+        "credential": CREDENTIAL,
+        "credential_data": {"associatedReportID": "c3d0b0b6"},
+        "exchange_id": "c3d0b0b6-6f76-4c6c-9b0a-0a8f5e1f1a2b",
+    },
+    Confirmation: {
+        "exchange_id": "c3d0b0b6-6f76-4c6c-9b0a-0a8f5e1f1a2b",
+        "state": "pending",
+    },
+    Discovery: {},
+}
+
+
+def generic_variant(message_class):
+    """Same message generated with the old generic_init"""
+    schema_class = message_class._get_schema_class()
+    fields = {
+        key: value
+        for key, value in schema_class._declared_fields.items()
+        if key not in AgentMessageSchema._declared_fields
+    }
+    model, _ = generate_model_schema(
+        name=message_class.__name__,
+        handler=message_class.Meta.handler_class,
+        msg_type=message_class.Meta.message_type,
+        schema=fields,
+        init=generic_init,
+    )
+    return model
+
+
+def bench_message(message_class, kwargs) -> dict:
+    message = message_class(**kwargs)
+    serialized = message.serialize()
+
+    return {
+        "construct": measure(lambda: message_class(**kwargs)),
+        "serialize": measure(message.serialize),
+        "deserialize": measure(lambda: message_class.deserialize(serialized)),
+    }
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument(
+        "--no-baseline",
+        action="store_true",
+        help="skip the generic_init comparison",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for message_class, kwargs in SAMPLES.items():
+        name = message_class.__name__
+        results[name] = bench_message(message_class, kwargs)
+        if not args.no_baseline:
+            baseline = generic_variant(message_class)
+            results[name]["generic_init_construct"] = measure(
+                lambda: baseline(**kwargs)
+            )
+
+    write_results("messages", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
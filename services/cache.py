@@ -0,0 +1,65 @@
+from collections import OrderedDict
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Mapping which keeps at most max_size entries, dropping the least
+    recently used one when full. Entries expire ttl seconds after they
+    were set, ttl None keeps them until they are pushed out.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, value)
+        self._entries = OrderedDict()
+
+    def configure(self, *, max_size: int = None, ttl: float = None):
+        if max_size is not None:
+            self.max_size = max_size
+        if ttl is not None:
+            self.ttl = ttl or None
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __setitem__(self, key, value):
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        value = self._lookup(key)
+        if value is _MISSING:
+            return default
+        del self._entries[key]
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,253 @@
+from aries_cloudagent.storage.base import BaseStorage
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+
+from ..cache import TTLCache
+from ..settings import get_setting
+from .snapshot import encode_snapshot, new_snapshot, write_snapshot_file
+
+LOGGER = logging.getLogger(__name__)
+
+
+def value_digest(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return hashlib.sha256(value.encode("UTF-8")).hexdigest()
+
+
+async def record_digests(storage: BaseStorage) -> dict:
+    """{"services": {id: digest}, "consents": {id: digest}} of the stored values"""
+    from ..models import ServiceRecord
+    from ..consents.models.defined_consent import DefinedConsentRecord
+
+    digests = {}
+    for name, record_type in (
+        ("services", ServiceRecord.RECORD_TYPE),
+        ("consents", DefinedConsentRecord.RECORD_TYPE),
+    ):
+        search = storage.search_records(
+            record_type, None, None, {"retrieveTags": False}
+        )
+        digests[name] = {
+            record.id: value_digest(record.value) for record in await search.fetch_all()
+        }
+    return digests
+
+
+class CatalogCache:
+    """
+    In memory copy of the catalog this agent provides: fully serialized
+    services (what discovery sends), consents with their oca_data and
+    certificate templates.
+
+    Services, consents and templates are dropped whenever a ServiceRecord
+    or a DefinedConsentRecord is saved and rebuilt from storage on next use,
+    templates are also read from the PDS again certificate_ttl seconds
+    after they were cached and on every refresh.
+    The cache is tied to the storage instance it was built from.
+    """
+
+    def __init__(self, certificate_ttl: float = 300.0):
+        self.snapshot_path = None
+        self.certificate_ttl = certificate_ttl
+        self._storage = None
+        self._services = None
+        self._consents = None
+        # digests of the records services and consents were read from
+        self._digests = None
+        # oca_schema_dri -> certificate template
+        self._certificates = TTLCache(max_size=256, ttl=certificate_ttl)
+        # digest of a template -> DRI it was saved under for per issue certificates
+        self._certificate_dris = TTLCache(max_size=256)
+        self._version = 0
+        self._pending_write = None
+        self._refreshing = None
+
+    @property
+    def is_warm(self) -> bool:
+        return self._services is not None
+
+    def configure(self, settings):
+        self.certificate_ttl = get_setting(
+            settings, "catalog_certificate_ttl", self.certificate_ttl
+        )
+        self._certificates.ttl = self.certificate_ttl or None
+        self._certificates.clear()
+
+    def invalidate(self):
+        self._version += 1
+        self._services = None
+        self._consents = None
+        self._digests = None
+        self._certificates.clear()
+
+    def load_snapshot(self, snapshot: dict, storage=None):
+        """Serve the services and consents of a snapshot, templates are read anew"""
+        self._version += 1
+        self._storage = storage
+        self._services = snapshot.get("services", [])
+        self._consents = snapshot.get("consents", [])
+        self._digests = snapshot.get("digests", {})
+        self._certificates.clear()
+
+    async def snapshot_differences(self, context, snapshot: dict) -> list:
+        """
+        How the services and consents of a snapshot differ from the records
+        in storage, by id and by the digest of their stored value,
+        a snapshot is only served when there is no difference
+        """
+        storage: BaseStorage = await context.inject(BaseStorage)
+        stored = await record_digests(storage)
+        snapshotted = snapshot.get("digests") or {}
+        differences = []
+        for name, id_key in (("services", "service_id"), ("consents", "consent_id")):
+            digests = snapshotted.get(name) or {}
+            if {item.get(id_key) for item in snapshot.get(name, [])} != set(digests):
+                differences.append(f"{name} of the snapshot don't match its digests")
+                continue
+            current = stored[name]
+            extra = digests.keys() - current.keys()
+            missing = current.keys() - digests.keys()
+            changed = [
+                record_id
+                for record_id in digests.keys() & current.keys()
+                if digests[record_id] != current[record_id]
+            ]
+            if extra or missing or changed:
+                differences.append(
+                    f"{len(extra)} {name} not in storage, "
+                    f"{len(missing)} missing from the snapshot, "
+                    f"{len(changed)} changed"
+                )
+        return differences
+
+    async def _same_storage(self, context) -> bool:
+        storage = await context.inject(BaseStorage)
+        if self._storage is None:
+            self._storage = storage
+        elif self._storage is not storage:
+            self._storage = storage
+            self.invalidate()
+            self._certificate_dris.clear()
+            return False
+        return True
+
+    async def services(self, context) -> list:
+        """Services as returned by ServiceRecord.query_fully_serialized"""
+        if self._services is not None and await self._same_storage(context):
+            return self._services
+        services, _ = await self.refresh(context)
+        return services
+
+    async def consents(self, context) -> list:
+        if self._consents is not None and await self._same_storage(context):
+            return self._consents
+        _, consents = await self.refresh(context)
+        return consents
+
+    async def certificate(self, context, oca_schema_dri):
+        """Predefined certificate template, a copy safe to modify"""
+        from ..pds import certificate_get
+
+        await self._same_storage(context)
+        certificate = self._certificates.get(oca_schema_dri)
+        if certificate is None:
+            certificate = await certificate_get(context, oca_schema_dri)
+            if certificate is None:
+                return None
+            self._certificates[oca_schema_dri] = certificate
+
+        return copy.deepcopy(certificate)
+
+    async def certificate_template_dri(self, context, oca_schema_dri):
+        """
+        DRI of the certificate template, saved to the PDS once per version
+        of the template, the certificates of accepted issues only store
+        what differs from it
+        """
+        from ..pds import pds_save_a, CERTIFICATE_TEMPLATE_TABLE
+
+        certificate = await self.certificate(context, oca_schema_dri)
+        if certificate is None:
+            return None
+        digest = value_digest(certificate)
+        template_dri = self._certificate_dris.get(digest)
+        if template_dri is None:
+            template_dri = await pds_save_a(
+                context, certificate, table=CERTIFICATE_TEMPLATE_TABLE + oca_schema_dri
+            )
+            self._certificate_dris[digest] = template_dri
+        return template_dri
+
+    async def refresh(self, context):
+        """
+        Rebuild services and consents from storage and PDS,
+        concurrent callers share a single rebuild
+        """
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh(context))
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh(self, context):
+        from ..models import ServiceRecord
+        from ..consents.models.defined_consent import DefinedConsentRecord
+
+        await self._same_storage(context)
+        version = self._version
+
+        digests = await record_digests(self._storage)
+        services = await ServiceRecord.query_fully_serialized(context)
+        consents = []
+        records = await DefinedConsentRecord.query(context)
+        serialized = await DefinedConsentRecord.serialize_many_fully(context, records)
+        for record, consent in zip(records, serialized):
+            if isinstance(consent, Exception):
+                LOGGER.warning("Skipping consent %s: %s", record.consent_id, consent)
+                continue
+            consent["consent_id"] = record.consent_id
+            consent["label"] = record.label
+            consents.append(consent)
+
+        # templates are read again with the rest of the catalog
+        for service in services:
+            certificate_schema = service.get("certificate_schema")
+            if certificate_schema and certificate_schema.get("oca_schema_dri"):
+                self._certificates.pop(certificate_schema["oca_schema_dri"])
+                await self.certificate(context, certificate_schema["oca_schema_dri"])
+
+        # something was saved while we were reading, the result may be stale
+        if version != self._version:
+            return services, consents
+
+        self._services = services
+        self._consents = consents
+        self._digests = digests
+        if self.snapshot_path:
+            self.schedule_snapshot_write()
+
+        return services, consents
+
+    async def snapshot(self, context) -> dict:
+        services = await self.services(context)
+        consents = await self.consents(context)
+        return new_snapshot(services, consents, self._digests)
+
+    def schedule_snapshot_write(self):
+        """Store the snapshot for the next start without blocking the loop"""
+        if self._pending_write is not None and not self._pending_write.done():
+            return
+
+        data = encode_snapshot(
+            new_snapshot(self._services, self._consents, self._digests)
+        )
+        loop = asyncio.get_event_loop()
+        self._pending_write = loop.run_in_executor(
+            None, write_snapshot_file, self.snapshot_path, data
+        )
+
+
+CATALOG_CACHE = CatalogCache()
@@ -0,0 +1,436 @@
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.error import (
+    StorageError,
+    StorageDuplicateError,
+    StorageNotFoundError,
+)
+from ..pds import *
+from aries_cloudagent.pdstorage_thcf.error import PDSError
+
+from aiohttp import web
+from aiohttp_apispec import docs
+from marshmallow import fields, Schema, ValidationError
+
+import asyncio
+import json
+import logging
+import os
+
+from ..consents.models.defined_consent import DefinedConsentRecord
+from ..consents.routes import AddConsentSchema, CONSENTS_TABLE
+from ..discovery.routes import AddServiceSchema
+from ..models import ServiceRecord
+from .cache import CATALOG_CACHE
+from .snapshot import (
+    SnapshotError,
+    decode_snapshot,
+    encode_snapshot,
+    read_snapshot_file,
+)
+from ..settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+ITEM_CONSENT = "consent"
+ITEM_SERVICE = "service"
+
+
+class ImportServiceSchema(AddServiceSchema):
+    # services can point at a consent defined in the same catalog by label
+    consent_id = fields.Str(required=False)
+    consent_label = fields.Str(required=False)
+
+
+class CatalogError(Exception):
+    pass
+
+
+def parse_catalog(body: str, content_type: str) -> tuple:
+    """
+    Catalog is either a JSON document:
+        {"consents": [...], "services": [...]}
+    or NDJSON, one item per line with a "type" of "consent" or "service"
+
+    Returns consents and services as lists of (position, item)
+    """
+    consents, services = [], []
+    document = None
+    if "ndjson" not in content_type:
+        try:
+            document = json.loads(body)
+        except ValueError:
+            document = None
+
+    is_document = isinstance(document, dict) and (
+        "consents" in document or "services" in document
+    )
+    if is_document:
+        consents = list(enumerate(document.get("consents", [])))
+        services = list(enumerate(document.get("services", [])))
+        return consents, services
+
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as err:
+            raise CatalogError(f"Line {line_number} is not valid JSON: {err}")
+        if not isinstance(item, dict):
+            raise CatalogError(f"Line {line_number} is not a JSON object")
+
+        item_type = item.pop("type", None)
+        if item_type == ITEM_CONSENT:
+            consents.append((line_number, item))
+        elif item_type == ITEM_SERVICE:
+            services.append((line_number, item))
+        else:
+            raise CatalogError(
+                f"Line {line_number} has unknown type {item_type!r}, "
+                f"expected '{ITEM_CONSENT}' or '{ITEM_SERVICE}'"
+            )
+
+    return consents, services
+
+
+async def gather_bounded(coroutines, limit: int):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(
+        *[bounded(coroutine) for coroutine in coroutines], return_exceptions=True
+    )
+
+
+def consent_defined(label) -> dict:
+    return {
+        "success": False,
+        "errors": [f"Consent with '{label}' label is already defined"],
+    }
+
+
+async def import_consents(context, consents, limit):
+    results = {}
+    valid = []
+    labels = set()
+    for position, item in consents:
+        try:
+            params = AddConsentSchema().load(item)
+        except ValidationError as err:
+            results[position] = {"success": False, "errors": err.messages}
+            continue
+        if params["label"] in labels:
+            results[position] = {
+                "success": False,
+                "errors": [f"Consent '{params['label']}' repeats in the catalog"],
+            }
+            continue
+        labels.add(params["label"])
+        valid.append((position, params))
+
+    # consents which are already defined are left out
+    # before anything is saved to the PDS
+    existing = await gather_bounded(
+        [
+            DefinedConsentRecord.retrieve_by_label(context, params["label"])
+            for _, params in valid
+        ],
+        limit,
+    )
+    new = []
+    for (position, params), record in zip(valid, existing):
+        if isinstance(record, StorageNotFoundError):
+            new.append((position, params))
+        elif isinstance(record, Exception):
+            results[position] = {"success": False, "errors": [str(record)]}
+        else:
+            results[position] = consent_defined(params["label"])
+    valid = new
+
+    usage_policy, pds_name = None, None
+    if valid:
+        # shared PDS metadata is resolved once per catalog
+        usage_policy = await pds_get_usage_policy_if_active_pds_supports_it(context)
+        pds_name = str(await pds_get_active_name(context))
+
+    data_dris = await gather_bounded(
+        [
+            pds_save_a(
+                context,
+                params["oca_data"],
+                table=CONSENTS_TABLE,
+                oca_schema_dri=params["oca_schema_dri"],
+            )
+            for _, params in valid
+        ],
+        limit,
+    )
+
+    records = []
+    for (position, params), data_dri in zip(valid, data_dris):
+        if isinstance(data_dri, Exception):
+            results[position] = {"success": False, "errors": [str(data_dri)]}
+            continue
+        record = DefinedConsentRecord(
+            label=params["label"],
+            oca_schema_dri=params["oca_schema_dri"],
+            oca_schema_namespace=params["oca_schema_namespace"],
+            oca_data_dri=data_dri,
+            pds_name=pds_name,
+            usage_policy=usage_policy,
+        )
+        records.append((position, record))
+
+    saved = await gather_bounded([record.save(context) for _, record in records], limit)
+    for (position, record), consent_id in zip(records, saved):
+        if isinstance(consent_id, StorageDuplicateError):
+            results[position] = consent_defined(record.label)
+        elif isinstance(consent_id, Exception):
+            results[position] = {"success": False, "errors": [str(consent_id)]}
+        else:
+            results[position] = {"success": True, "consent_id": consent_id}
+
+    return [
+        {"position": position, "label": item.get("label"), **results[position]}
+        for position, item in consents
+    ]
+
+
+async def import_services(context, services, imported_consent_ids, limit):
+    results = {}
+    known_consents = {consent_id: True for consent_id in imported_consent_ids}
+    label_consent_ids = {}
+    certificates = {}
+    records = []
+
+    for position, item in services:
+        try:
+            params = ImportServiceSchema().load(item)
+        except ValidationError as err:
+            results[position] = {"success": False, "errors": err.messages}
+            continue
+
+        consent_id = params.get("consent_id")
+        label = params.get("consent_label")
+        if consent_id is None and label:
+            # consents defined before the ids were derived from
+            # the labels are found by the label tag
+            consent_id = label_consent_ids.get(label)
+            if consent_id is None:
+                try:
+                    consent = await DefinedConsentRecord.retrieve_by_label(
+                        context, label
+                    )
+                    consent_id = consent.consent_id
+                    known_consents[consent_id] = True
+                except StorageError:
+                    consent_id = DefinedConsentRecord.consent_id_for_label(label)
+                label_consent_ids[label] = consent_id
+        if consent_id is None:
+            results[position] = {
+                "success": False,
+                "errors": ["Either consent_id or consent_label is required"],
+            }
+            continue
+
+        if consent_id not in known_consents:
+            try:
+                await DefinedConsentRecord.retrieve_by_id(context, consent_id)
+                known_consents[consent_id] = True
+            except StorageError:
+                known_consents[consent_id] = False
+        if not known_consents[consent_id]:
+            results[position] = {
+                "success": False,
+                "errors": [f"Consent {consent_id} not found"],
+            }
+            continue
+
+        cert = params.get("certificate_schema")
+        if cert:
+            cert_dri = cert.get("oca_schema_dri")
+            if cert_dri not in certificates:
+                certificates[cert_dri] = await CATALOG_CACHE.certificate(
+                    context, cert_dri
+                )
+            if certificates[cert_dri] is None:
+                results[position] = {
+                    "success": False,
+                    "errors": ["Certificate_schema not found"],
+                }
+                continue
+
+        record = ServiceRecord(
+            label=params["label"],
+            service_schema=params.get("service_schema"),
+            consent_id=consent_id,
+            certificate_schema=cert,
+        )
+        records.append((position, record))
+
+    saved = await gather_bounded([record.save(context) for _, record in records], limit)
+    for (position, record), service_id in zip(records, saved):
+        if isinstance(service_id, Exception):
+            results[position] = {"success": False, "errors": [str(service_id)]}
+        else:
+            results[position] = {"success": True, "service_id": service_id}
+
+    return [
+        {"position": position, "label": item.get("label"), **results[position]}
+        for position, item in services
+    ]
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Import consent definitions and services in bulk",
+    description="""
+    Body is either a JSON document:
+    {
+        "consents": [{"label", "oca_data", "oca_schema_dri", "oca_schema_namespace"}],
+        "services": [{"label", "consent_id" or "consent_label",
+                      "service_schema", "certificate_schema"}]
+    }
+
+    or NDJSON (Content-Type: application/x-ndjson), one item per line,
+    every line has a "type" of "consent" or "service".
+
+    Consents are imported first so services can point at them by
+    "consent_label". Every item gets its own result, "position" is the
+    index in the list (JSON) or the line number (NDJSON).
+    """,
+)
+async def import_catalog(request: web.BaseRequest):
+    context = request.app["request_context"]
+    body = await request.text()
+    limit = get_setting(context.settings, "catalog_import_concurrency", 16)
+
+    try:
+        consents, services = parse_catalog(body, request.content_type or "")
+    except CatalogError as err:
+        raise web.HTTPBadRequest(reason=str(err))
+
+    consent_results = await import_consents(context, consents, limit)
+    imported_consent_ids = [
+        result["consent_id"] for result in consent_results if result["success"]
+    ]
+    service_results = await import_services(
+        context, services, imported_consent_ids, limit
+    )
+
+    return web.json_response(
+        {
+            "success": all(
+                result["success"] for result in consent_results + service_results
+            ),
+            "consents": consent_results,
+            "services": service_results,
+        }
+    )
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Export a snapshot of the service catalog",
+    description="""
+    Gzipped JSON with fully serialized services, consents with their
+    oca_data and the digests of their storage records. Importing it into
+    a fresh agent lets it serve discovery before storage and PDS reads
+    finish, certificate templates are always read from the PDS.
+    """,
+)
+async def export_catalog_snapshot(request: web.BaseRequest):
+    context = request.app["request_context"]
+
+    try:
+        snapshot = await CATALOG_CACHE.snapshot(context)
+    except (StorageError, PDSError) as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.Response(
+        body=encode_snapshot(snapshot),
+        content_type="application/gzip",
+        headers={
+            "Content-Disposition": 'attachment; filename="catalog-snapshot.json.gz"'
+        },
+    )
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Import a snapshot of the service catalog",
+    description="""
+    Accepts the gzipped snapshot from the export route or its plain JSON
+    form. The snapshot is served from memory and, when
+    verifiable_services.snapshot_path is set, stored for the next start.
+    Records in storage are not modified, a snapshot is only accepted
+    when its services and consents are the ones in storage, same ids and
+    same stored values (409 otherwise).
+    """,
+)
+async def import_catalog_snapshot(request: web.BaseRequest):
+    context = request.app["request_context"]
+    data = await request.read()
+
+    try:
+        snapshot = decode_snapshot(data)
+    except SnapshotError as err:
+        raise web.HTTPBadRequest(reason=str(err))
+
+    try:
+        differences = await CATALOG_CACHE.snapshot_differences(context, snapshot)
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+    if differences:
+        raise web.HTTPConflict(
+            reason="Snapshot doesn't match storage: " + "; ".join(differences)
+        )
+
+    storage = await context.inject(BaseStorage)
+    CATALOG_CACHE.load_snapshot(snapshot, storage)
+    if CATALOG_CACHE.snapshot_path:
+        CATALOG_CACHE.schedule_snapshot_write()
+
+    return web.json_response(
+        {
+            "success": True,
+            "services": len(snapshot["services"]),
+            "consents": len(snapshot["consents"]),
+        }
+    )
+
+
+async def load_catalog_snapshot(context):
+    """
+    Warm the catalog cache from the snapshot file on start, then rebuild
+    it from storage in the background
+    """
+    path = get_setting(context.settings, "snapshot_path")
+    CATALOG_CACHE.snapshot_path = path
+    if not path:
+        return
+
+    storage = await context.inject(BaseStorage)
+    if os.path.exists(path):
+        try:
+            snapshot = read_snapshot_file(path)
+            differences = await CATALOG_CACHE.snapshot_differences(context, snapshot)
+            if differences:
+                raise SnapshotError("; ".join(differences))
+            CATALOG_CACHE.load_snapshot(snapshot, storage)
+            LOGGER.info(
+                "Loaded catalog snapshot with %s services", len(snapshot["services"])
+            )
+        except (OSError, SnapshotError, StorageError) as err:
+            LOGGER.warning("Catalog snapshot %s not loaded: %s", path, err)
+
+    async def refresh():
+        try:
+            await CATALOG_CACHE.refresh(context)
+        except Exception as err:
+            LOGGER.warning("Catalog refresh after start failed: %s", err)
+
+    asyncio.ensure_future(refresh())
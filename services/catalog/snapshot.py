@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+import time
+
+# 2: digests of the storage records instead of the certificate templates
+SNAPSHOT_VERSION = 2
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def new_snapshot(services: list, consents: list, digests: dict) -> dict:
+    """
+    digests - {"services": {id: digest}, "consents": {id: digest}} of the
+    storage records the services and consents were read from
+    """
+    return {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "services": services or [],
+        "consents": consents or [],
+        "digests": digests or {},
+    }
+
+
+def encode_snapshot(snapshot: dict) -> bytes:
+    """Compact form, gzipped JSON without whitespace"""
+    data = json.dumps(snapshot, separators=(",", ":")).encode("UTF-8")
+    return gzip.compress(data)
+
+
+def decode_snapshot(data: bytes) -> dict:
+    """Accepts both the gzipped and the plain JSON form"""
+    try:
+        if data[:2] == GZIP_MAGIC:
+            data = gzip.decompress(data)
+        snapshot = json.loads(data.decode("UTF-8"))
+    except (OSError, ValueError) as err:
+        raise SnapshotError(f"Invalid catalog snapshot: {err}")
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Unsupported catalog snapshot, expected version {SNAPSHOT_VERSION}"
+        )
+    return snapshot
+
+
+def write_snapshot_file(path: str, data: bytes):
+    """Write to a temporary file first so a crash never leaves half a snapshot"""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def read_snapshot_file(path: str) -> dict:
+    with open(path, "rb") as file:
+        return decode_snapshot(file.read())
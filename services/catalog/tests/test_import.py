@@ -0,0 +1,103 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from asynctest import TestCase as AsyncTestCase
+from unittest import TestCase
+import json
+
+from ...local_pds import LocalPDS, MemoryPDS
+from ...consents.models.defined_consent import DefinedConsentRecord
+from ...models import ServiceRecord
+from ..routes import CatalogError, import_consents, import_services, parse_catalog
+
+
+def consent(label):
+    return {
+        "label": label,
+        "oca_data": {"expiration": "7200"},
+        "oca_schema_dri": "1234",
+        "oca_schema_namespace": "test",
+    }
+
+
+def service(label, consent_label):
+    return {
+        "label": label,
+        "consent_label": consent_label,
+        "service_schema": {"oca_schema_dri": "5678", "oca_schema_namespace": "test"},
+    }
+
+
+class TestParseCatalog(TestCase):
+    def test_json_document(self):
+        body = json.dumps({"consents": [consent("a")], "services": [service("s", "a")]})
+        consents, services = parse_catalog(body, "application/json")
+        assert consents == [(0, consent("a"))]
+        assert services == [(0, service("s", "a"))]
+
+    def test_ndjson(self):
+        lines = [
+            json.dumps(dict(consent("a"), type="consent")),
+            "",
+            json.dumps(dict(service("s", "a"), type="service")),
+        ]
+        consents, services = parse_catalog("\n".join(lines), "application/x-ndjson")
+        assert consents == [(1, consent("a"))]
+        assert services == [(3, service("s", "a"))]
+
+    def test_ndjson_errors(self):
+        with self.assertRaises(CatalogError):
+            parse_catalog("not json", "application/x-ndjson")
+        with self.assertRaises(CatalogError):
+            parse_catalog(json.dumps(consent("a")), "application/x-ndjson")
+
+
+class TestImportCatalog(AsyncTestCase):
+    async def setUp(self):
+        self.context = InjectionContext()
+        self.storage = BasicStorage()
+        self.context.injector.bind_instance(BaseStorage, self.storage)
+        self.pds = MemoryPDS()
+        self.context.injector.bind_instance(LocalPDS, self.pds)
+
+    async def test_per_item_results(self):
+        consents = list(
+            enumerate([consent("a"), consent("a"), {"label": "invalid"}, consent("b")])
+        )
+        results = await import_consents(self.context, consents, 4)
+        assert [result["success"] for result in results] == [True, False, False, True]
+        assert [result["position"] for result in results] == [0, 1, 2, 3]
+
+        services = list(enumerate([service("s", "a"), service("t", "missing")]))
+        imported = [result["consent_id"] for result in results if result["success"]]
+        results = await import_services(self.context, services, imported, 4)
+        assert results[0]["success"] and results[0]["service_id"]
+        assert not results[1]["success"]
+
+    async def test_defined_consents_skip_the_pds(self):
+        await import_consents(self.context, [(0, consent("a"))], 4)
+        saves = self.pds.calls["pds_save_a"]
+
+        results = await import_consents(
+            self.context, [(0, consent("a")), (1, consent("b"))], 4
+        )
+        assert [result["success"] for result in results] == [False, True]
+        assert "already defined" in results[0]["errors"][0]
+        assert self.pds.calls["pds_save_a"] == saves + 1
+
+    async def test_legacy_consents_found_by_label(self):
+        legacy = DefinedConsentRecord(label="a", oca_data_dri="legacy")
+        legacy._id = "legacy-uuid"
+        await self.storage.add_record(legacy.storage_record)
+
+        results = await import_consents(self.context, [(0, consent("a"))], 4)
+        assert not results[0]["success"]
+        assert "already defined" in results[0]["errors"][0]
+        assert self.pds.calls["pds_save_a"] == 0
+
+        results = await import_services(self.context, [(0, service("s", "a"))], [], 4)
+        assert results[0]["success"]
+        record = await ServiceRecord.retrieve_by_id(
+            self.context, results[0]["service_id"]
+        )
+        assert record.consent_id == "legacy-uuid"
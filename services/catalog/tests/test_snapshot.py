@@ -0,0 +1,111 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from aries_cloudagent.storage.record import StorageRecord
+from asynctest import TestCase as AsyncTestCase
+import json
+import os
+import tempfile
+
+from ...local_pds import LocalPDS, MemoryPDS
+from ..cache import CatalogCache, value_digest
+from ..snapshot import *
+
+
+class TestCatalogSnapshot(AsyncTestCase):
+    services = [
+        {
+            "label": "service",
+            "service_id": "1234",
+            "service_schema": {
+                "oca_schema_dri": "1234",
+                "oca_schema_namespace": "test",
+            },
+            "consent_schema": {"oca_schema_dri": "5678", "oca_data": {"a": "b"}},
+        }
+    ]
+    consents = [{"consent_id": "5678", "label": "consent", "oca_data": {"a": "b"}}]
+    digests = {
+        "services": {"1234": value_digest("{}")},
+        "consents": {"5678": value_digest("{}")},
+    }
+
+    def create_snapshot(self):
+        return new_snapshot(self.services, self.consents, self.digests)
+
+    def test_encode_decode(self):
+        snapshot = self.create_snapshot()
+        result = decode_snapshot(encode_snapshot(snapshot))
+        assert result == snapshot
+
+    def test_decode_plain_json(self):
+        snapshot = self.create_snapshot()
+        result = decode_snapshot(json.dumps(snapshot).encode("UTF-8"))
+        assert result["services"] == self.services
+
+    def test_decode_invalid(self):
+        with self.assertRaises(SnapshotError):
+            decode_snapshot(b"not a snapshot")
+        with self.assertRaises(SnapshotError):
+            decode_snapshot(json.dumps({"version": 0}).encode("UTF-8"))
+
+    def test_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.json.gz")
+            write_snapshot_file(path, encode_snapshot(self.create_snapshot()))
+            assert read_snapshot_file(path)["consents"] == self.consents
+
+    async def test_cache_serves_loaded_snapshot(self):
+        context = InjectionContext()
+        storage = BasicStorage()
+        context.injector.bind_instance(BaseStorage, storage)
+
+        pds = MemoryPDS()
+        context.injector.bind_instance(LocalPDS, pds)
+        await pds.pds_save_a(
+            {"associatedReportID": None},
+            table="dip.data.tda.oca_chunks.predefined.abcd",
+        )
+
+        cache = CatalogCache()
+        cache.load_snapshot(self.create_snapshot(), storage)
+        assert cache.is_warm
+        assert await cache.services(context) == self.services
+
+        certificate = await cache.certificate(context, "abcd")
+        certificate["associatedReportID"] = "1234"
+        assert (await cache.certificate(context, "abcd"))["associatedReportID"] is None
+        assert pds.calls["load_multiple"] == 1
+
+        cache.invalidate()
+        assert not cache.is_warm
+        await cache.certificate(context, "abcd")
+        assert pds.calls["load_multiple"] == 2
+
+    async def test_snapshot_differences(self):
+        context = InjectionContext()
+        storage = BasicStorage()
+        context.injector.bind_instance(BaseStorage, storage)
+        cache = CatalogCache()
+
+        differences = await cache.snapshot_differences(context, self.create_snapshot())
+        assert differences == [
+            "1 services not in storage, 0 missing from the snapshot, 0 changed",
+            "1 consents not in storage, 0 missing from the snapshot, 0 changed",
+        ]
+
+        await storage.add_record(StorageRecord("verifiable_services", "{}", {}, "1234"))
+        consent = StorageRecord("defined_consent", '{"label": "old"}', {}, "5678")
+        await storage.add_record(consent)
+        differences = await cache.snapshot_differences(context, self.create_snapshot())
+        assert differences == [
+            "0 consents not in storage, 0 missing from the snapshot, 1 changed"
+        ]
+
+        await storage.update_record_value(consent, "{}")
+        assert await cache.snapshot_differences(context, self.create_snapshot()) == []
+
+        snapshot = self.create_snapshot()
+        snapshot["services"] = self.services + [dict(self.services[0], service_id="x")]
+        differences = await cache.snapshot_differences(context, snapshot)
+        assert differences == ["services of the snapshot don't match its digests"]
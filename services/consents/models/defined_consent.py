@@ -1,15 +1,22 @@
 from aries_cloudagent.messaging.models.base_record import BaseRecord, BaseRecordSchema
 from marshmallow import fields
 
-from aries_cloudagent.pdstorage_thcf.api import *
+from ...pds import *
 from aries_cloudagent.pdstorage_thcf.error import *
 import json
 
 from aries_cloudagent.storage.error import *
 from aiohttp import web
+from ...records import HashIdRecord
+from ...catalog.cache import CATALOG_CACHE
 
 
-class DefinedConsentRecord(BaseRecord):
+class DefinedConsentRecord(HashIdRecord):
+    """
+    Record id is a hash of the label, that way the storage rejects
+    a second consent with the same label on insert
+    """
+
     RECORD_ID_NAME = "record_id"
     RECORD_TYPE = "defined_consent"
 
@@ -52,6 +59,30 @@ class DefinedConsentRecord(BaseRecord):
             )
         }
 
+    @property
+    def unique_record_values(self) -> dict:
+        return {"label": self.label}
+
+    @classmethod
+    def consent_id_for_label(cls, label: str) -> str:
+        return cls.hash_id({"label": label})
+
+    @classmethod
+    async def retrieve_by_label(cls, context, label: str):
+        """
+        Point lookup of the label hash, consents saved before the ids
+        were derived from the labels are found by the label tag
+        """
+        try:
+            return await cls.retrieve_by_id(context, cls.consent_id_for_label(label))
+        except StorageNotFoundError:
+            pass
+
+        legacy = await cls.query(context, {"label": label})
+        if not legacy:
+            raise StorageNotFoundError(f"Consent with '{label}' label not found")
+        return legacy[0]
+
     @property
     def record_tags(self) -> dict:
         return {
@@ -64,12 +95,16 @@ class DefinedConsentRecord(BaseRecord):
     def consent_id(self):
         return self._id
 
-    @classmethod
-    async def retrieve_by_id_fully_serialized(cls, context, id):
-        record = await cls.retrieve_by_id(context, id)
-        oca_data = await pds_load(context, record.oca_data_dri)
+    async def post_save(self, context, *args, **kwargs):
+        await super().post_save(context, *args, **kwargs)
+        CATALOG_CACHE.invalidate()
 
-        record = record.serialize()
+    async def delete_record(self, context):
+        await super().delete_record(context)
+        CATALOG_CACHE.invalidate()
+
+    def serialize_fully(self, oca_data) -> dict:
+        record = self.serialize()
         record["oca_data"] = oca_data
         record.pop("created_at", None)
         record.pop("updated_at", None)
@@ -77,6 +112,42 @@ class DefinedConsentRecord(BaseRecord):
 
         return record
 
+    @classmethod
+    async def retrieve_by_id_fully_serialized(cls, context, id):
+        record = await cls.retrieve_by_id(context, id)
+        oca_data = await pds_load(context, record.oca_data_dri)
+
+        return record.serialize_fully(oca_data)
+
+    @classmethod
+    async def serialize_many_fully(cls, context, records) -> list:
+        """
+        Fully serialized records, oca_data of all of them is loaded in one
+        batch, a record which oca_data failed to load is replaced by the error
+        """
+        oca_data = await load_many(
+            context, [record.oca_data_dri for record in records], return_exceptions=True
+        )
+        return [
+            data if isinstance(data, Exception) else record.serialize_fully(data)
+            for record, data in zip(records, oca_data)
+        ]
+
+    @classmethod
+    async def retrieve_many_fully_serialized(cls, context, ids) -> dict:
+        """consent_id -> fully serialized consent or the error it failed with"""
+        result = {}
+        records = []
+        for id in dict.fromkeys(ids):
+            try:
+                records.append(await cls.retrieve_by_id(context, id))
+            except StorageError as err:
+                result[id] = err
+
+        serialized = await cls.serialize_many_fully(context, records)
+        result.update(zip([record.consent_id for record in records], serialized))
+        return result
+
     @classmethod
     async def routes_retrieve_by_id_fully_serialized(cls, context, id):
         try:
@@ -2,10 +2,11 @@ from aries_cloudagent.messaging.models.base_record import BaseRecord, BaseRecord
 from marshmallow import fields
 
 from ...models import ConsentSchema
-from aries_cloudagent.pdstorage_thcf.api import *
+from ...pds import *
+from ...records import PluginRecord
 
 
-class ConsentGivenRecord(BaseRecord):
+class ConsentGivenRecord(PluginRecord):
     RECORD_ID_NAME = "record_id"
     RECORD_TYPE = "given_consent_credential"
 
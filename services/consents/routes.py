@@ -4,8 +4,12 @@ from aiohttp_apispec import docs, request_schema, querystring_schema
 from marshmallow import fields, Schema
 import json
 
-from aries_cloudagent.pdstorage_thcf.api import *
-from aries_cloudagent.storage.error import StorageError
+from ..pds import *
+from aries_cloudagent.storage.error import (
+    StorageError,
+    StorageDuplicateError,
+    StorageNotFoundError,
+)
 from .models.defined_consent import *
 from .models.given_consent import ConsentGivenRecord
 from ..models import ConsentSchema
@@ -36,43 +40,46 @@ class AddConsentSchema(Schema):
 async def add_consent(request: web.BaseRequest):
     context = request.app["request_context"]
     params = await request.json()
-    errors = []
+    duplicate = [f"Consent with '{params['label']}' label is already defined"]
 
+    # duplicates are found before anything is saved to the PDS
     try:
-        existing_consents = await DefinedConsentRecord.query(
-            context, {"label": params["label"]}
-        )
+        await DefinedConsentRecord.retrieve_by_label(context, params["label"])
+        return web.json_response({"success": False, "errors": duplicate})
+    except StorageNotFoundError:
+        pass
     except StorageError as err:
         raise web.HTTPInternalServerError(reason=err)
 
-    if existing_consents:
-        errors.append(f"Consent with '{params['label']}' label is already defined")
-
-    if errors:
-        return web.json_response({"success": False, "errors": errors})
-    else:
-        oca_data_dri = await pds_save_a(
-            context,
-            params["oca_data"],
-            table=CONSENTS_TABLE,
-            oca_schema_dri=params["oca_schema_dri"],
-        )
-
-        pds_usage_policy = await pds_get_usage_policy_if_active_pds_supports_it(context)
-
-        pds_name = await pds_get_active_name(context)
-        defined_consent = DefinedConsentRecord(
-            label=params["label"],
-            oca_schema_dri=params["oca_schema_dri"],
-            oca_schema_namespace=params["oca_schema_namespace"],
-            oca_data_dri=oca_data_dri,
-            pds_name=str(pds_name),
-            usage_policy=pds_usage_policy,
-        )
-
+    oca_data_dri = await pds_save_a(
+        context,
+        params["oca_data"],
+        table=CONSENTS_TABLE,
+        oca_schema_dri=params["oca_schema_dri"],
+    )
+
+    pds_usage_policy = await pds_get_usage_policy_if_active_pds_supports_it(context)
+
+    pds_name = await pds_get_active_name(context)
+    defined_consent = DefinedConsentRecord(
+        label=params["label"],
+        oca_schema_dri=params["oca_schema_dri"],
+        oca_schema_namespace=params["oca_schema_namespace"],
+        oca_data_dri=oca_data_dri,
+        pds_name=str(pds_name),
+        usage_policy=pds_usage_policy,
+    )
+
+    # a consent with the same label saved in the meantime
+    # is still rejected by the storage insert
+    try:
         consent_id = await defined_consent.save(context)
+    except StorageDuplicateError:
+        return web.json_response({"success": False, "errors": duplicate})
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err)
 
-        return web.json_response({"success": True, "consent_id": consent_id})
+    return web.json_response({"success": True, "consent_id": consent_id})
 
 
 @docs(tags=["Defined Consents"], summary="Get all consent definitions")
@@ -87,11 +94,14 @@ async def get_consents(request: web.BaseRequest):
     except StorageError as err:
         raise web.HTTPNotFound(reason=err)
 
+    all_oca_data = await load_many(
+        context, [consent.oca_data_dri for consent in all_consents]
+    )
+
     result = []
-    for consent in all_consents:
+    for consent, oca_data in zip(all_consents, all_oca_data):
         current = consent.serialize()
         current["consent_id"] = consent.consent_id
-        oca_data = await pds_load(context, current["oca_data_dri"])
 
         if oca_data:
             current["oca_data"] = oca_data
@@ -120,10 +130,13 @@ async def get_consents_given(request: web.BaseRequest):
     except StorageError as err:
         raise web.HTTPInternalServerError(reason=err)
 
+    credential_dris = [i.credential_dri for i in all_consents if i.credential_dri]
+    credentials = dict(zip(credential_dris, await load_many(context, credential_dris)))
+
     result = []
     for i in all_consents:
         record = i.serialize()
-        record["credential"] = await i.credential_pds_get(context)
+        record["credential"] = credentials.get(i.credential_dri)
         result.append(record)
 
     return web.json_response({"success": True, "result": result})
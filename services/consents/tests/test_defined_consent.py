@@ -0,0 +1,46 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from aries_cloudagent.storage.error import StorageDuplicateError
+from asynctest import TestCase as AsyncTestCase
+
+from ..models.defined_consent import DefinedConsentRecord
+
+
+class TestDefinedConsentRecord(AsyncTestCase):
+    label = "consent"
+
+    def create_default_context(self):
+        context = InjectionContext()
+        storage = BasicStorage()
+        context.injector.bind_instance(BaseStorage, storage)
+
+        return [context, storage]
+
+    def create_record(self, label=None):
+        return DefinedConsentRecord(
+            label=label or self.label,
+            oca_schema_dri="1234",
+            oca_schema_namespace="test",
+            oca_data_dri="5678",
+            pds_name="local",
+        )
+
+    async def test_id_is_derived_from_label(self):
+        context, storage = self.create_default_context()
+
+        consent_id = await self.create_record().save(context)
+        assert consent_id == DefinedConsentRecord.consent_id_for_label(self.label)
+
+        record = await DefinedConsentRecord.retrieve_by_id(context, consent_id)
+        assert record.label == self.label
+
+    async def test_duplicate_label_is_rejected(self):
+        context, storage = self.create_default_context()
+        await self.create_record().save(context)
+
+        with self.assertRaises(StorageDuplicateError):
+            await self.create_record().save(context)
+
+        await self.create_record("other consent").save(context)
+        assert len(await DefinedConsentRecord.query(context)) == 2
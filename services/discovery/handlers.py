@@ -6,8 +6,6 @@ from aries_cloudagent.messaging.base_handler import (
 )
 from aries_cloudagent.storage.base import BaseStorage
 from aries_cloudagent.config.injection_context import InjectionContext
-from aries_cloudagent.core.plugin_registry import PluginRegistry
-from aries_cloudagent.protocols.connections.v1_0.manager import ConnectionManager
 
 # Records, messages and schemas
 from aries_cloudagent.messaging.agent_message import AgentMessage, AgentMessageSchema
@@ -20,13 +18,16 @@ from aries_cloudagent.storage.error import (
     StorageNotFoundError,
     StorageError,
 )
-from aries_cloudagent.protocols.problem_report.v1_0.message import ProblemReport
 from aries_cloudagent.protocols.present_proof.v1_1.routes import verify_usage_policy
 
 # Internal
 from ..models import *
 from .message_types import *
-from ..util import generate_model_schema
+from .models import DEBUGServiceDiscoveryRecord
+from .index import REMOTE_SERVICE_INDEX
+from ..webhooks import enqueue_webhook
+from ..catalog.cache import CATALOG_CACHE
+from ..metrics import timed, timed_handler, STORAGE_LATENCY
 
 # External
 from marshmallow import fields, Schema
@@ -35,18 +36,22 @@ import uuid
 import json
 import logging
 
-from aries_cloudagent.pdstorage_thcf.api import *
+from ..pds import *
 from aries_cloudagent.aathcf.utils import debug_handler
 
 LOGGER = logging.getLogger(__name__)
+SERVICE_LIST_SEARCH = {"call": "search_records", "record_type": "service_list"}
+SERVICE_LIST_UPDATE = {"call": "update_record_value", "record_type": "service_list"}
+SERVICE_LIST_ADD = {"call": "add_record", "record_type": "service_list"}
 
 
 class DiscoveryHandler(BaseHandler):
+    @timed_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, Discovery)
 
         usage_policy = await pds_get_usage_policy_if_active_pds_supports_it(context)
-        records = await ServiceRecord.query_fully_serialized(context)
+        records = await CATALOG_CACHE.services(context)
         print("\n\n\nDiscoveryHandler records", records)
         response = DiscoveryResponse(services=records, usage_policy=usage_policy)
         response.assign_thread_from(context.message)
@@ -61,6 +66,7 @@ def trim_acapy_fields(list_of_dict):
 
 
 class DiscoveryResponseHandler(BaseHandler):
+    @timed_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, DiscoveryResponse)
         connection_id = context.connection_record.connection_id
@@ -81,17 +87,22 @@ class DiscoveryResponseHandler(BaseHandler):
             query = storage.search_records(
                 "service_list", {"connection_id": connection_id}
             )
-            query = await query.fetch_single()
-            await storage.update_record_value(query, services_serialized)
+            async with timed(STORAGE_LATENCY, **SERVICE_LIST_SEARCH):
+                query = await query.fetch_single()
+            async with timed(STORAGE_LATENCY, **SERVICE_LIST_UPDATE):
+                await storage.update_record_value(query, services_serialized)
             LOGGER.info("QUERY %s", query)
         except StorageError:
             record = StorageRecord(
                 "service_list", services_serialized, {"connection_id": connection_id}
             )
-            await storage.add_record(record)
+            async with timed(STORAGE_LATENCY, **SERVICE_LIST_ADD):
+                await storage.add_record(record)
             LOGGER.info("ADD RECORD %s", record)
+        await REMOTE_SERVICE_INDEX.services_updated(context, connection_id, services)
 
-        await responder.send_webhook(
+        enqueue_webhook(
+            responder,
             "verifiable-services/request-service-list",
             {"connection_id": connection_id, "services": services},
         )
@@ -105,7 +116,8 @@ class DiscoveryResponseHandler(BaseHandler):
                 result[i["service_id"]], _ = await verify_usage_policy(
                     i["consent_schema"]["usage_policy"], usage_policy
                 )
-                await responder.send_webhook(
+                enqueue_webhook(
+                    responder,
                     "verifiable-services/request-service-list/usage-policy",
                     result,
                 )
@@ -116,67 +128,19 @@ DEBUG
 """
 
 
-class DEBUGServiceDiscoveryRecord(BaseRecord):
-    RECORD_ID_NAME = "record_id"
-    RECORD_TYPE = "DEBUGservice_discovery"
-
-    class Meta:
-        schema_class = "DEBUGServiceDiscoveryRecordSchema"
-
-    def __init__(
-        self,
-        *,
-        services=None,
-        connection_id: str = None,
-        state: str = None,
-        record_id: str = None,
-        **keywordArgs,
-    ):
-        super().__init__(record_id, state, **keywordArgs)
-        self.services = services
-        self.connection_id = connection_id
-
-    @property
-    def record_value(self) -> dict:
-        """Accessor to for the JSON record value properties"""
-        return {prop: getattr(self, prop) for prop in ("services", "connection_id")}
-
-    @property
-    def record_tags(self) -> dict:
-        """Get tags for record"""
-        return {
-            "connection_id": self.connection_id,
-        }
-
-    @classmethod
-    async def retrieve_by_connection_id(
-        cls, context: InjectionContext, connection_id: str
-    ):
-        return await cls.retrieve_by_tag_filter(
-            context,
-            {"connection_id": connection_id},
-        )
-
-
-class DEBUGServiceDiscoveryRecordSchema(BaseRecordSchema):
-    class Meta:
-        model_class = "DEBUGServiceDiscoveryRecord"
-
-    services = fields.List(fields.Dict())
-    connection_id = fields.Str()
-
-
 class DEBUGDiscoveryHandler(BaseHandler):
+    @timed_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, DEBUGDiscovery)
 
-        records = await ServiceRecord.query_fully_serialized(context)
+        records = await CATALOG_CACHE.services(context)
         response = DEBUGDiscoveryResponse(services=records)
         response.assign_thread_from(context.message)
         await responder.send_reply(response)
 
 
 class DEBUGDiscoveryResponseHandler(BaseHandler):
+    @timed_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, DEBUGDiscoveryResponse)
         connection_id = context.connection_record.connection_id
@@ -0,0 +1,195 @@
+from aries_cloudagent.storage.base import BaseStorage
+
+from bisect import bisect_left, insort
+import asyncio
+import json
+import logging
+import re
+
+LOGGER = logging.getLogger(__name__)
+
+SERVICE_LIST_RECORD_TYPE = "service_list"
+TOKEN = re.compile(r"\w+")
+
+
+def label_tokens(label) -> set:
+    return set(TOKEN.findall(str(label or "").lower()))
+
+
+def service_terms(service: dict) -> set:
+    """(field, value) pairs a discovered service can be found by"""
+    service_schema = service.get("service_schema") or {}
+    consent_schema = service.get("consent_schema") or {}
+    terms = {("label", token) for token in label_tokens(service.get("label"))}
+    for field, value in (
+        ("service_schema_dri", service_schema.get("oca_schema_dri")),
+        ("namespace", service_schema.get("oca_schema_namespace")),
+        ("namespace", consent_schema.get("oca_schema_namespace")),
+        ("consent_schema_dri", consent_schema.get("oca_schema_dri")),
+    ):
+        if value is not None:
+            terms.add((field, value))
+    return terms
+
+
+class RemoteServiceIndex:
+    """
+    Inverted index over the services discovered from other agents,
+    by label token, service_schema dri, namespace and consent schema dri.
+    Built once from the service_list records and kept up to date by
+    DiscoveryResponseHandler, so a search doesn't load every service list.
+
+    The index is tied to the storage instance it was built from.
+    """
+
+    def __init__(self):
+        self._storage = None
+        # (field, value) -> {(connection_id, service_id)}
+        self._postings = None
+        # sorted label tokens, for prefix search
+        self._tokens = None
+        # (connection_id, service_id) -> service
+        self._services = None
+        # connection_id -> [(connection_id, service_id)]
+        self._by_connection = None
+        self._version = 0
+        self._rebuilding = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._postings is not None
+
+    async def _same_storage(self, context) -> bool:
+        storage = await context.inject(BaseStorage)
+        if self._storage is not storage:
+            self._storage = storage
+            self._postings = None
+            self._version += 1
+            return False
+        return True
+
+    def _remove_connection(self, connection_id):
+        for key in self._by_connection.pop(connection_id, []):
+            service = self._services.pop(key)
+            for term in service_terms(service):
+                keys = self._postings.get(term)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+                    if term[0] == "label":
+                        del self._tokens[bisect_left(self._tokens, term[1])]
+
+    def _add_connection(self, connection_id, services):
+        keys = []
+        for service in services:
+            key = (connection_id, str(service.get("service_id")))
+            if key in self._services:
+                continue
+            keys.append(key)
+            self._services[key] = service
+            for term in service_terms(service):
+                if term not in self._postings:
+                    self._postings[term] = set()
+                    if term[0] == "label":
+                        insort(self._tokens, term[1])
+                self._postings[term].add(key)
+        self._by_connection[connection_id] = keys
+
+    async def services_updated(self, context, connection_id, services):
+        """Replace the services of a connection with a new service list"""
+        if not await self._same_storage(context):
+            return
+        self._version += 1
+        if self._postings is None:
+            return
+        self._remove_connection(connection_id)
+        self._add_connection(connection_id, services)
+
+    async def rebuild(self, context):
+        """Reindex the service lists, concurrent callers share a rebuild"""
+        if self._rebuilding is None or self._rebuilding.done():
+            self._rebuilding = asyncio.ensure_future(self._rebuild(context))
+        await asyncio.shield(self._rebuilding)
+
+    async def _rebuild(self, context):
+        await self._same_storage(context)
+        storage: BaseStorage = self._storage
+        for _ in range(3):
+            version = self._version
+            records = await storage.search_records(SERVICE_LIST_RECORD_TYPE).fetch_all()
+            self._postings, self._tokens = {}, []
+            self._services, self._by_connection = {}, {}
+            for record in records:
+                try:
+                    services = json.loads(record.value)
+                except ValueError:
+                    LOGGER.warning("Skipping invalid service list %s", record.id)
+                    continue
+                connection_id = record.tags.get("connection_id") or ""
+                self._add_connection(connection_id, services)
+            if version == self._version:
+                break
+        else:
+            LOGGER.warning("Service lists kept changing while rebuilding the index")
+
+    def _label_prefix(self, prefix: str) -> set:
+        keys = set()
+        position = bisect_left(self._tokens, prefix)
+        while position < len(self._tokens):
+            token = self._tokens[position]
+            if not token.startswith(prefix):
+                break
+            keys |= self._postings[("label", token)]
+            position += 1
+        return keys
+
+    async def search(
+        self,
+        context,
+        *,
+        label: str = None,
+        service_schema_dri: str = None,
+        namespace: str = None,
+        consent_schema_dri: str = None,
+        connection_id: str = None,
+        offset: int = 0,
+        limit: int = 100,
+    ):
+        """
+        Services matching every given criteria, label matches services
+        which have a word starting with each word of label.
+        Returns a page of {"connection_id", **service} and the number of matches.
+        """
+        if not await self._same_storage(context) or self._postings is None:
+            await self.rebuild(context)
+
+        matches = []
+        for token in label_tokens(label):
+            matches.append(self._label_prefix(token))
+        for field, value in (
+            ("service_schema_dri", service_schema_dri),
+            ("namespace", namespace),
+            ("consent_schema_dri", consent_schema_dri),
+        ):
+            if value is not None:
+                matches.append(self._postings.get((field, value), set()))
+        if connection_id is not None:
+            matches.append(set(self._by_connection.get(connection_id, [])))
+
+        if matches:
+            matches.sort(key=len)
+            keys = set.intersection(*matches)
+        else:
+            keys = self._services.keys()
+
+        keys = sorted(keys)
+        page = [
+            dict(self._services[key], connection_id=key[0])
+            for key in keys[offset : offset + limit]
+        ]
+        return page, len(keys)
+
+
+REMOTE_SERVICE_INDEX = RemoteServiceIndex()
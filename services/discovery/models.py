@@ -0,0 +1,56 @@
+from aries_cloudagent.messaging.models.base_record import BaseRecord, BaseRecordSchema
+from aries_cloudagent.config.injection_context import InjectionContext
+
+from marshmallow import fields
+
+from ..records import PluginRecord
+
+
+class DEBUGServiceDiscoveryRecord(PluginRecord):
+    RECORD_ID_NAME = "record_id"
+    RECORD_TYPE = "DEBUGservice_discovery"
+
+    class Meta:
+        schema_class = "DEBUGServiceDiscoveryRecordSchema"
+
+    def __init__(
+        self,
+        *,
+        services=None,
+        connection_id: str = None,
+        state: str = None,
+        record_id: str = None,
+        **keywordArgs,
+    ):
+        super().__init__(record_id, state, **keywordArgs)
+        self.services = services
+        self.connection_id = connection_id
+
+    @property
+    def record_value(self) -> dict:
+        """Accessor to for the JSON record value properties"""
+        return {prop: getattr(self, prop) for prop in ("services", "connection_id")}
+
+    @property
+    def record_tags(self) -> dict:
+        """Get tags for record"""
+        return {
+            "connection_id": self.connection_id,
+        }
+
+    @classmethod
+    async def retrieve_by_connection_id(
+        cls, context: InjectionContext, connection_id: str
+    ):
+        return await cls.retrieve_by_tag_filter(
+            context,
+            {"connection_id": connection_id},
+        )
+
+
+class DEBUGServiceDiscoveryRecordSchema(BaseRecordSchema):
+    class Meta:
+        model_class = "DEBUGServiceDiscoveryRecord"
+
+    services = fields.List(fields.Dict())
+    connection_id = fields.Str()
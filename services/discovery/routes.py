@@ -1,18 +1,19 @@
-from aries_cloudagent.aathcf.utils import build_context, run_standalone_async
 from aries_cloudagent.connections.models.connection_record import ConnectionRecord
 from aries_cloudagent.storage.error import StorageNotFoundError, StorageDuplicateError
 from ..consents.models.defined_consent import *
 
 from aiohttp import web
-from aiohttp_apispec import docs, request_schema, match_info_schema
+from aiohttp_apispec import docs, request_schema, match_info_schema, querystring_schema
 
 from marshmallow import fields, Schema
 import time
 
 # Internal
 from ..models import *
+from ..catalog.cache import CATALOG_CACHE
 from .message_types import *
-from .handlers import *
+from .models import DEBUGServiceDiscoveryRecord
+from .index import REMOTE_SERVICE_INDEX
 
 
 class ConsentContentSchema(Schema):
@@ -29,34 +30,6 @@ class AddServiceSchema(Schema):
     certificate_schema = fields.Nested(ServiceSchema(), required=False)
 
 
-async def certificate_get(context, oca_schema_dri):
-    certificate = await load_multiple(
-        context,
-        table="dip.data.tda.oca_chunks.predefined." + oca_schema_dri,
-    )
-
-    if len(certificate) == 0:
-        return None
-    elif len(certificate) > 1:
-        LOGGER.warning("More than one predefined oca_schema for this dri!")
-
-    certificate = certificate[0]["content"]
-    if isinstance(certificate, str):
-        certificate = json.loads(certificate)
-    return certificate
-
-
-async def test_certificate_get():
-    context = await build_context()
-    resp = await certificate_get(
-        context, "9GdWoQwth9299oYj8HfdgRZjtSxW9sTVyy1RnfhQ35yJ"
-    )
-    print(resp)
-
-
-run_standalone_async(__name__, test_certificate_get)
-
-
 @request_schema(AddServiceSchema())
 @docs(tags=["Verifiable Services"], summary="Add a verifiable service")
 async def add_service(request: web.BaseRequest):
@@ -70,8 +43,10 @@ async def add_service(request: web.BaseRequest):
 
     cert = params.get("certificate_schema")
     if cert:
-        await certificate_get(context, cert.get("oca_schema_dri"))
-        if cert is None:
+        certificate = await CATALOG_CACHE.certificate(
+            context, cert.get("oca_schema_dri")
+        )
+        if certificate is None:
             raise web.HTTPNotFound(reason="Certificate_schema not found")
 
     service_record = ServiceRecord(
@@ -192,3 +167,55 @@ async def DEBUGrequest_services_list(request: web.BaseRequest):
             time.sleep(1)
 
     raise web.HTTPNotFound(reason="Try again!")
+
+
+class SearchServicesQuerySchema(Schema):
+    label = fields.Str(required=False, description="Prefixes of words in the label")
+    service_schema_dri = fields.Str(required=False)
+    namespace = fields.Str(required=False)
+    consent_schema_dri = fields.Str(required=False)
+    connection_id = fields.Str(required=False)
+    offset = fields.Int(required=False)
+    limit = fields.Int(required=False, description="Services per page, max 1000")
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Search the services discovered from connected agents",
+    description="""
+    Every given criteria has to match, namespace matches the service or
+    the consent schema namespace. Pass offset + limit as offset to get
+    the following page, total is the number of matching services.
+    """,
+)
+@querystring_schema(SearchServicesQuerySchema())
+async def search_services(request: web.BaseRequest):
+    context = request.app["request_context"]
+    query = request.query
+    try:
+        offset = max(0, int(query.get("offset", 0)))
+        limit = max(1, min(int(query.get("limit", 100)), 1000))
+        result, total = await REMOTE_SERVICE_INDEX.search(
+            context,
+            label=query.get("label"),
+            service_schema_dri=query.get("service_schema_dri"),
+            namespace=query.get("namespace"),
+            consent_schema_dri=query.get("consent_schema_dri"),
+            connection_id=query.get("connection_id"),
+            offset=offset,
+            limit=limit,
+        )
+    except ValueError as err:
+        raise web.HTTPBadRequest(reason=str(err))
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.json_response(
+        {
+            "success": True,
+            "result": result,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+        }
+    )
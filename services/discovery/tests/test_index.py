@@ -0,0 +1,69 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from aries_cloudagent.storage.record import StorageRecord
+from asynctest import TestCase as AsyncTestCase
+
+import json
+
+from ..index import REMOTE_SERVICE_INDEX, SERVICE_LIST_RECORD_TYPE
+
+
+def service(service_id, label, schema_dri, consent_dri="consent"):
+    return {
+        "service_id": service_id,
+        "label": label,
+        "service_schema": {"oca_schema_dri": schema_dri, "oca_schema_namespace": "ns"},
+        "consent_schema": {"oca_schema_dri": consent_dri},
+    }
+
+
+class TestRemoteServiceIndex(AsyncTestCase):
+    async def setUp(self):
+        self.context = InjectionContext()
+        self.storage = BasicStorage()
+        self.context.injector.bind_instance(BaseStorage, self.storage)
+        services = [
+            service("1", "Blood test", "blood"),
+            service("2", "Blood pressure", "pressure"),
+        ]
+        await self.storage.add_record(
+            StorageRecord(
+                SERVICE_LIST_RECORD_TYPE, json.dumps(services), {"connection_id": "a"}
+            )
+        )
+
+    async def test_search(self):
+        result, total = await REMOTE_SERVICE_INDEX.search(self.context, label="blo")
+        assert total == 2
+        assert [s["service_id"] for s in result] == ["1", "2"]
+        assert result[0]["connection_id"] == "a"
+
+        result, total = await REMOTE_SERVICE_INDEX.search(
+            self.context, label="blood pre", namespace="ns"
+        )
+        assert [s["service_id"] for s in result] == ["2"]
+
+        result, total = await REMOTE_SERVICE_INDEX.search(
+            self.context, consent_schema_dri="consent", offset=1, limit=1
+        )
+        assert total == 2
+        assert [s["service_id"] for s in result] == ["2"]
+
+    async def test_services_updated(self):
+        await REMOTE_SERVICE_INDEX.search(self.context)
+        await REMOTE_SERVICE_INDEX.services_updated(
+            self.context, "a", [service("3", "Eye exam", "eye")]
+        )
+        await REMOTE_SERVICE_INDEX.services_updated(
+            self.context, "b", [service("1", "Blood test", "blood")]
+        )
+
+        _, total = await REMOTE_SERVICE_INDEX.search(self.context, label="pressure")
+        assert total == 0
+        result, _ = await REMOTE_SERVICE_INDEX.search(
+            self.context, service_schema_dri="blood"
+        )
+        assert [(s["connection_id"], s["service_id"]) for s in result] == [("b", "1")]
+        result, _ = await REMOTE_SERVICE_INDEX.search(self.context, connection_id="a")
+        assert [s["label"] for s in result] == ["Eye exam"]
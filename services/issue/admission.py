@@ -0,0 +1,99 @@
+import logging
+import time
+
+from ..cache import TTLCache
+from ..metrics import REGISTRY
+from ..settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+REASON_RATE = "rate"
+REASON_BUSY = "busy"
+
+
+class AdmissionControl:
+    """
+    Admission of incoming applications: every connection gets a token
+    bucket of burst applications refilled at rate per second, and at most
+    max_concurrency applications are handled at once. Rate 0 turns the
+    buckets off, max_concurrency 0 turns the cap off.
+
+    Applications which are not admitted get answered right away instead
+    of queueing up behind the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate=5.0,
+        burst=20.0,
+        max_concurrency=64,
+        max_connections=10000,
+        clock=time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.rejected = {REASON_RATE: 0, REASON_BUSY: 0}
+        self._clock = clock
+        # connection_id -> [tokens, last refill], idle buckets are full anyway
+        self._buckets = TTLCache(max_size=max_connections, ttl=self._idle_ttl())
+
+    def _idle_ttl(self):
+        return self.burst / self.rate if self.rate else None
+
+    def configure(self, settings):
+        self.rate = get_setting(settings, "application_rate", self.rate)
+        self.burst = get_setting(settings, "application_burst", self.burst)
+        self.max_concurrency = get_setting(
+            settings, "application_max_concurrency", self.max_concurrency
+        )
+        self._buckets.clear()
+        self._buckets.ttl = self._idle_ttl()
+
+    def _take_token(self, connection_id) -> bool:
+        if not self.rate:
+            return True
+        now = self._clock()
+        bucket = self._buckets.get(connection_id)
+        if bucket is None:
+            bucket = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1:
+            return False
+        self._buckets[connection_id] = [tokens - 1, now]
+        return True
+
+    def admit(self, connection_id) -> bool:
+        """Take a slot for an application, release() it when done"""
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            reason = REASON_BUSY
+        elif not self._take_token(connection_id):
+            reason = REASON_RATE
+        else:
+            self.active += 1
+            return True
+
+        self.rejected[reason] += 1
+        LOGGER.warning("Application from %s not admitted: %s", connection_id, reason)
+        return False
+
+    def release(self):
+        self.active -= 1
+
+
+APPLICATION_ADMISSION = AdmissionControl()
+
+REGISTRY.gauge(
+    "verifiable_services_applications_active",
+    "Applications being handled",
+    lambda: APPLICATION_ADMISSION.active,
+)
+REGISTRY.gauge(
+    "verifiable_services_applications_rejected_total",
+    "Applications not admitted by reason",
+    lambda: dict(APPLICATION_ADMISSION.rejected),
+    labelnames=("reason",),
+    metric_type="counter",
+)
@@ -0,0 +1,152 @@
+"""
+Archive of service issues which reached a terminal state, so that
+the service_issue tag searches only go through the live issues.
+
+An archived issue keeps its value (compact JSON) and the tags the issue
+stats count, get-issue/{issue_id} and the report lookup fall back to the
+archive when an issue is not found. The archive record id is the issue id
+with a prefix, storages which key records by id only would otherwise
+take it for the issue record itself.
+"""
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.error import StorageDuplicateError, StorageNotFoundError
+from aries_cloudagent.storage.record import StorageRecord
+
+import asyncio
+import json
+import logging
+import time
+
+from ..settings import get_setting
+from .index import ISSUE_INDEX, timestamp_of
+from .models import ServiceIssueRecord
+from .stats import ARCHIVE_RECORD_TYPE, ISSUE_RECORD_TYPE
+
+LOGGER = logging.getLogger(__name__)
+
+TERMINAL_STATES = (
+    ServiceIssueRecord.ISSUE_REJECTED,
+    ServiceIssueRecord.ISSUE_ACCEPTED,
+    ServiceIssueRecord.ISSUE_CREDENTIAL_RECEIVED,
+)
+ARCHIVED_TAGS = ("state", "author", "service_id", "connection_id", "exchange_id")
+ARCHIVE_ID_PREFIX = "archived."
+
+
+def archive_record(issue: ServiceIssueRecord) -> StorageRecord:
+    tags = issue.record_tags
+    return StorageRecord(
+        ARCHIVE_RECORD_TYPE,
+        json.dumps(issue.value, separators=(",", ":")),
+        {tag: tags[tag] for tag in ARCHIVED_TAGS},
+        ARCHIVE_ID_PREFIX + issue._id,
+    )
+
+
+def issue_from_archive(record: StorageRecord) -> ServiceIssueRecord:
+    issue_id = record.id[len(ARCHIVE_ID_PREFIX) :]
+    return ServiceIssueRecord.from_storage(issue_id, json.loads(record.value))
+
+
+async def retrieve_archived_issue(context, issue_id: str) -> ServiceIssueRecord:
+    storage: BaseStorage = await context.inject(BaseStorage)
+    record = await storage.get_record(ARCHIVE_RECORD_TYPE, ARCHIVE_ID_PREFIX + issue_id)
+    return issue_from_archive(record)
+
+
+async def query_archived_issues(context, tag_filter: dict) -> list:
+    storage: BaseStorage = await context.inject(BaseStorage)
+    records = await storage.search_records(ARCHIVE_RECORD_TYPE, tag_filter).fetch_all()
+    return [issue_from_archive(record) for record in records]
+
+
+class IssueArchiver:
+    """
+    Moves issues in a terminal state, not updated for max_age seconds,
+    to the archive, batch_size issues at a time every interval seconds.
+    Disabled while max_age is 0.
+    """
+
+    def __init__(self, *, max_age=0.0, interval=3600.0, batch_size=100):
+        self.max_age = max_age
+        self.interval = interval
+        self.batch_size = batch_size
+        self.archived = 0
+        self._task = None
+
+    def configure(self, settings):
+        self.max_age = get_setting(settings, "issue_archive_age", self.max_age)
+        self.interval = get_setting(settings, "issue_archive_interval", self.interval)
+        self.batch_size = get_setting(
+            settings, "issue_archive_batch_size", self.batch_size
+        )
+
+    def start(self, context):
+        if not self.max_age or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_event_loop().create_task(self._run(context))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, context):
+        while True:
+            try:
+                await self.archive(context)
+            except Exception:
+                LOGGER.exception("Archiving issues failed")
+            await asyncio.sleep(self.interval)
+
+    async def archive(self, context, now: float = None) -> int:
+        """
+        Archive every issue due, a page of batch_size issues is read from
+        storage and archived before the next one, returns how many
+        """
+        cutoff = (time.time() if now is None else now) - self.max_age
+        storage: BaseStorage = await context.inject(BaseStorage)
+        archived = 0
+        for state in TERMINAL_STATES:
+            search = storage.search_records(ISSUE_RECORD_TYPE, {"state": state})
+            async with search:
+                while True:
+                    async with ServiceIssueRecord.storage_timer("fetch"):
+                        records = await search.fetch(self.batch_size)
+                    if not records:
+                        break
+                    due = []
+                    for record in records:
+                        issue = ServiceIssueRecord.from_storage(
+                            record.id, json.loads(record.value)
+                        )
+                        if timestamp_of(issue.updated_at) < cutoff:
+                            due.append(issue)
+                    archived += await self.archive_batch(context, due)
+                    # let other tasks run between pages
+                    await asyncio.sleep(0)
+        return archived
+
+    async def archive_batch(self, context, issues) -> int:
+        storage: BaseStorage = await context.inject(BaseStorage)
+        archived = 0
+        for issue in issues:
+            try:
+                await storage.add_record(archive_record(issue))
+            except StorageDuplicateError:
+                # archived before, the issue itself was not deleted
+                pass
+            try:
+                await storage.delete_record(issue.storage_record)
+            except StorageNotFoundError:
+                continue
+            await ISSUE_INDEX.record_deleted(context, issue)
+            archived += 1
+
+        self.archived += archived
+        if archived:
+            LOGGER.info("Archived %s issues", archived)
+        return archived
+
+
+ISSUE_ARCHIVER = IssueArchiver()
@@ -1,5 +1,4 @@
 # Acapy
-from ..issue.routes import link_report
 from aries_cloudagent.messaging.base_handler import (
     BaseHandler,
     BaseResponder,
@@ -11,25 +10,47 @@ from aries_cloudagent.holder.base import HolderError, BaseHolder
 from aries_cloudagent.aathcf.credentials import verify_proof
 
 # Exceptions
-from aries_cloudagent.storage.error import StorageNotFoundError
+from aries_cloudagent.storage.error import StorageError, StorageNotFoundError
 
 
 # Internal
 from .message_types import *
 from .models import ServiceIssueRecord
+from .archive import retrieve_archived_issue
+from .admission import APPLICATION_ADMISSION
+from .intake import APPLICATION_INTAKE
+from .rules import auto_decide, AutoDecisionError
 from ..models import ServiceRecord
+from ..cache import TTLCache
+from ..settings import get_setting
+from ..webhooks import enqueue_webhook
+from ..metrics import timed_handler, REGISTRY
+from ..tracing import TRACER, traced_handler
 
 # External
 from collections import OrderedDict
+import hashlib
 import logging
 import json
 
-from aries_cloudagent.pdstorage_thcf.api import *
+from ..pds import *
 from aries_cloudagent.aathcf.utils import debug_handler
 
 LOGGER = logging.getLogger(__name__)
 SERVICE_USER_DATA_TABLE = "service_user_data_table"
 
+# (connection_id, exchange_id) of recent applications -> None while the
+# application is handled, the state it was answered with when no issue
+# got saved (issues are looked up by id instead)
+RECENT_APPLICATIONS = TTLCache(max_size=10000, ttl=600.0)
+
+
+def configure_application_dedup(settings):
+    RECENT_APPLICATIONS.configure(
+        max_size=get_setting(settings, "application_dedup_size", 10000),
+        ttl=get_setting(settings, "application_dedup_ttl", 600.0),
+    )
+
 
 async def send_confirmation(context, responder, exchange_id, state=None):
     """
@@ -44,7 +65,43 @@ async def send_confirmation(context, responder, exchange_id, state=None):
     )
 
     confirmation.assign_thread_from(context.message)
-    await responder.send_reply(confirmation)
+    async with TRACER.span("outbound.Confirmation", state=state):
+        await responder.send_reply(confirmation)
+
+
+# digest of a consent credential -> True, only successful verifications
+# are kept so a bad proof is verified (and rejected) every time
+VERIFIED_PROOFS = TTLCache(max_size=10000, ttl=3600.0)
+PROOF_CACHE = REGISTRY.counter(
+    "verifiable_services_proof_cache_total",
+    "Consent credential verifications by verified proof cache result",
+    labelnames=("result",),
+)
+
+
+def configure_proof_cache(settings):
+    VERIFIED_PROOFS.configure(
+        max_size=get_setting(settings, "proof_cache_size", 10000),
+        ttl=get_setting(settings, "proof_cache_ttl", 3600.0),
+    )
+
+
+def credential_digest(credential: dict) -> str:
+    canonical = json.dumps(credential, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("UTF-8")).hexdigest()
+
+
+async def verify_proof_cached(wallet, credential: dict) -> bool:
+    digest = credential_digest(credential)
+    if digest in VERIFIED_PROOFS:
+        PROOF_CACHE.inc(result="hit")
+        return True
+
+    PROOF_CACHE.inc(result="miss")
+    verified = await verify_proof(wallet, credential)
+    if verified:
+        VERIFIED_PROOFS[digest] = True
+    return verified
 
 
 class ApplicationHandler(BaseHandler):
@@ -53,10 +110,64 @@ class ApplicationHandler(BaseHandler):
     controller that a service application came.
     """
 
+    @timed_handler
+    @traced_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, Application)
-        wallet: BaseWallet = await context.inject(BaseWallet)
+        key = (context.connection_record.connection_id, context.message.exchange_id)
+        # duplicates are cheap to answer and must keep their state,
+        # only new applications take a slot
+        if await self.answer_duplicate(context, responder, key):
+            return
 
+        if not APPLICATION_ADMISSION.admit(key[0]):
+            await send_confirmation(
+                context, responder, key[1], ServiceIssueRecord.ISSUE_OVERLOADED
+            )
+            return
+
+        try:
+            RECENT_APPLICATIONS[key] = None
+            try:
+                await self.handle_application(context, responder, key)
+            except BaseException:
+                # nothing was answered, let a retry go through
+                if RECENT_APPLICATIONS.get(key, "") is None:
+                    RECENT_APPLICATIONS.pop(key)
+                raise
+        finally:
+            APPLICATION_ADMISSION.release()
+
+    async def answer_duplicate(self, context, responder, key) -> bool:
+        """
+        Replays and retries of an application are answered with the state
+        of the exchange, before any of the work is repeated
+        """
+        connection_id, exchange_id = key
+        if key in RECENT_APPLICATIONS:
+            state = RECENT_APPLICATIONS.get(key) or ServiceIssueRecord.ISSUE_PENDING
+        else:
+            issue_id = ServiceIssueRecord.exchange_record_id(connection_id, exchange_id)
+            try:
+                issue = await ServiceIssueRecord.retrieve_by_id(context, issue_id)
+            except StorageNotFoundError:
+                try:
+                    issue = await retrieve_archived_issue(context, issue_id)
+                except StorageNotFoundError:
+                    return False
+            state = issue.state
+            if state == ServiceIssueRecord.ISSUE_QUEUED:
+                state = ServiceIssueRecord.ISSUE_PENDING
+
+        LOGGER.info("Duplicate application %s answered with %s", exchange_id, state)
+        await send_confirmation(context, responder, exchange_id, state)
+        return True
+
+    async def reject(self, context, responder, key, state):
+        RECENT_APPLICATIONS[key] = state
+        await send_confirmation(context, responder, key[1], state)
+
+    async def handle_application(self, context, responder, key):
         consent = context.message.consent_credential
         consent = json.loads(consent, object_pairs_hook=OrderedDict)
 
@@ -68,11 +179,8 @@ class ApplicationHandler(BaseHandler):
             )
         except StorageNotFoundError as err:
             LOGGER.warn(err)
-            await send_confirmation(
-                context,
-                responder,
-                context.message.exchange_id,
-                ServiceIssueRecord.ISSUE_SERVICE_NOT_FOUND,
+            await self.reject(
+                context, responder, key, ServiceIssueRecord.ISSUE_SERVICE_NOT_FOUND
             )
             return
 
@@ -93,11 +201,8 @@ class ApplicationHandler(BaseHandler):
         )
 
         if is_malformed:
-            await send_confirmation(
-                context,
-                responder,
-                context.message.exchange_id,
-                ServiceIssueRecord.ISSUE_REJECTED,
+            await self.reject(
+                context, responder, key, ServiceIssueRecord.ISSUE_REJECTED
             )
             raise HandlerException(
                 f"Ismalformed? {is_malformed} Incoming consent"
@@ -107,39 +212,111 @@ class ApplicationHandler(BaseHandler):
                 f"oca_dri {cred_content['oca_schema_dri'] != oca_dri}"
             )
 
-        if not await verify_proof(wallet, consent):
-            await send_confirmation(
-                context,
-                responder,
-                context.message.exchange_id,
-                ServiceIssueRecord.ISSUE_REJECTED,
+        if APPLICATION_INTAKE.enabled:
+            await self.queue_application(context, responder, key, service, consent)
+            return
+
+        if not await self.verify_consent(context, consent):
+            await self.reject(
+                context, responder, key, ServiceIssueRecord.ISSUE_REJECTED
             )
             raise HandlerException(
                 f"Credential failed the verification process {consent}"
             )
 
-        user_data_dri = await pds_save_a(
+        issue = self.new_issue(context, service)
+        await self.store_application(context, issue, service, consent)
+
+        await issue.save(context)
+        # from now on duplicates are answered from the issue
+        RECENT_APPLICATIONS.pop(key)
+
+        await send_confirmation(
             context,
-            context.message.service_user_data,
-            oca_schema_dri=oca_dri,
-            table=SERVICE_USER_DATA_TABLE,
+            responder,
+            context.message.exchange_id,
+            ServiceIssueRecord.ISSUE_PENDING,
         )
-        assert user_data_dri == context.message.service_user_data_dri
+        await self.announce_application(context, responder, issue, consent)
+
+    async def announce_application(self, context, responder, issue, consent):
+        """
+        Apply the decision policy of the service, the controller is
+        notified of the issues that are left pending
+        """
+        try:
+            decision = await auto_decide(context, responder, issue, consent)
+        except AutoDecisionError as err:
+            # the failed decision could have saved the issue already
+            try:
+                issue = await ServiceIssueRecord.retrieve_by_id(context, issue._id)
+                pending = issue.state == ServiceIssueRecord.ISSUE_PENDING
+            except StorageError:
+                pending = False
+            if not pending:
+                enqueue_webhook(
+                    responder,
+                    "verifiable-services/application-auto-decision-failed",
+                    {
+                        "issue": issue.serialize(),
+                        "issue_id": issue._id,
+                        "decision": err.decision,
+                        "error": str(err),
+                    },
+                )
+                return
+            decision = None
 
-        issue = ServiceIssueRecord(
+        if decision is not None:
+            enqueue_webhook(
+                responder,
+                "verifiable-services/application-auto-decided",
+                {
+                    "issue": issue.serialize(),
+                    "issue_id": issue._id,
+                    "decision": decision,
+                },
+            )
+            return
+
+        enqueue_webhook(
+            responder,
+            "verifiable-services/incoming-pending-application",
+            {
+                "issue": issue.serialize(),
+                "issue_id": issue._id,
+            },
+        )
+
+    async def verify_consent(self, context, consent) -> bool:
+        wallet: BaseWallet = await context.inject(BaseWallet)
+        async with TRACER.span("verify_proof"):
+            return await verify_proof_cached(wallet, consent)
+
+    def new_issue(self, context, service) -> ServiceIssueRecord:
+        return ServiceIssueRecord(
             state=ServiceIssueRecord.ISSUE_PENDING,
             author=ServiceIssueRecord.AUTHOR_OTHER,
             connection_id=context.connection_record.connection_id,
             exchange_id=context.message.exchange_id,
             service_id=context.message.service_id,
             service_consent_match_id=context.message.service_consent_match_id,
-            service_user_data_dri=user_data_dri,
             service_schema=service["service_schema"],
             service_consent_schema=service["consent_schema"],
             label=service["label"],
             their_public_did=context.message.public_did,
         )
 
+    async def store_application(self, context, issue, service, consent):
+        """Save the user data and the consent credential to the PDS"""
+        issue.service_user_data_dri = await pds_save_a(
+            context,
+            context.message.service_user_data,
+            oca_schema_dri=service["consent_schema"]["oca_schema_dri"],
+            table=SERVICE_USER_DATA_TABLE,
+        )
+        assert issue.service_user_data_dri == context.message.service_user_data_dri
+
         consent_cred_dri = await issue.user_consent_credential_pds_set(context, consent)
         await pds_link_dri(
             context,
@@ -147,22 +324,60 @@ class ApplicationHandler(BaseHandler):
             consent_cred_dri,
         )
 
-        issue_id = await issue.save(context)
+    async def queue_application(self, context, responder, key, service, consent):
+        """
+        Persist a queued issue, acknowledge it as pending and leave the
+        proof verification and the PDS writes to the intake workers
+        """
+        if APPLICATION_INTAKE.is_full:
+            RECENT_APPLICATIONS.pop(key)
+            await send_confirmation(
+                context, responder, key[1], ServiceIssueRecord.ISSUE_OVERLOADED
+            )
+            return
+
+        issue = self.new_issue(context, service)
+        issue.state = ServiceIssueRecord.ISSUE_QUEUED
+        await issue.save(context, reason="Application queued")
+        RECENT_APPLICATIONS.pop(key)
+
+        async def process():
+            async with TRACER.span("intake.Application", exchange_id=key[1]):
+                await self.process_queued(context, responder, issue, service, consent)
+
+        if not APPLICATION_INTAKE.submit(process):
+            await issue.delete_record(context)
+            await send_confirmation(
+                context, responder, key[1], ServiceIssueRecord.ISSUE_OVERLOADED
+            )
+            return
 
         await send_confirmation(
-            context,
-            responder,
-            context.message.exchange_id,
-            ServiceIssueRecord.ISSUE_PENDING,
+            context, responder, key[1], ServiceIssueRecord.ISSUE_PENDING
         )
 
-        await responder.send_webhook(
-            "verifiable-services/incoming-pending-application",
-            {
-                "issue": issue.serialize(),
-                "issue_id": issue_id,
-            },
-        )
+    async def process_queued(self, context, responder, issue, service, consent):
+        """The queued issue becomes pending or gets rejected, never stays queued"""
+        try:
+            verified = await self.verify_consent(context, consent)
+            if verified:
+                await self.store_application(context, issue, service, consent)
+                issue.state = ServiceIssueRecord.ISSUE_PENDING
+                await issue.save(context, reason="Application processed")
+        except Exception as err:
+            issue.state = ServiceIssueRecord.ISSUE_REJECTED
+            issue.error = getattr(err, "roll_up", None) or str(err)
+            await issue.save(context, reason="Processing the application failed")
+            await send_confirmation(context, responder, issue.exchange_id, issue.state)
+            raise
+
+        if not verified:
+            issue.state = ServiceIssueRecord.ISSUE_REJECTED
+            await issue.save(context, reason="Credential failed the verification")
+            await send_confirmation(context, responder, issue.exchange_id, issue.state)
+            return
+
+        await self.announce_application(context, responder, issue, consent)
 
 
 class ApplicationResponseHandler(BaseHandler):
@@ -171,6 +386,8 @@ class ApplicationResponseHandler(BaseHandler):
     So makes sure the credential is correct and saves it
     """
 
+    @timed_handler
+    @traced_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, ApplicationResponse)
 
@@ -182,38 +399,46 @@ class ApplicationResponseHandler(BaseHandler):
             )
         )
 
-        credential_dri = None
+        credential = json.loads(
+            context.message.credential, object_pairs_hook=OrderedDict
+        )
+        holder: BaseHolder = await context.inject(BaseHolder)
+
+        async def store_credential():
+            async with TRACER.span("holder.store_credential"):
+                return await holder.store_credential(
+                    credential_definition={},
+                    credential_data=credential,
+                    credential_request_metadata={},
+                )
+
         try:
-            await pds_save_a(context, context.message.credential_data)
-            credential = json.loads(
-                context.message.credential, object_pairs_hook=OrderedDict
-            )
-            holder: BaseHolder = await context.inject(BaseHolder)
-            credential_dri = await holder.store_credential(
-                credential_definition={},
-                credential_data=credential,
-                credential_request_metadata={},
-            )
+            credential_dri = await store_credential()
             self._logger.info("Stored Credential ID %s", credential_dri)
         except HolderError as err:
             raise HandlerException(err.roll_up)
 
-        await pds_link_dri(
+        # nothing is saved to the PDS for a credential the holder refused
+        _, issue.report_data_dri = await save_many(
             context,
-            issue.user_consent_credential_dri,
-            credential_dri,
+            [
+                (context.message.credential_data, {}),
+                (context.message.report_data, {}),
+            ],
         )
 
-        issue.report_data_dri = await pds_save_a(context, context.message.report_data)
-        await link_report(
-            context, credential_dri, issue.report_data_dri, issue.exchange_id
-        )
+        graph = LinkGraph()
+        graph.link(issue.user_consent_credential_dri, credential_dri)
+        graph.report(credential_dri, issue.report_data_dri, issue.exchange_id)
+        await graph.commit(context)
+
         issue.credential_id = credential_dri
         issue.state = ServiceIssueRecord.ISSUE_CREDENTIAL_RECEIVED
 
         await issue.save(context)
 
-        await responder.send_webhook(
+        enqueue_webhook(
+            responder,
             "verifiable-services/credential-received",
             {
                 "credential_dri": credential_dri,
@@ -229,6 +454,8 @@ class ConfirmationHandler(BaseHandler):
     TODO: ProblemReport ? Maybe there is a better way to handle this.
     """
 
+    @timed_handler
+    @traced_handler
     async def handle(self, context: RequestContext, responder: BaseResponder):
         debug_handler(self._logger.debug, context, Confirmation)
         record: ServiceIssueRecord = (
@@ -242,7 +469,8 @@ class ConfirmationHandler(BaseHandler):
         record.state = context.message.state
         record_id = await record.save(context, reason="Updated issue state")
 
-        await responder.send_webhook(
+        enqueue_webhook(
+            responder,
             "verifiable-services/issue-state-update",
             {"state": record.state, "issue_id": record_id, "issue": record.serialize()},
         )
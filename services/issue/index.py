@@ -0,0 +1,180 @@
+from aries_cloudagent.messaging.util import str_to_datetime
+from aries_cloudagent.storage.base import BaseStorage
+
+from bisect import bisect_left, bisect_right, insort
+import asyncio
+import base64
+import json
+import logging
+
+from .stats import ISSUE_RECORD_TYPE, ISSUE_STATS
+
+LOGGER = logging.getLogger(__name__)
+
+# key of the index over every issue, can't collide with an author
+ALL_AUTHORS = ("all",)
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("UTF-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, issue_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(timestamp), str(issue_id)
+    except (ValueError, TypeError) as err:
+        raise CursorError(f"Invalid cursor {cursor}") from err
+
+
+def timestamp_of(updated_at) -> float:
+    if not updated_at:
+        return 0.0
+    return str_to_datetime(updated_at).timestamp()
+
+
+class IssueIndex:
+    """
+    Issue ids ordered by updated_at, for all issues and per author,
+    built once from storage and kept up to date by
+    ServiceIssueRecord.post_save / delete_record. Pages of the newest
+    issues are read by cursor without touching the rest of the records.
+
+    The index is tied to the storage instance it was built from and lives
+    in memory only: building it reads every issue record, O(n) in the
+    number of live issues, which warm_up_issue_views does on start.
+    """
+
+    def __init__(self):
+        self._storage = None
+        # author (ALL_AUTHORS for every issue) -> sorted [(timestamp, issue_id)]
+        self._keys = None
+        # issue_id -> (author, key)
+        self._entries = None
+        self._version = 0
+        self._rebuilding = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._keys is not None
+
+    async def _same_storage(self, context) -> bool:
+        storage = await context.inject(BaseStorage)
+        if self._storage is not storage:
+            self._storage = storage
+            self._keys = None
+            self._entries = None
+            self._version += 1
+            return False
+        return True
+
+    def _insert(self, keys, entries, issue_id, author, updated_at):
+        key = (timestamp_of(updated_at), issue_id)
+        entries[issue_id] = (author, key)
+        insort(keys.setdefault(ALL_AUTHORS, []), key)
+        insort(keys.setdefault(author, []), key)
+
+    def _remove(self, issue_id):
+        entry = self._entries.pop(issue_id, None)
+        if entry is None:
+            return
+        author, key = entry
+        for name in (ALL_AUTHORS, author):
+            keys = self._keys.get(name, [])
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    async def record_saved(self, context, issue):
+        if not await self._same_storage(context):
+            return
+        self._version += 1
+        if self._keys is None:
+            return
+        self._remove(issue._id)
+        self._insert(
+            self._keys, self._entries, issue._id, issue.author, issue.updated_at
+        )
+
+    async def record_deleted(self, context, issue):
+        if not await self._same_storage(context):
+            return
+        self._version += 1
+        if self._keys is not None:
+            self._remove(issue._id)
+
+    async def rebuild(self, context):
+        """Reindex the issues from storage, concurrent callers share a rebuild"""
+        if self._rebuilding is None or self._rebuilding.done():
+            self._rebuilding = asyncio.ensure_future(self._rebuild(context))
+        await asyncio.shield(self._rebuilding)
+
+    async def _rebuild(self, context):
+        await self._same_storage(context)
+        storage: BaseStorage = self._storage
+        for _ in range(3):
+            version = self._version
+            records = await storage.search_records(ISSUE_RECORD_TYPE).fetch_all()
+            keys, entries = {}, {}
+            for record in records:
+                value = json.loads(record.value)
+                author, updated_at = value.get("author"), value.get("updated_at")
+                self._insert(keys, entries, record.id, author, updated_at)
+            if version == self._version:
+                break
+        else:
+            LOGGER.warning("Issues kept changing while rebuilding the issue index")
+
+        self._keys, self._entries = keys, entries
+
+    async def newest(
+        self,
+        context,
+        limit: int,
+        *,
+        author: str = None,
+        before: str = None,
+        since: str = None,
+    ):
+        """
+        Ids of the newest issues, newest first, with the cursors of the
+        oldest (next) and the newest (latest) issue on the page.
+        before - next cursor of a previous page, returns the issues after it
+        since - latest cursor of a previous page, returns only newer issues
+        """
+        if not await self._same_storage(context) or self._keys is None:
+            await self.rebuild(context)
+
+        keys = self._keys.get(ALL_AUTHORS if author is None else author, [])
+        end = len(keys)
+        if before is not None:
+            end = bisect_left(keys, decode_cursor(before))
+        start = 0
+        if since is not None:
+            start = bisect_right(keys, decode_cursor(since))
+
+        page = keys[max(start, end - limit) : end][::-1]
+        if not page:
+            return [], before, since
+        ids = [issue_id for _, issue_id in page]
+        return ids, encode_cursor(page[-1]), encode_cursor(page[0])
+
+
+ISSUE_INDEX = IssueIndex()
+
+
+async def warm_up_issue_views(context):
+    """
+    Build the issue index and the issue stats on start, both read every
+    issue record once, so that the first request doesn't pay for it.
+    Requests which come in the meantime wait for the same rebuild.
+    """
+    for view in (ISSUE_INDEX, ISSUE_STATS):
+        try:
+            await view.rebuild(context)
+        except Exception as err:
+            LOGGER.warning("Building %s on start failed: %s", type(view).__name__, err)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+
+from ..metrics import REGISTRY, OUTCOME_SUCCESS, timed
+from ..settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+INTAKE_LATENCY = REGISTRY.histogram(
+    "verifiable_services_intake_seconds",
+    "Time queued applications wait for a worker and take to process",
+    ("stage", "outcome"),
+)
+
+
+class ApplicationIntake:
+    """
+    Bounded queue of accepted applications and a pool of workers which do
+    the heavy part of handling them (proof verification, PDS writes), so
+    that the handler can acknowledge an application right away.
+
+    Off by default, applications are then handled inline.
+    """
+
+    def __init__(self, *, enabled=False, max_size: int = 1000, workers: int = 8):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.workers = workers
+        self.stats = {"submitted": 0, "processed": 0, "failed": 0, "dropped": 0}
+        self._queue = None
+        self._workers = []
+        self._loop = None
+
+    def configure(self, settings):
+        self.enabled = get_setting(settings, "application_intake", self.enabled)
+        self.max_size = get_setting(
+            settings, "application_intake_queue_size", self.max_size
+        )
+        self.workers = get_setting(settings, "application_intake_workers", self.workers)
+        # pick up the new sizes on the next submit
+        if self._queue is not None and self._queue.empty():
+            for worker in self._workers:
+                worker.cancel()
+            self._queue = None
+            self._workers = []
+            self._loop = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def _ensure_workers(self):
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._workers = []
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(loop.create_task(self._run()))
+
+    def submit(self, job) -> bool:
+        """
+        Queue job, a coroutine function without arguments,
+        returns False if the queue is full
+        """
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((job, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            LOGGER.warning("Application intake queue is full (%s)", self.max_size)
+            return False
+
+        self.stats["submitted"] += 1
+        return True
+
+    async def join(self):
+        """Wait until every queued application is processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self):
+        while True:
+            job, queued_at = await self._queue.get()
+            INTAKE_LATENCY.observe(
+                time.perf_counter() - queued_at, stage="wait", outcome=OUTCOME_SUCCESS
+            )
+            try:
+                async with timed(INTAKE_LATENCY, stage="process"):
+                    await job()
+                self.stats["processed"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+                LOGGER.exception("Processing a queued application failed")
+            finally:
+                self._queue.task_done()
+
+
+APPLICATION_INTAKE = ApplicationIntake()
+
+REGISTRY.gauge(
+    "verifiable_services_intake_queue_depth",
+    "Applications waiting for an intake worker",
+    lambda: APPLICATION_INTAKE.depth,
+)
+REGISTRY.gauge(
+    "verifiable_services_intake_total",
+    "Queued applications by outcome",
+    lambda: dict(APPLICATION_INTAKE.stats),
+    labelnames=("outcome",),
+    metric_type="counter",
+)
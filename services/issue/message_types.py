@@ -1,7 +1,6 @@
 from ..util import generate_model_schema
 from marshmallow import Schema, fields
 from aries_cloudagent.messaging.agent_message import AgentMessage, AgentMessageSchema
-from ..models import ConsentSchema, ServiceSchema
 
 # Message Types
 PROTOCOL_URI = "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/verifiable-services/1.0"
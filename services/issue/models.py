@@ -9,9 +9,12 @@ from marshmallow import fields, Schema
 from typing import Mapping, Any
 import uuid
 import json
-from aries_cloudagent.pdstorage_thcf.api import *
+from ..pds import *
 
 from ..models import ConsentSchema, ServiceSchema
+from ..records import HashIdRecord
+from .stats import ISSUE_STATS
+from .index import ISSUE_INDEX
 
 
 # def create_pds_setter(self, value_name):
@@ -25,7 +28,7 @@ from ..models import ConsentSchema, ServiceSchema
 #     setattr(self, value_name + "_pds_set", pds_setter)
 
 
-class ServiceIssueRecord(BaseRecord):
+class ServiceIssueRecord(HashIdRecord):
     """
     dri - (without oca) identifier pointing to a public storage record in a
     active data vault
@@ -41,9 +44,16 @@ class ServiceIssueRecord(BaseRecord):
     ISSUE_SERVICE_LEDGER_ERROR = "ledger error"
     ISSUE_CREDENTIAL_DEFINITION_PREPARATION_COMPLETE = "cred prep complete"
     ISSUE_PENDING = "pending"
+    # application waits for the intake workers, it becomes pending
+    # once the proof is verified and the data is saved
+    ISSUE_QUEUED = "queued"
     ISSUE_REJECTED = "rejected"
     ISSUE_ACCEPTED = "accepted"
     ISSUE_CREDENTIAL_RECEIVED = "credential_received"
+    # application was not admitted, the holder can apply again later
+    ISSUE_OVERLOADED = "overloaded"
+    # background apply failed before the application was sent, see error
+    ISSUE_APPLY_FAILED = "apply failed"
 
     AUTHOR_SELF = "self"
     AUTHOR_OTHER = "other"
@@ -70,6 +80,7 @@ class ServiceIssueRecord(BaseRecord):
         their_public_did: str = None,
         report_data_dri: dict = None,
         exchange_id: str = None,
+        error: str = None,
         record_id: str = None,
         **keywordArgs,
     ):
@@ -89,6 +100,7 @@ class ServiceIssueRecord(BaseRecord):
         self.their_public_did = their_public_did
         self.user_consent_credential_dri = user_consent_credential_dri
         self.report_data_dri = report_data_dri
+        self.error = error
 
     @property
     def record_value(self) -> dict:
@@ -111,6 +123,7 @@ class ServiceIssueRecord(BaseRecord):
                 "credential_id",
                 "their_public_did",
                 "report_data_dri",
+                "error",
             )
         }
 
@@ -139,6 +152,21 @@ class ServiceIssueRecord(BaseRecord):
             "label": self.label,
         }
 
+    async def post_save(self, context, new_record, last_state, *args, **kwargs):
+        await super().post_save(context, new_record, last_state, *args, **kwargs)
+        await ISSUE_STATS.record_saved(context, self, new_record, last_state)
+        await ISSUE_INDEX.record_saved(context, self)
+
+    async def delete_record(self, context):
+        await super().delete_record(context)
+        await ISSUE_STATS.record_deleted(context, self)
+        await ISSUE_INDEX.record_deleted(context, self)
+
+    @classmethod
+    def exchange_record_id(cls, connection_id: str, exchange_id: str) -> str:
+        """Id of the issue of an exchange, retrieves it without a tag search"""
+        return cls.hash_id({"connection_id": connection_id, "exchange_id": exchange_id})
+
     @classmethod
     async def retrieve_by_exchange_id_and_connection_id(
         cls, context: InjectionContext, exchange_id: str, connection_id: str
@@ -172,60 +200,6 @@ class ServiceIssueRecord(BaseRecord):
         credential = await pds_load(context, self.user_consent_credential_dri)
         return credential
 
-    async def save(
-        self,
-        context: InjectionContext,
-        *,
-        reason: str = None,
-        log_params: Mapping[str, Any] = None,
-        log_override: bool = False,
-        webhook: bool = None,
-    ) -> str:
-        """Persist the record to storage.
-
-        Args:
-            context: The injection context to use
-            reason: A reason to add to the log
-            log_params: Additional parameters to log
-            webhook: Flag to override whether the webhook is sent
-
-         NOTE: only deviation from the standard
-               is in id generation (hash based)
-        """
-        new_record = None
-        log_reason = reason or ("Updated record" if self._id else "Created record")
-        try:
-            self.updated_at = time_now()
-            storage: BaseStorage = await context.inject(BaseStorage)
-            if not self._id:
-                # NOTE: only change here, calculating id
-                unique_record_value = json.dumps(self.unique_record_values)
-                print(unique_record_value)
-                self._id = hashlib.sha256(
-                    unique_record_value.encode("UTF-8")
-                ).hexdigest()
-
-                self.created_at = self.updated_at
-                await storage.add_record(self.storage_record)
-                new_record = True
-            else:
-                record = self.storage_record
-                await storage.update_record_value(record, record.value)
-                await storage.update_record_tags(record, record.tags)
-                new_record = False
-        finally:
-            params = {self.RECORD_TYPE: self.serialize()}
-            if log_params:
-                params.update(log_params)
-            if new_record is None:
-                log_reason = f"FAILED: {log_reason}"
-            self.log_state(context, log_reason, params, override=log_override)
-
-        await self.post_save(context, new_record, self._last_state, webhook)
-        self._last_state = self.state
-
-        return self._id
-
 
 class ServiceIssueRecordSchema(BaseRecordSchema):
     class Meta:
@@ -243,3 +217,4 @@ class ServiceIssueRecordSchema(BaseRecordSchema):
     service_user_data_dri = fields.Str(required=False)
     their_public_did = fields.Str(required=False)
     report_data_dri = fields.Str(required=False)
+    error = fields.Str(required=False)
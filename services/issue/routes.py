@@ -1,30 +1,40 @@
-from ..discovery.routes import certificate_get
 from aries_cloudagent.connections.models.connection_record import ConnectionRecord
 from aries_cloudagent.storage.error import *
 
 from aries_cloudagent.storage.base import BaseStorage
 from aries_cloudagent.issuer.base import BaseIssuer
 from aries_cloudagent.wallet.base import BaseWallet
+from aries_cloudagent.messaging.responder import BaseResponder
 
 from aiohttp import web
-from aiohttp_apispec import docs, request_schema, match_info_schema
+from aiohttp_apispec import docs, request_schema, match_info_schema, querystring_schema
 
-from marshmallow import fields, Schema
+from marshmallow import fields, Schema, validate
+import asyncio
 import logging
 import json
+import uuid
 
 from .models import *
 from .message_types import *
+from .stats import ISSUE_STATS
+from .index import ISSUE_INDEX, CursorError
+from .archive import retrieve_archived_issue, query_archived_issues
+from .rules import DecisionPolicyRecord, DecisionRuleSchema, DECISIONS
 from ..models import *
 from ..consents.models.given_consent import ConsentGivenRecord
 from ..discovery.message_types import DiscoveryServiceSchema
-from aries_cloudagent.pdstorage_thcf.api import *
+from ..catalog.cache import CATALOG_CACHE
+from ..metrics import timed, STORAGE_LATENCY
+from ..tracing import TRACER
+from ..pds import *
+from ..settings import get_setting
+from ..webhooks import enqueue_webhook
 from aries_cloudagent.protocols.issue_credential.v1_1.utils import (
     retrieve_connection,
 )
 from ..util import *
 from aries_cloudagent.protocols.present_proof.v1_1.routes import verify_usage_policy
-from aries_cloudagent.aathcf.utils import run_standalone_async, build_context
 
 LOGGER = logging.getLogger(__name__)
 MY_SERVICE_DATA_TABLE = "my_service_data_table"
@@ -35,6 +45,7 @@ class ApplySchema(Schema):
     connection_id = fields.Str(required=True)
     user_data = fields.Str(required=True)
     service = fields.Nested(DiscoveryServiceSchema(), required=True)
+    background = fields.Bool(required=False)
 
 
 async def get_public_did(context):
@@ -51,6 +62,13 @@ async def get_public_did(context):
 @docs(
     tags=["Verifiable Services"],
     summary="Apply to a service that connected agent provides",
+    description="""
+    background - return the exchange_id as soon as the issue is saved and
+    apply in the background, progress is sent with issue-state-update
+    webhooks. If applying fails before the application is sent the issue
+    gets the "apply failed" state and the error, after it is sent only
+    the error. Defaults to the apply_background setting.
+    """,
 )
 @request_schema(ApplySchema())
 async def apply(request: web.BaseRequest):
@@ -58,20 +76,115 @@ async def apply(request: web.BaseRequest):
     outbound_handler = request.app["outbound_message_router"]
 
     params = await request.json()
-    connection_id = params["connection_id"]
-    service_user_data = params["user_data"]
-    service_id = params["service"]["service_id"]
+    exchange_id = str(uuid.uuid4())
+    background = params.get("background")
+    if background is None:
+        background = get_setting(context.settings, "apply_background", False)
+
+    if background:
+        record = await apply_in_background(
+            context, outbound_handler, params, exchange_id
+        )
+        return web.json_response(
+            {"success": True, "exchange_id": exchange_id, "issue_id": record._id}
+        )
 
-    # service consent and service to check for correctness
-    service_consent_schema = params["service"]["consent_schema"]
-    service_schema = params["service"]["service_schema"]
-    service_label = params["service"]["label"]
+    async with TRACER.span("apply", exchange_id=exchange_id):
+        await apply_(context, outbound_handler, params, exchange_id)
+
+    return web.json_response({"success": True, "exchange_id": exchange_id})
 
-    connection = await retrieve_connection(context, connection_id)
 
-    service_consent_match_id = str(uuid.uuid4())
+def new_application_issue(params, exchange_id) -> ServiceIssueRecord:
+    service = params["service"]
+    return ServiceIssueRecord(
+        connection_id=params["connection_id"],
+        exchange_id=exchange_id,
+        state=ServiceIssueRecord.ISSUE_WAITING_FOR_RESPONSE,
+        author=ServiceIssueRecord.AUTHOR_SELF,
+        label=service["label"],
+        service_consent_schema=service["consent_schema"],
+        service_id=service["service_id"],
+        service_schema=service["service_schema"],
+        service_consent_match_id=str(uuid.uuid4()),
+    )
 
-    service_consent_copy = service_consent_schema.copy()
+
+# keeps the background applies from being garbage collected
+BACKGROUND_APPLIES = set()
+
+
+async def apply_in_background(context, outbound_handler, params, exchange_id):
+    """Save the issue and leave the rest of apply_ to a background task"""
+    await retrieve_connection(context, params["connection_id"])
+    record = new_application_issue(params, exchange_id)
+    await record.save(context, reason="Applying in background")
+
+    task = asyncio.ensure_future(
+        complete_in_background(context, outbound_handler, params, record)
+    )
+    BACKGROUND_APPLIES.add(task)
+    task.add_done_callback(BACKGROUND_APPLIES.discard)
+    return record
+
+
+async def complete_in_background(context, outbound_handler, params, record):
+    responder = await context.inject(BaseResponder, required=False)
+    async with TRACER.span("apply", exchange_id=record.exchange_id):
+        try:
+            credential = await send_application(
+                context, outbound_handler, params, record
+            )
+        except Exception as err:
+            LOGGER.exception("Background apply %s failed", record.exchange_id)
+            record.state = ServiceIssueRecord.ISSUE_APPLY_FAILED
+            record.error = getattr(err, "roll_up", None) or str(err)
+            await record.save(context, reason="Background apply failed")
+        else:
+            try:
+                await record_given_consent(context, record, credential)
+            except Exception as err:
+                # the application is out, its state is left to the exchange
+                LOGGER.exception(
+                    "Background apply %s failed after sending", record.exchange_id
+                )
+                record = await ServiceIssueRecord.retrieve_by_id(context, record._id)
+                record.error = getattr(err, "roll_up", None) or str(err)
+                await record.save(context, reason="Background apply failed")
+
+    if responder is not None:
+        enqueue_webhook(
+            responder,
+            "verifiable-services/issue-state-update",
+            {
+                "state": record.state,
+                "issue_id": record._id,
+                "issue": record.serialize(),
+            },
+        )
+
+
+async def apply_(context, outbound_handler, params, exchange_id):
+    await retrieve_connection(context, params["connection_id"])
+    record = new_application_issue(params, exchange_id)
+    await complete_application(context, outbound_handler, params, record)
+
+
+async def complete_application(context, outbound_handler, params, record):
+    """Create the consent credential, save the data and send the Application"""
+    credential = await send_application(context, outbound_handler, params, record)
+    await record_given_consent(context, record, credential)
+
+
+async def send_application(context, outbound_handler, params, record):
+    """Everything up to sending the Application, returns the consent credential"""
+    connection_id = record.connection_id
+    service_user_data = params["user_data"]
+    service_schema = record.service_schema
+    service_consent_match_id = record.service_consent_match_id
+
+    # service consent and service to check for correctness
+    service_consent_copy = record.service_consent_schema.copy()
     service_consent_copy.pop("oca_data", None)
     usage_policy = await pds_get_usage_policy_if_active_pds_supports_it(context)
     credential_values = {"service_consent_match_id": service_consent_match_id}
@@ -80,25 +193,28 @@ async def apply(request: web.BaseRequest):
     credential_values.update(service_consent_copy)
 
     issuer: BaseIssuer = await context.inject(BaseIssuer)
-    credential = await issuer.create_credential_ex(credential_values)
+    async with TRACER.span("issuer.create_credential_ex"):
+        credential = await issuer.create_credential_ex(credential_values)
 
     service_appliance_data = service_user_data
     if isinstance(service_appliance_data, str):
         service_appliance_data = json.loads(service_appliance_data)
 
     payload_key = "p"
+    chunks = []
     for schema_dri in service_appliance_data:
         dri = schema_dri.replace("DRI:", "")
 
         if payload_key not in service_appliance_data[schema_dri]:
             continue
 
-        await pds_save_a(
-            context,
-            service_appliance_data[schema_dri][payload_key],
-            oca_schema_dri=dri,
-            table=OCA_DATA_CHUNKS + "." + dri,
+        chunks.append(
+            (
+                service_appliance_data[schema_dri][payload_key],
+                {"oca_schema_dri": dri, "table": OCA_DATA_CHUNKS + "." + dri},
+            )
         )
+    await save_many(context, chunks)
 
     service_user_data_dri = await pds_save_a(
         context,
@@ -107,18 +223,7 @@ async def apply(request: web.BaseRequest):
         table=MY_SERVICE_DATA_TABLE,
     )
 
-    record = ServiceIssueRecord(
-        connection_id=connection_id,
-        state=ServiceIssueRecord.ISSUE_WAITING_FOR_RESPONSE,
-        author=ServiceIssueRecord.AUTHOR_SELF,
-        label=service_label,
-        service_consent_schema=service_consent_schema,
-        service_id=service_id,
-        service_schema=service_schema,
-        service_user_data_dri=service_user_data_dri,
-        service_consent_match_id=service_consent_match_id,
-    )
-
+    record.service_user_data_dri = service_user_data_dri
     await record.save(context)
 
     """ 
@@ -141,14 +246,14 @@ async def apply(request: web.BaseRequest):
         consent_credential=credential,
         public_did=public_did,
     )
-    await outbound_handler(request, connection_id=connection_id)
-
-    """
+    async with TRACER.span("outbound.Application"):
+        await outbound_handler(request, connection_id=connection_id)
+    return credential
 
-    Record the given credential
-
-    """
 
+async def record_given_consent(context, record, credential):
+    """Record the consent credential given with the Application"""
+    connection_id = record.connection_id
     consent_given_record = ConsentGivenRecord(connection_id=connection_id)
     await consent_given_record.credential_pds_set(context, credential)
     await consent_given_record.save(context)
@@ -156,12 +261,11 @@ async def apply(request: web.BaseRequest):
     # record.user_consent_credential_dri = consent_given_record.credential_dri
     await record.save(context)
 
-    return web.json_response({"success": True, "exchange_id": record.exchange_id})
-
 
 async def send_confirmation(outbound_handler, connection_id, exchange_id, state):
     confirmation = Confirmation(exchange_id=exchange_id, state=state)
-    await outbound_handler(confirmation, connection_id=connection_id)
+    async with TRACER.span("outbound.Confirmation", state=state):
+        await outbound_handler(confirmation, connection_id=connection_id)
 
 
 class ProcessApplicationSchema(Schema):
@@ -170,18 +274,6 @@ class ProcessApplicationSchema(Schema):
     data = fields.Dict(required=True)
 
 
-async def link_report(context, cred_dri, report_data_dri, exchange_id):
-
-    report_pointer_dri = await pds_save_a(
-        context,
-        {"dri": report_data_dri},
-        oca_schema_dri="dip.data.tda.raport." + exchange_id,
-    )
-
-    await pds_link_dri(context, cred_dri, report_pointer_dri)
-    await pds_link_dri(context, report_pointer_dri, report_data_dri)
-
-
 @docs(
     tags=["Verifiable Services"],
     summary="Decide whether application should be accepted or rejected",
@@ -202,36 +294,46 @@ async def process_application(request: web.BaseRequest):
     issue_id = params["issue_id"]
 
     issue: ServiceIssueRecord = await retrieve_service_issue(context, issue_id)
+    async with TRACER.span("process_application", exchange_id=issue.exchange_id):
+        await process_application_(
+            context, outbound_handler, issue, params["decision"], params.get("data")
+        )
+
+    return web.json_response(
+        {
+            "success": True,
+            "issue_id": issue._id,
+            "connection_id": issue.connection_id,
+        }
+    )
+
+
+async def process_application_(
+    context, outbound_handler, issue: ServiceIssueRecord, decision, report_data
+):
     exchange_id = issue.exchange_id
     connection_id = issue.connection_id
+    # queued issues become pending once the proof is verified
+    if issue.state == ServiceIssueRecord.ISSUE_QUEUED:
+        raise web.HTTPConflict(reason="Issue is queued, its proof is not verified yet")
 
     service: ServiceRecord = await retrieve_service(context, issue.service_id)
     connection: ConnectionRecord = await retrieve_connection(context, connection_id)
 
-    if (
-        params["decision"] == "reject"
-        or issue.state == ServiceIssueRecord.ISSUE_REJECTED
-    ):
+    if decision == "reject" or issue.state == ServiceIssueRecord.ISSUE_REJECTED:
         issue.state = ServiceIssueRecord.ISSUE_REJECTED
         await issue.save(context, reason="Issue reject saved")
         await send_confirmation(
             outbound_handler, connection_id, exchange_id, issue.state
         )
-        return web.json_response(
-            {
-                "success": True,
-                "issue_id": issue._id,
-                "connection_id": connection_id,
-            }
-        )
+        return
 
     ## TODO: We are assuming here that report_data is required!!
     ##       it could be either report_data or user_data
     # Report data should be the replacement of user_data
     # By user data I mean the data user sent with his application
     # It should be linked with certificate
-    report_data = params.get("data")
-    issue.report_data_dri = await pds_save_a(context, report_data)
+    saves = [(report_data, {})]
     ### user_data_dri = issue.service_user_data_dri
     ### user_data = await pds_load(context, user_data_dri)
     # Here we are deciding what to put into the credential
@@ -240,46 +342,62 @@ async def process_application(request: web.BaseRequest):
     # and filled with associatedReportID
     cred_schem_dri = service.service_schema.get("oca_schema_dri")
     cred_namspc = service.service_schema.get("oca_schema_namespace")
-    cred_data_dri = issue.report_data_dri
     cred_data = report_data
     if service.certificate_schema:
         cred_schem_dri = service.certificate_schema["oca_schema_dri"]
         cred_namspc = service.certificate_schema["oca_schema_namespace"]
 
-        certificate = await certificate_get(context, cred_schem_dri)
+        certificate = await CATALOG_CACHE.certificate(context, cred_schem_dri)
         if certificate is None:
             raise web.HTTPNotFound(reason="certificate_schema not found")
 
         # This should be a link that ties together
         # the report in acapy database and certificate in pds
-        certificate["associatedReportID"] = issue.exchange_id
+        delta = {"associatedReportID": issue.exchange_id}
+        certificate.update(delta)
 
         cred_data = certificate
-        cred_data_dri = await pds_save_a(
-            context,
-            cred_data,
-            table="dip.data.tda.oca_chunks." + cred_schem_dri,
-        )
+        if get_setting(context.settings, "certificate_delta_storage", False):
+            # the holder gets the whole certificate, the PDS only the delta
+            template_dri = await CATALOG_CACHE.certificate_template_dri(
+                context, cred_schem_dri
+            )
+            saves.append(
+                (
+                    certificate_delta(template_dri, delta),
+                    {"table": CERTIFICATE_DELTA_TABLE + cred_schem_dri},
+                )
+            )
+        else:
+            saves.append((certificate, {"table": CERTIFICATE_TABLE + cred_schem_dri}))
+
+    # report data and certificate don't depend on each other
+    dris = await save_many(context, saves)
+    issue.report_data_dri = dris[0]
+    cred_data_dri = dris[-1]
 
     # Credential should be either filled in with user_data or
     # with the certificate data the service specified a certificate
     # Should it also be possibly filled with data that the issuer adjusted??
     issuer: BaseIssuer = await context.inject(BaseIssuer)
-    credential = await issuer.create_credential_ex(
-        {
-            "oca_schema_dri": cred_schem_dri,
-            "oca_schema_namespace": cred_namspc,
-            "oca_data_dri": cred_data_dri,
-            "service_consent_match_id": issue.service_consent_match_id,
-        },
-        subject_public_did=issue.their_public_did,
-    )
+    async with TRACER.span("issuer.create_credential_ex"):
+        credential = await issuer.create_credential_ex(
+            {
+                "oca_schema_dri": cred_schem_dri,
+                "oca_schema_namespace": cred_namspc,
+                "oca_data_dri": cred_data_dri,
+                "service_consent_match_id": issue.service_consent_match_id,
+            },
+            subject_public_did=issue.their_public_did,
+        )
 
     issue.state = ServiceIssueRecord.ISSUE_ACCEPTED
 
     cred_dri = await issue.issuer_credential_pds_set(context, credential)
-    await pds_link_dri(context, issue.user_consent_credential_dri, cred_dri)
-    await link_report(context, cred_dri, issue.report_data_dri, issue.exchange_id)
+    graph = LinkGraph()
+    graph.link(issue.user_consent_credential_dri, cred_dri)
+    graph.report(cred_dri, issue.report_data_dri, issue.exchange_id)
+    await graph.commit(context)
 
     await issue.save(context, reason="Accepted service issue, credential offer created")
     resp = ApplicationResponse(
@@ -288,14 +406,107 @@ async def process_application(request: web.BaseRequest):
         report_data=report_data,
         credential_data=cred_data,
     )
-    await outbound_handler(resp, connection_id=connection_id)
-    return web.json_response(
-        {
-            "success": True,
-            "issue_id": issue._id,
-            "connection_id": connection_id,
-        }
+    async with TRACER.span("outbound.ApplicationResponse"):
+        await outbound_handler(resp, connection_id=connection_id)
+
+
+class CredentialDataSchema(Schema):
+    data_dri = fields.Str(required=True)
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Load credential data from the PDS",
+    description="""
+    data_dri - oca_data_dri of a credential, certificates stored as
+    a delta of their template (certificate_delta_storage setting)
+    are returned whole
+    """,
+)
+@match_info_schema(CredentialDataSchema())
+async def get_credential_data(request: web.BaseRequest):
+    context = request.app["request_context"]
+    data_dri = request.match_info["data_dri"]
+    try:
+        result = await certificate_load(context, data_dri)
+    except PDSError as err:
+        raise web.HTTPNotFound(reason=err.roll_up)
+
+    return web.json_response({"success": True, "result": result})
+
+
+class DecisionPolicySchema(Schema):
+    service_id = fields.Str(required=True)
+    rules = fields.List(fields.Nested(DecisionRuleSchema()), required=True)
+    default = fields.Str(
+        required=False, allow_none=True, validate=validate.OneOf(DECISIONS)
     )
+    report_data = fields.Dict(required=False)
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Set the policy which accepts or rejects applications automatically",
+    description="""
+    rules are evaluated in order when an application comes, the first rule
+    which matches decides, default decides when none do, null leaves the
+    issue pending for process-application
+
+    rule: {"decision": "accept" | "reject", "when": {
+        "service_id": value,
+        "consent": {credentialSubject field: value},
+        "usage_policies_match": true | false
+    }}, a list of values matches any of them
+
+    report_data - data of accepted issues, as in process-application
+    """,
+)
+@request_schema(DecisionPolicySchema())
+async def set_decision_policy(request: web.BaseRequest):
+    context = request.app["request_context"]
+    params = await request.json()
+    errors = DecisionPolicySchema().validate(params)
+    if errors:
+        raise web.HTTPBadRequest(reason=json.dumps(errors))
+
+    try:
+        policy = await DecisionPolicyRecord.retrieve_by_service_id(
+            context, params["service_id"]
+        )
+    except StorageNotFoundError:
+        policy = DecisionPolicyRecord(service_id=params["service_id"])
+    policy.rules = params["rules"]
+    policy.default = params.get("default")
+    policy.report_data = params.get("report_data") or {}
+
+    try:
+        await policy.save(context, reason="Decision policy set")
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.json_response({"success": True, "result": policy.serialize()})
+
+
+class DecisionPolicyMatchSchema(Schema):
+    service_id = fields.Str(required=True)
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Get the decision policy of a service",
+)
+@match_info_schema(DecisionPolicyMatchSchema())
+async def get_decision_policy(request: web.BaseRequest):
+    context = request.app["request_context"]
+    service_id = request.match_info["service_id"]
+    try:
+        policy = await DecisionPolicyRecord.retrieve_by_service_id(context, service_id)
+    except StorageNotFoundError as err:
+        raise web.HTTPNotFound(reason=err.roll_up)
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.json_response({"success": True, "result": policy.serialize()})
 
 
 class GetIssueFilteredSchema(Schema):
@@ -317,7 +528,10 @@ async def serialize_and_verify_service_issue(context, issue):
             query = storage.search_records(
                 "service_list", {"connection_id": record["connection_id"]}
             )
-            query = await query.fetch_single()
+            async with timed(
+                STORAGE_LATENCY, call="search_records", record_type="service_list"
+            ):
+                query = await query.fetch_single()
             services = json.loads(query.value)
             for i in services:
                 if i["service_id"] == record["service_id"]:
@@ -380,6 +594,7 @@ async def serialize_and_verify_service_issue(context, issue):
 
     STATES: 
     "pending" - not processed yet (not rejected or accepted)
+    "queued" - received, waiting for the proof verification
     "no response" - agent didn't respond at all yet
     "rejected"
     "accepted"
@@ -420,6 +635,13 @@ async def query_report(request: web.BaseRequest):
     context = request.app["request_context"]
     report_id = request.match_info["associatedReportID"]
     result = await get_issue_self_(context, {"exchange_id": report_id})
+    if len(result) == 0:
+        try:
+            archived = await query_archived_issues(context, {"exchange_id": report_id})
+        except StorageError as err:
+            raise web.HTTPInternalServerError(err)
+        for issue in archived:
+            result.append(await serialize_and_verify_service_issue(context, issue))
     if len(result) == 0:
         return web.json_response({})
     try:
@@ -447,6 +669,13 @@ async def get_issue_by_id(request: web.BaseRequest):
         query: ServiceIssueRecord = await ServiceIssueRecord.retrieve_by_id(
             context, issue_id
         )
+    except StorageNotFoundError:
+        try:
+            query = await retrieve_archived_issue(context, issue_id)
+        except StorageNotFoundError as err:
+            raise web.HTTPNotFound(reason=err.roll_up)
+        except StorageError as err:
+            raise web.HTTPInternalServerError(err)
     except StorageError as err:
         raise web.HTTPInternalServerError(err)
 
@@ -455,6 +684,85 @@ async def get_issue_by_id(request: web.BaseRequest):
     return web.json_response({"success": True, "result": record})
 
 
+@docs(
+    tags=["Verifiable Services"],
+    summary="Number of issues by state, author, service_id and connection_id",
+)
+async def get_issue_stats(request: web.BaseRequest):
+    context = request.app["request_context"]
+    try:
+        result = await ISSUE_STATS.stats(context)
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.json_response({"success": True, "result": result})
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Recount the issue stats from storage",
+)
+async def rebuild_issue_stats(request: web.BaseRequest):
+    context = request.app["request_context"]
+    try:
+        result = await ISSUE_STATS.rebuild(context)
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    return web.json_response({"success": True, "result": result})
+
+
+class RecentIssuesQuerySchema(Schema):
+    limit = fields.Int(required=False, description="Issues per page, max 1000")
+    author = fields.Str(required=False)
+    before = fields.Str(required=False, description="next cursor of previous page")
+    since = fields.Str(required=False, description="latest cursor of previous page")
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Newest issues first, paged by cursor",
+    description="""
+    Issues are ordered by the time of their last update,
+    pass "next" as before to get the following page and
+    "latest" as since to poll for issues updated since
+    """,
+)
+@querystring_schema(RecentIssuesQuerySchema())
+async def get_recent_issues(request: web.BaseRequest):
+    context = request.app["request_context"]
+    try:
+        limit = max(1, min(int(request.query.get("limit", 20)), 1000))
+        ids, next_cursor, latest_cursor = await ISSUE_INDEX.newest(
+            context,
+            limit,
+            author=request.query.get("author"),
+            before=request.query.get("before"),
+            since=request.query.get("since"),
+        )
+    except (ValueError, CursorError) as err:
+        raise web.HTTPBadRequest(reason=str(err))
+    except StorageError as err:
+        raise web.HTTPInternalServerError(reason=err.roll_up)
+
+    result = []
+    for issue_id in ids:
+        try:
+            issue = await ServiceIssueRecord.retrieve_by_id(context, issue_id)
+        except StorageNotFoundError:
+            continue
+        result.append(await serialize_and_verify_service_issue(context, issue))
+
+    return web.json_response(
+        {
+            "success": True,
+            "result": result,
+            "next": next_cursor,
+            "latest": latest_cursor,
+        }
+    )
+
+
 async def DEBUGapply_status(request: web.BaseRequest):
     context = request.app["request_context"]
     params = await request.json()
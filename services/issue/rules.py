@@ -0,0 +1,174 @@
+"""
+Automatic decisions on incoming applications, a service can have a
+decision policy: rules evaluated in order when an application creates
+a pending issue, the first matching rule accepts or rejects it through
+the same path as /verifiable-services/process-application.
+
+Rule: {"decision": "accept" | "reject", "when": conditions}
+conditions (all have to match, a list matches any of its values):
+    "service_id": value
+    "consent": {credentialSubject field: value}
+    "usage_policies_match": true | false
+"""
+from aries_cloudagent.messaging.models.base_record import BaseRecordSchema
+from aries_cloudagent.storage.error import StorageNotFoundError
+from marshmallow import fields, Schema, validate
+
+import logging
+
+from ..records import HashIdRecord
+
+LOGGER = logging.getLogger(__name__)
+
+DECISION_ACCEPT = "accept"
+DECISION_REJECT = "reject"
+DECISIONS = (DECISION_ACCEPT, DECISION_REJECT)
+
+
+class AutoDecisionError(Exception):
+    """Applying the decision of the policy failed"""
+
+    def __init__(self, decision: str, error: Exception):
+        super().__init__(str(error))
+        self.decision = decision
+
+
+def value_matches(actual, expected) -> bool:
+    if isinstance(expected, list):
+        return actual in expected
+    return actual == expected
+
+
+def rule_matches(when: dict, facts: dict) -> bool:
+    for name, expected in when.items():
+        if name == "consent":
+            consent = facts.get("consent") or {}
+            for field, value in expected.items():
+                if not value_matches(consent.get(field), value):
+                    return False
+        elif not value_matches(facts.get(name), expected):
+            return False
+    return True
+
+
+class DecisionPolicyRecord(HashIdRecord):
+    RECORD_ID_NAME = "record_id"
+    RECORD_TYPE = "service_decision_policy"
+
+    class Meta:
+        schema_class = "DecisionPolicyRecordSchema"
+
+    def __init__(
+        self,
+        *,
+        service_id: str = None,
+        rules: list = None,
+        default: str = None,
+        report_data: dict = None,
+        state: str = None,
+        record_id: str = None,
+        **keyword_args,
+    ):
+        super().__init__(record_id, state, **keyword_args)
+        self.service_id = service_id
+        self.rules = rules or []
+        self.default = default
+        self.report_data = report_data or {}
+
+    @property
+    def record_value(self) -> dict:
+        """Accessor to for the JSON record value properties"""
+        return {
+            prop: getattr(self, prop)
+            for prop in ("service_id", "rules", "default", "report_data")
+        }
+
+    @property
+    def record_tags(self) -> dict:
+        return {"service_id": self.service_id}
+
+    @property
+    def unique_record_values(self) -> dict:
+        return {"service_id": self.service_id}
+
+    @classmethod
+    async def retrieve_by_service_id(cls, context, service_id: str):
+        return await cls.retrieve_by_id(
+            context, cls.hash_id({"service_id": service_id})
+        )
+
+    @property
+    def uses_usage_policy(self) -> bool:
+        return any("usage_policies_match" in rule["when"] for rule in self.rules)
+
+    def decide(self, facts: dict) -> str:
+        """Decision of the first matching rule, default if none match"""
+        for rule in self.rules:
+            if rule_matches(rule["when"], facts):
+                return rule["decision"]
+        return self.default
+
+
+class DecisionRuleSchema(Schema):
+    decision = fields.Str(required=True, validate=validate.OneOf(DECISIONS))
+    when = fields.Dict(required=True)
+
+
+class DecisionPolicyRecordSchema(BaseRecordSchema):
+    class Meta:
+        model_class = "DecisionPolicyRecord"
+
+    service_id = fields.Str(required=True)
+    rules = fields.List(fields.Nested(DecisionRuleSchema()), required=False)
+    default = fields.Str(
+        required=False, allow_none=True, validate=validate.OneOf(DECISIONS)
+    )
+    report_data = fields.Dict(required=False)
+
+
+async def application_facts(issue, consent: dict, policy) -> dict:
+    facts = {
+        "service_id": issue.service_id,
+        "consent": consent.get("credentialSubject", {}),
+        "usage_policies_match": None,
+    }
+    service_policy = (issue.service_consent_schema or {}).get("usage_policy")
+    user_policy = facts["consent"].get("usage_policy")
+    if policy.uses_usage_policy and service_policy and user_policy:
+        from aries_cloudagent.protocols.present_proof.v1_1.routes import (
+            verify_usage_policy,
+        )
+
+        facts["usage_policies_match"], _ = await verify_usage_policy(
+            user_policy, service_policy
+        )
+    return facts
+
+
+async def auto_decide(context, responder, issue, consent: dict) -> str:
+    """
+    Accept or reject a pending issue by the policy of its service,
+    returns the decision, None when the controller has to decide,
+    raises AutoDecisionError when applying the decision fails
+    """
+    try:
+        policy = await DecisionPolicyRecord.retrieve_by_service_id(
+            context, issue.service_id
+        )
+    except StorageNotFoundError:
+        return None
+
+    decision = policy.decide(await application_facts(issue, consent, policy))
+    if decision is None:
+        return None
+
+    from .routes import process_application_
+
+    try:
+        await process_application_(
+            context, responder.send, issue, decision, policy.report_data
+        )
+    except Exception as err:
+        LOGGER.exception("Automatic %s of issue %s failed", decision, issue._id)
+        raise AutoDecisionError(decision, err) from err
+    return decision
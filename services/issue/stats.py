@@ -0,0 +1,157 @@
+from aries_cloudagent.storage.base import BaseStorage
+
+import asyncio
+import logging
+
+from ..metrics import REGISTRY
+
+LOGGER = logging.getLogger(__name__)
+
+ISSUE_RECORD_TYPE = "service_issue"
+ARCHIVE_RECORD_TYPE = "service_issue_archive"
+
+
+class IssueStats:
+    """
+    Counters of service issues by state, author, service_id and
+    connection_id, built once from the record tags in storage and kept up to
+    date by ServiceIssueRecord.post_save / delete_record, so that reading
+    them costs the same no matter how many issues there are. Archived issues
+    are still counted.
+
+    The counters are tied to the storage instance they were built from and
+    live in memory only: building them reads every issue and archived issue
+    record, O(n), which warm_up_issue_views does on start.
+    """
+
+    DIMENSIONS = ("state", "author", "service_id", "connection_id")
+
+    def __init__(self):
+        self._storage = None
+        self._counts = None
+        self._version = 0
+        self._rebuilding = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._counts is not None
+
+    @staticmethod
+    def _empty() -> dict:
+        counts = {"total": 0, "by_author_state": {}}
+        for dimension in IssueStats.DIMENSIONS:
+            counts["by_" + dimension] = {}
+        return counts
+
+    @staticmethod
+    def _add(counts: dict, values: dict, amount: int):
+        counts["total"] += amount
+        for dimension in IssueStats.DIMENSIONS:
+            by_value = counts["by_" + dimension]
+            key = values.get(dimension)
+            by_value[key] = by_value.get(key, 0) + amount
+            if not by_value[key]:
+                del by_value[key]
+        IssueStats._add_state(counts, values, values.get("state"), amount)
+
+    @staticmethod
+    def _add_state(counts: dict, values: dict, state, amount: int):
+        author = values.get("author")
+        by_state = counts["by_author_state"].setdefault(author, {})
+        by_state[state] = by_state.get(state, 0) + amount
+        if not by_state[state]:
+            del by_state[state]
+        if not by_state:
+            del counts["by_author_state"][author]
+
+    async def _same_storage(self, context) -> bool:
+        storage = await context.inject(BaseStorage)
+        if self._storage is not storage:
+            self._storage = storage
+            self._counts = None
+            self._version += 1
+            return False
+        return True
+
+    async def record_saved(self, context, issue, new_record: bool, last_state):
+        if not await self._same_storage(context):
+            return
+        self._version += 1
+        if self._counts is None:
+            return
+        values = issue.record_tags
+        if new_record:
+            self._add(self._counts, values, 1)
+        elif last_state != issue.state:
+            by_state = self._counts["by_state"]
+            by_state[last_state] = by_state.get(last_state, 0) - 1
+            if not by_state[last_state]:
+                del by_state[last_state]
+            by_state[issue.state] = by_state.get(issue.state, 0) + 1
+            self._add_state(self._counts, values, last_state, -1)
+            self._add_state(self._counts, values, issue.state, 1)
+
+    async def record_deleted(self, context, issue):
+        if not await self._same_storage(context):
+            return
+        self._version += 1
+        if self._counts is None:
+            return
+        values = dict(issue.record_tags, state=issue._last_state)
+        self._add(self._counts, values, -1)
+
+    async def stats(self, context) -> dict:
+        if not await self._same_storage(context) or self._counts is None:
+            await self.rebuild(context)
+        return self._copy(self._counts)
+
+    async def rebuild(self, context) -> dict:
+        """Recount the issues from storage, concurrent callers share a rebuild"""
+        if self._rebuilding is None or self._rebuilding.done():
+            self._rebuilding = asyncio.ensure_future(self._rebuild(context))
+        return await asyncio.shield(self._rebuilding)
+
+    async def _rebuild(self, context) -> dict:
+        await self._same_storage(context)
+        storage: BaseStorage = self._storage
+        # saves in the middle of the search would be counted twice or lost
+        for _ in range(3):
+            version = self._version
+            counts = self._empty()
+            for record_type in (ISSUE_RECORD_TYPE, ARCHIVE_RECORD_TYPE):
+                records = await storage.search_records(record_type).fetch_all()
+                for record in records:
+                    self._add(counts, record.tags, 1)
+            if version == self._version:
+                break
+        else:
+            LOGGER.warning("Issues kept changing while rebuilding the issue stats")
+
+        self._counts = counts
+        return self._copy(counts)
+
+    def by_state(self) -> dict:
+        if self._counts is None:
+            return {}
+        return {str(state): count for state, count in self._counts["by_state"].items()}
+
+    @staticmethod
+    def _copy(counts: dict) -> dict:
+        copied = {"total": counts["total"]}
+        for key, value in counts.items():
+            if key != "total":
+                copied[key] = {
+                    name: dict(count) if isinstance(count, dict) else count
+                    for name, count in value.items()
+                }
+        return copied
+
+
+ISSUE_STATS = IssueStats()
+
+REGISTRY.gauge(
+    "verifiable_services_issues",
+    "Service issues by state, once the issue stats are built",
+    ISSUE_STATS.by_state,
+    labelnames=("state",),
+)
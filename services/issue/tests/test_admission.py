@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from ..admission import AdmissionControl, REASON_BUSY, REASON_RATE
+
+
+class TestAdmissionControl(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.admission = AdmissionControl(
+            rate=1.0, burst=2.0, max_concurrency=3, clock=lambda: self.now
+        )
+
+    def test_token_bucket_per_connection(self):
+        assert self.admission.admit("a")
+        assert self.admission.admit("a")
+        assert not self.admission.admit("a")
+        assert self.admission.rejected[REASON_RATE] == 1
+
+        self.admission.release()
+        self.admission.release()
+        assert self.admission.admit("b")
+        self.admission.release()
+
+        self.now = 1.0
+        assert self.admission.admit("a")
+        assert not self.admission.admit("a")
+
+    def test_concurrency_cap(self):
+        for connection_id in ("a", "b", "c"):
+            assert self.admission.admit(connection_id)
+        assert not self.admission.admit("d")
+        assert self.admission.rejected[REASON_BUSY] == 1
+
+        self.admission.release()
+        assert self.admission.admit("d")
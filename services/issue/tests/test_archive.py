@@ -0,0 +1,85 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from aries_cloudagent.storage.error import StorageNotFoundError
+from asynctest import TestCase as AsyncTestCase
+
+import time
+
+from ..archive import IssueArchiver, query_archived_issues, retrieve_archived_issue
+from ..models import ServiceIssueRecord
+from ..stats import ISSUE_STATS
+
+
+class TestIssueArchiver(AsyncTestCase):
+    async def setUp(self):
+        self.context = InjectionContext()
+        self.context.injector.bind_instance(BaseStorage, BasicStorage())
+        self.archiver = IssueArchiver(max_age=60, batch_size=2)
+        self.issues = {}
+        for index, state in enumerate(
+            (
+                ServiceIssueRecord.ISSUE_PENDING,
+                ServiceIssueRecord.ISSUE_ACCEPTED,
+                ServiceIssueRecord.ISSUE_REJECTED,
+                ServiceIssueRecord.ISSUE_CREDENTIAL_RECEIVED,
+            )
+        ):
+            issue = ServiceIssueRecord(
+                state=state,
+                author=ServiceIssueRecord.AUTHOR_OTHER,
+                connection_id="connection",
+                exchange_id=str(index),
+            )
+            await issue.save(self.context)
+            self.issues[state] = issue._id
+
+    async def test_archives_terminal_issues_only(self):
+        assert await self.archiver.archive(self.context) == 0
+
+        stats = await ISSUE_STATS.stats(self.context)
+        assert await self.archiver.archive(self.context, time.time() + 120) == 3
+
+        live = await ServiceIssueRecord.query(self.context)
+        assert [issue._id for issue in live] == [
+            self.issues[ServiceIssueRecord.ISSUE_PENDING]
+        ]
+        assert stats == await ISSUE_STATS.rebuild(self.context)
+
+        issue = await retrieve_archived_issue(
+            self.context, self.issues[ServiceIssueRecord.ISSUE_ACCEPTED]
+        )
+        assert issue.state == ServiceIssueRecord.ISSUE_ACCEPTED
+        assert issue.exchange_id == "1"
+
+        archived = await query_archived_issues(self.context, {"exchange_id": "2"})
+        assert [issue._id for issue in archived] == [
+            self.issues[ServiceIssueRecord.ISSUE_REJECTED]
+        ]
+
+        with self.assertRaises(StorageNotFoundError):
+            await retrieve_archived_issue(
+                self.context, self.issues[ServiceIssueRecord.ISSUE_PENDING]
+            )
+
+    async def test_archives_page_by_page(self):
+        for index in range(4, 9):
+            issue = ServiceIssueRecord(
+                state=ServiceIssueRecord.ISSUE_ACCEPTED,
+                author=ServiceIssueRecord.AUTHOR_OTHER,
+                connection_id="connection",
+                exchange_id=str(index),
+            )
+            await issue.save(self.context)
+
+        archive_batch = self.archiver.archive_batch
+        pages = []
+
+        async def record_page(context, issues):
+            pages.append(len(issues))
+            return await archive_batch(context, issues)
+
+        self.archiver.archive_batch = record_page
+        assert await self.archiver.archive(self.context, time.time() + 120) == 8
+        assert max(pages) == 2
+        assert sum(pages) == 8
@@ -18,6 +18,12 @@ import json
 from ..models import *
 from ..message_types import *
 from ..handlers import *
+from .. import handlers as issue_handlers
+from ..admission import AdmissionControl
+from ..rules import AutoDecisionError
+from ...local_pds import LocalPDS, MemoryPDS
+from ..routes import process_application_
+from aiohttp import web
 
 
 class TestIssueHandlers(AsyncTestCase):
@@ -89,6 +95,164 @@ class TestIssueHandlers(AsyncTestCase):
         )
         assert query.service_schema == self.service_schema
 
+    async def test_application_handler_answers_duplicate(self):
+        context, storage, responder = self.create_default_context()
+        RECENT_APPLICATIONS.clear()
+        record = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_ACCEPTED,
+            author=ServiceIssueRecord.AUTHOR_OTHER,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await record.save(context)
+
+        context.message = Application(
+            exchange_id=self.exchange_id, service_id="not a service"
+        )
+        await ApplicationHandler().handle(context, responder)
+
+        assert len(responder.messages) == 1
+        result, _ = responder.messages[0]
+        self.assert_confirmation_record(result, ServiceIssueRecord.ISSUE_ACCEPTED)
+
+    async def test_application_handler_answers_duplicate_when_rate_limited(self):
+        context, storage, responder = self.create_default_context()
+        RECENT_APPLICATIONS.clear()
+        record = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_ACCEPTED,
+            author=ServiceIssueRecord.AUTHOR_OTHER,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await record.save(context)
+
+        admission = AdmissionControl(rate=1.0, burst=1.0, clock=lambda: 0.0)
+        assert admission.admit(self.connection_id)
+        admission.release()
+
+        context.message = Application(
+            exchange_id=self.exchange_id, service_id="not a service"
+        )
+        with async_mock.patch.object(
+            issue_handlers, "APPLICATION_ADMISSION", admission
+        ):
+            await ApplicationHandler().handle(context, responder)
+
+        assert len(responder.messages) == 1
+        result, _ = responder.messages[0]
+        self.assert_confirmation_record(result, ServiceIssueRecord.ISSUE_ACCEPTED)
+        assert admission.rejected == {"rate": 0, "busy": 0}
+        assert admission.active == 0
+
+    async def test_process_queued_failure_rejects_issue(self):
+        context, storage, responder = self.create_default_context()
+        context.message = Application(exchange_id=self.exchange_id)
+        issue = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_QUEUED,
+            author=ServiceIssueRecord.AUTHOR_OTHER,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await issue.save(context)
+
+        handler = ApplicationHandler()
+        handler.verify_consent = async_mock.CoroutineMock(return_value=True)
+        handler.store_application = async_mock.CoroutineMock(
+            side_effect=ValueError("PDS is down")
+        )
+        with self.assertRaises(ValueError):
+            await handler.process_queued(context, responder, issue, {}, {})
+
+        query = await ServiceIssueRecord.retrieve_by_id(context, issue._id)
+        assert query.state == ServiceIssueRecord.ISSUE_REJECTED
+        assert query.error == "PDS is down"
+        assert len(responder.messages) == 1
+        result, _ = responder.messages[0]
+        self.assert_confirmation_record(result, ServiceIssueRecord.ISSUE_REJECTED)
+
+    async def test_failed_auto_decision_announcement(self):
+        context, storage, responder = self.create_default_context()
+        issue = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_PENDING,
+            author=ServiceIssueRecord.AUTHOR_OTHER,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await issue.save(context)
+
+        async def fail_before_save(context, responder, issue, consent):
+            raise AutoDecisionError("accept", ValueError("PDS is down"))
+
+        async def fail_after_save(context, responder, issue, consent):
+            issue.state = ServiceIssueRecord.ISSUE_REJECTED
+            await issue.save(context)
+            raise AutoDecisionError("reject", ValueError("Send failed"))
+
+        webhook = mock.MagicMock()
+        with async_mock.patch.object(issue_handlers, "enqueue_webhook", webhook):
+            for decide in (fail_before_save, fail_after_save):
+                with async_mock.patch.object(issue_handlers, "auto_decide", decide):
+                    await ApplicationHandler().announce_application(
+                        context, responder, issue, {}
+                    )
+
+        (_, topic, payload), _ = webhook.call_args_list[0]
+        assert topic == "verifiable-services/incoming-pending-application"
+        (_, topic, payload), _ = webhook.call_args_list[1]
+        assert topic == "verifiable-services/application-auto-decision-failed"
+        assert payload["decision"] == "reject"
+        assert payload["error"] == "Send failed"
+        assert payload["issue"]["state"] == ServiceIssueRecord.ISSUE_REJECTED
+
+    async def test_queued_issue_is_not_processed(self):
+        context, storage, responder = self.create_default_context()
+        issue = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_QUEUED,
+            author=ServiceIssueRecord.AUTHOR_OTHER,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await issue.save(context)
+
+        with self.assertRaises(web.HTTPConflict):
+            await process_application_(context, responder.send, issue, "accept", {})
+
+        query = await ServiceIssueRecord.retrieve_by_id(context, issue._id)
+        assert query.state == ServiceIssueRecord.ISSUE_QUEUED
+        assert responder.messages == []
+
+    async def test_refused_credential_is_not_saved_to_pds(self):
+        context, storage, responder = self.create_default_context()
+        pds = MemoryPDS()
+        context.injector.bind_instance(LocalPDS, pds)
+        holder = async_mock.MagicMock(BaseHolder)
+        holder.store_credential = async_mock.CoroutineMock(
+            side_effect=HolderError("Invalid credential")
+        )
+        context.injector.bind_instance(BaseHolder, holder)
+        responder.connection_id = self.connection_id
+
+        issue = ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_ACCEPTED,
+            author=ServiceIssueRecord.AUTHOR_SELF,
+            connection_id=self.connection_id,
+            exchange_id=self.exchange_id,
+        )
+        await issue.save(context)
+
+        context.message = ApplicationResponse(
+            credential="{}",
+            credential_data={"data": 1},
+            report_data={"report": 1},
+            exchange_id=self.exchange_id,
+        )
+        with self.assertRaises(HandlerException):
+            await ApplicationResponseHandler().handle(context, responder)
+
+        assert pds.calls["pds_save_a"] == 0
+        query = await ServiceIssueRecord.retrieve_by_id(context, issue._id)
+        assert query.state == ServiceIssueRecord.ISSUE_ACCEPTED
+
     async def test_confirmation_handler(self):
         context, storage, responder = self.create_default_context()
         record = ServiceIssueRecord(
@@ -111,3 +275,14 @@ class TestIssueHandlers(AsyncTestCase):
         )
         self.assert_issue_records_are_the_same(query, record)
 
+    async def test_verify_proof_cached(self):
+        VERIFIED_PROOFS.clear()
+        credential = {"credentialSubject": {"oca_data_dri": "1234"}, "proof": {}}
+        verify = async_mock.CoroutineMock(side_effect=[False, True, True])
+
+        with async_mock.patch.object(issue_handlers, "verify_proof", verify):
+            assert not await verify_proof_cached(None, credential)
+            assert await verify_proof_cached(None, credential)
+            assert await verify_proof_cached(None, json.loads(json.dumps(credential)))
+
+        assert verify.call_count == 2
@@ -0,0 +1,59 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from asynctest import TestCase as AsyncTestCase
+
+from ..models import ServiceIssueRecord
+from ..index import ISSUE_INDEX, CursorError, warm_up_issue_views
+from ..stats import ISSUE_STATS
+
+
+class TestIssueIndex(AsyncTestCase):
+    async def setUp(self):
+        self.context = InjectionContext()
+        self.context.injector.bind_instance(BaseStorage, BasicStorage())
+        self.issues = []
+        for index in range(5):
+            issue = ServiceIssueRecord(
+                state=ServiceIssueRecord.ISSUE_PENDING,
+                author=ServiceIssueRecord.AUTHOR_OTHER,
+                connection_id="connection",
+                exchange_id=str(index),
+            )
+            await issue.save(self.context)
+            self.issues.append(issue._id)
+
+    async def test_pages_cover_every_issue_once(self):
+        seen = []
+        ids, cursor, _ = await ISSUE_INDEX.newest(self.context, 2)
+        while ids:
+            seen.extend(ids)
+            ids, cursor, _ = await ISSUE_INDEX.newest(self.context, 2, before=cursor)
+
+        assert sorted(seen) == sorted(self.issues)
+        assert seen[0] == self.issues[-1]
+
+    async def test_since_returns_updated_issues(self):
+        _, _, latest = await ISSUE_INDEX.newest(self.context, 5)
+        issue = await ServiceIssueRecord.retrieve_by_id(self.context, self.issues[0])
+        issue.state = ServiceIssueRecord.ISSUE_ACCEPTED
+        await issue.save(self.context)
+
+        ids, _, _ = await ISSUE_INDEX.newest(self.context, 5, since=latest)
+        assert ids == [self.issues[0]]
+
+        ids, _, _ = await ISSUE_INDEX.newest(
+            self.context, 5, author=ServiceIssueRecord.AUTHOR_SELF
+        )
+        assert ids == []
+
+    async def test_invalid_cursor(self):
+        with self.assertRaises(CursorError):
+            await ISSUE_INDEX.newest(self.context, 5, before="invalid")
+
+    async def test_warm_up_builds_index_and_stats(self):
+        assert not ISSUE_INDEX.is_built
+        await warm_up_issue_views(self.context)
+        assert ISSUE_INDEX.is_built
+        assert ISSUE_STATS.is_built
+        assert (await ISSUE_STATS.stats(self.context))["total"] == 5
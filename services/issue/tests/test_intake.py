@@ -0,0 +1,38 @@
+from asynctest import TestCase as AsyncTestCase
+
+from ..intake import ApplicationIntake
+
+
+class TestApplicationIntake(AsyncTestCase):
+    async def test_jobs_are_processed(self):
+        intake = ApplicationIntake(enabled=True, max_size=10, workers=2)
+        processed = []
+
+        def job(number):
+            async def run():
+                if number == 3:
+                    raise ValueError()
+                processed.append(number)
+
+            return run
+
+        for number in range(5):
+            assert intake.submit(job(number))
+        await intake.join()
+
+        assert sorted(processed) == [0, 1, 2, 4]
+        assert intake.depth == 0
+        assert intake.stats["processed"] == 4
+        assert intake.stats["failed"] == 1
+
+    async def test_full_queue_drops(self):
+        intake = ApplicationIntake(enabled=True, max_size=1, workers=1)
+
+        async def run():
+            pass
+
+        assert intake.submit(run)
+        assert intake.is_full
+        assert not intake.submit(run)
+        assert intake.stats["dropped"] == 1
+        await intake.join()
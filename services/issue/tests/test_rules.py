@@ -0,0 +1,35 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from asynctest import TestCase as AsyncTestCase
+
+from ..rules import DecisionPolicyRecord, DECISION_ACCEPT, DECISION_REJECT
+
+
+class TestDecisionPolicy(AsyncTestCase):
+    rules = [
+        {"decision": DECISION_REJECT, "when": {"usage_policies_match": False}},
+        {
+            "decision": DECISION_ACCEPT,
+            "when": {"service_id": "service", "consent": {"expiration": ["1", "2"]}},
+        },
+    ]
+
+    def test_first_matching_rule_decides(self):
+        policy = DecisionPolicyRecord(service_id="service", rules=self.rules)
+        facts = {"service_id": "service", "consent": {"expiration": "2"}}
+        assert policy.decide(facts) == DECISION_ACCEPT
+        assert policy.decide(dict(facts, usage_policies_match=False)) == DECISION_REJECT
+        assert policy.decide(dict(facts, consent={"expiration": "3"})) is None
+        assert policy.uses_usage_policy
+
+    async def test_retrieve_by_service_id(self):
+        context = InjectionContext()
+        context.injector.bind_instance(BaseStorage, BasicStorage())
+        await DecisionPolicyRecord(
+            service_id="service", rules=self.rules, default=DECISION_REJECT
+        ).save(context)
+
+        policy = await DecisionPolicyRecord.retrieve_by_service_id(context, "service")
+        assert policy.rules == self.rules
+        assert policy.decide({}) == DECISION_REJECT
@@ -0,0 +1,59 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from asynctest import TestCase as AsyncTestCase
+
+from ..models import ServiceIssueRecord
+from ..stats import ISSUE_STATS
+
+
+class TestIssueStats(AsyncTestCase):
+    def create_default_context(self):
+        context = InjectionContext()
+        context.injector.bind_instance(BaseStorage, BasicStorage())
+        return context
+
+    def create_issue(self, exchange_id, author=ServiceIssueRecord.AUTHOR_OTHER):
+        return ServiceIssueRecord(
+            state=ServiceIssueRecord.ISSUE_PENDING,
+            author=author,
+            connection_id="connection",
+            exchange_id=exchange_id,
+            service_id="service",
+        )
+
+    async def test_counters_follow_saves(self):
+        context = self.create_default_context()
+        await self.create_issue("1").save(context)
+
+        stats = await ISSUE_STATS.stats(context)
+        assert stats["total"] == 1
+        assert stats["by_state"] == {ServiceIssueRecord.ISSUE_PENDING: 1}
+
+        issue = self.create_issue("2", ServiceIssueRecord.AUTHOR_SELF)
+        await issue.save(context)
+        issue = await ServiceIssueRecord.retrieve_by_id(context, issue._id)
+        issue.state = ServiceIssueRecord.ISSUE_ACCEPTED
+        await issue.save(context)
+
+        stats = await ISSUE_STATS.stats(context)
+        assert stats["total"] == 2
+        assert stats["by_service_id"] == {"service": 2}
+        assert stats["by_state"] == {
+            ServiceIssueRecord.ISSUE_PENDING: 1,
+            ServiceIssueRecord.ISSUE_ACCEPTED: 1,
+        }
+        assert stats["by_author_state"][ServiceIssueRecord.AUTHOR_SELF] == {
+            ServiceIssueRecord.ISSUE_ACCEPTED: 1
+        }
+        assert stats == await ISSUE_STATS.rebuild(context)
+
+        await issue.delete_record(context)
+        stats = await ISSUE_STATS.stats(context)
+        assert stats["total"] == 1
+        assert stats["by_state"] == {ServiceIssueRecord.ISSUE_PENDING: 1}
+        assert stats == await ISSUE_STATS.rebuild(context)
+
+    async def test_storage_change_rebuilds(self):
+        await self.create_issue("1").save(self.create_default_context())
+        assert (await ISSUE_STATS.stats(self.create_default_context()))["total"] == 0
@@ -0,0 +1,216 @@
+"""
+Local personal data storage implementations, for tests, benchmarks and
+offline development. When a LocalPDS is bound in the injection context
+services.pds uses it instead of the PDS of aries_cloudagent.pdstorage_thcf:
+
+    context.injector.bind_instance(LocalPDS, MemoryPDS(latency=0.01))
+
+or through the settings, verifiable_services.local_pds = "memory" or
+"sqlite:<path>", with verifiable_services.local_pds_latency and
+verifiable_services.local_pds_error_rate applied to every call.
+
+Latency and error rate are either a number applied to every call or a dict
+of call name (pds_save_a, pds_load, load_multiple, pds_link_dri) -> number.
+"""
+from aries_cloudagent.pdstorage_thcf.error import PDSError, PDSRecordNotFoundError
+
+from abc import ABC, abstractmethod
+from collections import defaultdict
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+
+from .settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LocalPDS(ABC):
+    """
+    Records are addressed by a hash of their content, like DRIs,
+    implementations provide the storage of records, tables and links
+    """
+
+    NAME = "local"
+
+    def __init__(self, *, latency=0.0, error_rate=0.0, seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = defaultdict(int)
+
+    @staticmethod
+    def dri_of(payload) -> str:
+        if isinstance(payload, str):
+            serialized = payload
+        else:
+            serialized = json.dumps(payload, sort_keys=True)
+        return hashlib.sha256(serialized.encode("UTF-8")).hexdigest()
+
+    @staticmethod
+    def _for_call(value, call: str) -> float:
+        if isinstance(value, dict):
+            return value.get(call, 0.0)
+        return value or 0.0
+
+    async def _inject(self, call: str):
+        self.calls[call] += 1
+        latency = self._for_call(self.latency, call)
+        if latency:
+            await asyncio.sleep(latency)
+        error_rate = self._for_call(self.error_rate, call)
+        if error_rate and self.random.random() < error_rate:
+            raise PDSError(f"Injected {call} failure")
+
+    async def pds_save_a(self, payload, *, table=None, oca_schema_dri=None) -> str:
+        await self._inject("pds_save_a")
+        dri = self.dri_of(payload)
+        self._save(dri, payload, table, oca_schema_dri)
+        return dri
+
+    async def pds_load(self, dri: str):
+        await self._inject("pds_load")
+        payload = self._load(dri)
+        if payload is None:
+            raise PDSRecordNotFoundError(f"Record not found {dri}")
+        return payload
+
+    async def load_multiple(self, *, table=None, oca_schema_base_dri=None) -> list:
+        await self._inject("load_multiple")
+        return [{"dri": dri, "content": content} for dri, content in self._table(table)]
+
+    async def pds_link_dri(self, from_dri: str, to_dri: str):
+        await self._inject("pds_link_dri")
+        self._link(from_dri, to_dri)
+
+    async def pds_get_active_name(self):
+        return self.NAME
+
+    async def pds_get_usage_policy_if_active_pds_supports_it(self):
+        return None
+
+    @abstractmethod
+    def links_from(self, dri: str) -> list:
+        """DRIs linked from dri, in the order they were linked"""
+
+    @abstractmethod
+    def _save(self, dri, payload, table, oca_schema_dri):
+        """Store payload under dri, a dri saved before is left as it is"""
+
+    @abstractmethod
+    def _load(self, dri):
+        """Payload saved under dri, None if there is none"""
+
+    @abstractmethod
+    def _table(self, table) -> list:
+        """(dri, payload) of the records saved to table, in saving order"""
+
+    @abstractmethod
+    def _link(self, from_dri, to_dri):
+        """Add a link from from_dri to to_dri"""
+
+
+class MemoryPDS(LocalPDS):
+    NAME = "memory"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.records = {}
+        self.tables = defaultdict(list)
+        self.links = defaultdict(list)
+
+    def links_from(self, dri: str) -> list:
+        return list(self.links[dri])
+
+    def _save(self, dri, payload, table, oca_schema_dri):
+        if dri not in self.records:
+            self.records[dri] = payload
+            self.tables[table].append(dri)
+
+    def _load(self, dri):
+        return self.records.get(dri)
+
+    def _table(self, table) -> list:
+        return [(dri, self.records[dri]) for dri in self.tables[table]]
+
+    def _link(self, from_dri, to_dri):
+        self.links[from_dri].append(to_dri)
+
+
+class SQLitePDS(LocalPDS):
+    NAME = "sqlite"
+
+    def __init__(self, path: str = ":memory:", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records "
+                "(dri TEXT PRIMARY KEY, tbl TEXT, oca_schema_dri TEXT, payload TEXT)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS records_tbl ON records (tbl)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS links (from_dri TEXT, to_dri TEXT)"
+            )
+
+    def links_from(self, dri: str) -> list:
+        rows = self.connection.execute(
+            "SELECT to_dri FROM links WHERE from_dri = ? ORDER BY rowid", (dri,)
+        )
+        return [row[0] for row in rows]
+
+    def _save(self, dri, payload, table, oca_schema_dri):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?)",
+                (dri, table, oca_schema_dri, json.dumps(payload)),
+            )
+
+    def _load(self, dri):
+        row = self.connection.execute(
+            "SELECT payload FROM records WHERE dri = ?", (dri,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _table(self, table) -> list:
+        if table is None:
+            rows = self.connection.execute(
+                "SELECT dri, payload FROM records WHERE tbl IS NULL ORDER BY rowid"
+            )
+        else:
+            rows = self.connection.execute(
+                "SELECT dri, payload FROM records WHERE tbl = ? ORDER BY rowid",
+                (table,),
+            )
+        return [(dri, json.loads(payload)) for dri, payload in rows]
+
+    def _link(self, from_dri, to_dri):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO links VALUES (?, ?)", (from_dri, to_dri)
+            )
+
+
+def local_pds_from_settings(settings):
+    """LocalPDS configured by the plugin settings, None if not enabled"""
+    target = get_setting(settings, "local_pds")
+    if not target:
+        return None
+
+    options = {
+        "latency": get_setting(settings, "local_pds_latency", 0.0),
+        "error_rate": get_setting(settings, "local_pds_error_rate", 0.0),
+    }
+    if target == "memory":
+        return MemoryPDS(**options)
+    if target.startswith("sqlite:"):
+        return SQLitePDS(target[len("sqlite:") :], **options)
+
+    LOGGER.warning("Unknown local PDS %s, using the agent PDS", target)
+    return None
@@ -0,0 +1,265 @@
+"""
+Latency histograms and counters of the plugin, rendered in the
+Prometheus text exposition format by the metrics admin route.
+"""
+from aiohttp import web
+from aiohttp_apispec import docs
+
+from bisect import bisect_left
+import functools
+import time
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_CLIENT_ERROR = "client_error"
+OUTCOME_ERROR = "error"
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = {
+        key: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for key, value in labels.items()
+    }
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets=None):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        # label values -> [bucket counts..., sum, count]
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, series in sorted(self.series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series[:-2]):
+                cumulative += count
+                bucket_labels = format_labels({**labels, "le": format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(
+                f"{self.name}_bucket{format_labels({**labels, 'le': '+Inf'})} "
+                f"{series[-1]}"
+            )
+            lines.append(f"{self.name}_sum{format_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.series.items()):
+            labels = format_labels(dict(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """
+    Value is read from the callback on every render, callback returns
+    a number or a dict of label values -> number. metric_type can be set to
+    "counter" for values that only grow and are kept elsewhere.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback,
+        labelnames: tuple = (),
+        metric_type: str = "gauge",
+    ):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = labelnames
+        self.metric_type = metric_type
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        value = self.callback()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for key, current in sorted(value.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            labels = format_labels(dict(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {format_value(current)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labelnames, buckets=None) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, callback, labelnames=(), metric_type="gauge"):
+        return self.register(Gauge(name, help, callback, labelnames, metric_type))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "verifiable_services_handler_seconds",
+    "Time spent handling agent messages",
+    ("handler", "outcome"),
+)
+ROUTE_LATENCY = REGISTRY.histogram(
+    "verifiable_services_route_seconds",
+    "Time spent serving admin routes",
+    ("method", "route", "outcome"),
+)
+PDS_LATENCY = REGISTRY.histogram(
+    "verifiable_services_pds_seconds",
+    "Time spent in personal data storage calls",
+    ("call", "outcome"),
+)
+STORAGE_LATENCY = REGISTRY.histogram(
+    "verifiable_services_storage_seconds",
+    "Time spent in wallet storage calls",
+    ("call", "record_type", "outcome"),
+)
+
+
+class timed:
+    """
+    Async context manager, observes the time spent in the block
+    labeled with its outcome
+    """
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    async def __aenter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        outcome = OUTCOME_SUCCESS if exc_type is None else OUTCOME_ERROR
+        self.histogram.observe(
+            time.perf_counter() - self.start, outcome=outcome, **self.labels
+        )
+        return False
+
+
+def timed_handler(handle):
+    """Decorator for BaseHandler.handle, labels with the handler class name"""
+
+    @functools.wraps(handle)
+    async def wrapper(self, context, responder):
+        async with timed(HANDLER_LATENCY, handler=type(self).__name__):
+            return await handle(self, context, responder)
+
+    return wrapper
+
+
+ROUTE_PREFIX = "/verifiable-services"
+
+
+@web.middleware
+async def metrics_middleware(request: web.BaseRequest, handler):
+    route = request.match_info.route.resource
+    route = route.canonical if route is not None else None
+    if route is None or not route.startswith(ROUTE_PREFIX):
+        return await handler(request)
+
+    start = time.perf_counter()
+    outcome = OUTCOME_ERROR
+    try:
+        response = await handler(request)
+        outcome = OUTCOME_SUCCESS if response.status < 400 else OUTCOME_CLIENT_ERROR
+        if response.status >= 500:
+            outcome = OUTCOME_ERROR
+        return response
+    except web.HTTPException as err:
+        outcome = OUTCOME_CLIENT_ERROR if err.status < 500 else OUTCOME_ERROR
+        raise
+    finally:
+        ROUTE_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route,
+            outcome=outcome,
+        )
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Plugin metrics in Prometheus text format",
+)
+async def get_metrics(request: web.BaseRequest):
+    return web.Response(
+        text=REGISTRY.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
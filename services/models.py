@@ -7,39 +7,16 @@ from aries_cloudagent.storage.error import (
 
 from marshmallow import fields, Schema
 from .consents.models.defined_consent import DefinedConsentRecord
+from .schemas import ConsentContentSchema, ConsentSchema, ServiceSchema, OcaSchema
+from .catalog.cache import CATALOG_CACHE
+from .records import PluginRecord
 import logging
 from aiohttp import web
 
 LOGGER = logging.getLogger(__name__)
 
 
-class ConsentContentSchema(Schema):
-    expiration = fields.Str(required=True)
-    limitation = fields.Str(required=True)
-    dictatedBy = fields.Str(required=True)
-    validityTTL = fields.Str(required=True)
-
-
-class ConsentSchema(Schema):
-    # dri - decentralized resource identifier
-    oca_schema_dri = fields.Str(required=False)
-    oca_schema_namespace = fields.Str(required=False)
-    oca_data_dri = fields.Str(required=False)
-    oca_data = fields.Dict()
-    usage_policy = fields.Str(required=False)
-
-
-class ServiceSchema(Schema):
-    oca_schema_dri = fields.Str(required=True)
-    oca_schema_namespace = fields.Str(required=True)
-
-
-class OcaSchema(Schema):
-    oca_schema_dri = fields.Str(required=False)
-    oca_schema_namespace = fields.Str(required=False)
-
-
-class ServiceRecord(BaseRecord):
+class ServiceRecord(PluginRecord):
     RECORD_ID_NAME = "record_id"
     RECORD_TYPE = "verifiable_services"
 
@@ -80,6 +57,14 @@ class ServiceRecord(BaseRecord):
     def record_tags(self) -> dict:
         return {"label": self.label}
 
+    async def post_save(self, context, *args, **kwargs):
+        await super().post_save(context, *args, **kwargs)
+        CATALOG_CACHE.invalidate()
+
+    async def delete_record(self, context):
+        await super().delete_record(context)
+        CATALOG_CACHE.invalidate()
+
     @classmethod
     async def query_fully_serialized(
         cls,
@@ -100,6 +85,10 @@ class ServiceRecord(BaseRecord):
 
         print("QUERY: ", query)
 
+        consents = await DefinedConsentRecord.retrieve_many_fully_serialized(
+            context, [current.consent_id for current in query]
+        )
+
         result = []
         for current in query:
             record = current.serialize()
@@ -107,11 +96,10 @@ class ServiceRecord(BaseRecord):
                 record.pop("certificate_schema", None)
 
             try:
-                record[
-                    "consent_schema"
-                ] = await DefinedConsentRecord.retrieve_by_id_fully_serialized(
-                    context, record["consent_id"]
-                )
+                consent = consents[record["consent_id"]]
+                if isinstance(consent, Exception):
+                    raise consent
+                record["consent_schema"] = dict(consent)
             except StorageError as err:
                 if skip_invalid:
                     LOGGER.warn("Consent not found when serializing service %s", err)
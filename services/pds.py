@@ -0,0 +1,383 @@
+from aries_cloudagent.pdstorage_thcf.api import *
+from aries_cloudagent.pdstorage_thcf import api as pds_api
+from aries_cloudagent.storage.base import BaseStorage
+
+import asyncio
+import copy
+import logging
+import json
+
+from .metrics import timed, PDS_LATENCY, REGISTRY
+from .tracing import traced, TRACER
+from .local_pds import LocalPDS
+from .cache import TTLCache
+from .settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+# NOTE: PDS access of the plugin goes through this module, the functions
+# below shadow the ones from pdstorage_thcf.api so that every call is
+# measured and traced, import them with "from ..pds import *"
+# A LocalPDS bound in the injection context takes the place of the agent PDS
+
+
+class PDSBatcher:
+    """
+    Caps the number of PDS calls in flight and coalesces loads,
+    load_many calls of the same PDS issued within one event loop tick
+    share their pds_load calls: every DRI is loaded once, with the
+    context of the first caller that requested it, and the loads run
+    concurrently under the semaphore.
+    """
+
+    def __init__(self, max_concurrency: int = 32):
+        self.max_concurrency = max_concurrency
+        self.stats = {"requested": 0, "loaded": 0, "batches": 0}
+        self._loop = None
+        self._semaphore = None
+        # (storage, LocalPDS) -> {dri: (context, parent span, future)}
+        self._loads = {}
+
+    def configure(self, settings):
+        self.max_concurrency = get_setting(
+            settings, "pds_max_concurrency", self.max_concurrency
+        )
+        self._loop = None
+
+    def _ensure_loop(self):
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loads = {}
+        return loop
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        self._ensure_loop()
+        return self._semaphore
+
+    async def load_many(self, context, dris, *, return_exceptions=False) -> list:
+        loop = self._ensure_loop()
+        # the agent PDS is the active PDS of the storage, keyed like
+        # the ACTIVE_PDS metadata
+        key = (
+            await context.inject(BaseStorage, required=False),
+            await context.inject(LocalPDS, required=False),
+        )
+        if key not in self._loads:
+            self._loads[key] = {}
+            loop.call_soon(self._flush_loads, key)
+
+        # the batch runs in a task of its own, loads stay children of
+        # the span of the caller that requested them first
+        parent = TRACER.active_span()
+        pending = self._loads[key]
+        futures = []
+        for dri in dris:
+            if dri not in pending:
+                pending[dri] = (context, parent, loop.create_future())
+            futures.append(asyncio.shield(pending[dri][2]))
+        self.stats["requested"] += len(futures)
+
+        return await asyncio.gather(*futures, return_exceptions=return_exceptions)
+
+    def _flush_loads(self, key):
+        pending = self._loads.pop(key)
+        self.stats["batches"] += 1
+        self.stats["loaded"] += len(pending)
+        self._loop.create_task(self._load_batch(pending))
+
+    async def _load_batch(self, pending: dict):
+        async def load(dri, context, parent, future):
+            try:
+                result = await TRACER.adopt(parent, pds_load(context, dri))
+            except Exception as err:
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+        await asyncio.gather(
+            *(load(dri, *requested) for dri, requested in pending.items())
+        )
+
+
+PDS_BATCHER = PDSBatcher()
+
+REGISTRY.gauge(
+    "verifiable_services_pds_batch_total",
+    "PDS loads requested through load_many, loaded after coalescing and batches",
+    lambda: dict(PDS_BATCHER.stats),
+    labelnames=("kind",),
+    metric_type="counter",
+)
+
+
+def pds_timer(call: str):
+    return traced("pds." + call, timed(PDS_LATENCY, call=call))
+
+
+async def call_pds(context, call: str, *args, **kwargs):
+    async with PDS_BATCHER.semaphore:
+        local = await context.inject(LocalPDS, required=False)
+        if local is not None:
+            return await getattr(local, call)(*args, **kwargs)
+        return await getattr(pds_api, call)(context, *args, **kwargs)
+
+
+async def pds_save_a(context, *args, **kwargs):
+    async with pds_timer("pds_save_a"):
+        return await call_pds(context, "pds_save_a", *args, **kwargs)
+
+
+async def pds_load(context, *args, **kwargs):
+    async with pds_timer("pds_load"):
+        return await call_pds(context, "pds_load", *args, **kwargs)
+
+
+async def load_multiple(context, *args, **kwargs):
+    async with pds_timer("load_multiple"):
+        return await call_pds(context, "load_multiple", *args, **kwargs)
+
+
+async def pds_link_dri(context, *args, **kwargs):
+    async with pds_timer("pds_link_dri"):
+        return await call_pds(context, "pds_link_dri", *args, **kwargs)
+
+
+class ActivePDSMetadata:
+    """
+    Name and usage policy of the active PDS, looked up once and kept for
+    ttl seconds (0 turns the cache off). The active PDS is only changed
+    through the agent admin API, invalidate() is called when a /pds admin
+    route changes something. Values are kept per storage and LocalPDS,
+    concurrent lookups share one call and failures are not kept.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        # (storage, LocalPDS, call) -> value
+        self._values = TTLCache(max_size=64, ttl=ttl)
+        self._pending = {}
+
+    def configure(self, settings):
+        self.ttl = get_setting(settings, "pds_metadata_ttl", self.ttl)
+        self._values.ttl = self.ttl or None
+        self.invalidate()
+
+    def invalidate(self):
+        self._values.clear()
+        self._pending = {}
+
+    async def get(self, context, call: str, timer: str):
+        if not self.ttl:
+            return await self._call(context, call, timer)
+
+        key = (
+            await context.inject(BaseStorage, required=False),
+            await context.inject(LocalPDS, required=False),
+            call,
+        )
+        if key in self._values:
+            self.stats["hits"] += 1
+            return self._values.get(key)
+
+        self.stats["misses"] += 1
+        pending = self._pending.get(key)
+        if pending is None or pending.done():
+            pending = asyncio.ensure_future(self._lookup(context, key, timer))
+            self._pending[key] = pending
+        return await asyncio.shield(pending)
+
+    @staticmethod
+    async def _call(context, call: str, timer: str):
+        async with pds_timer(timer):
+            return await call_pds(context, call)
+
+    async def _lookup(self, context, key, timer):
+        pending = self._pending
+        try:
+            value = await self._call(context, key[-1], timer)
+        finally:
+            pending.pop(key, None)
+        # invalidated in the meantime, the value may be of the previous PDS
+        if pending is self._pending:
+            self._values[key] = value
+        return value
+
+
+ACTIVE_PDS = ActivePDSMetadata()
+
+REGISTRY.gauge(
+    "verifiable_services_pds_metadata_total",
+    "Active PDS name and usage policy lookups by cache result",
+    lambda: dict(ACTIVE_PDS.stats),
+    labelnames=("result",),
+    metric_type="counter",
+)
+
+
+async def pds_get_active_name(context):
+    return await ACTIVE_PDS.get(
+        context, "pds_get_active_name", timer="pds_get_active_name"
+    )
+
+
+async def pds_get_usage_policy_if_active_pds_supports_it(context):
+    return await ACTIVE_PDS.get(
+        context,
+        "pds_get_usage_policy_if_active_pds_supports_it",
+        timer="pds_get_usage_policy",
+    )
+
+
+async def load_many(context, dris, *, return_exceptions=False) -> list:
+    """pds_load of every DRI, in order, concurrent requests are coalesced"""
+    return await PDS_BATCHER.load_many(
+        context, list(dris), return_exceptions=return_exceptions
+    )
+
+
+async def save_many(context, saves, *, return_exceptions=False) -> list:
+    """pds_save_a of every (payload, options) pair, returns the DRIs in order"""
+    parent = TRACER.active_span()
+    return await asyncio.gather(
+        *(
+            TRACER.adopt(parent, pds_save_a(context, payload, **options))
+            for payload, options in saves
+        ),
+        return_exceptions=return_exceptions,
+    )
+
+
+async def link_many(context, links, *, return_exceptions=False) -> list:
+    """pds_link_dri of every (from_dri, to_dri) pair"""
+    parent = TRACER.active_span()
+    return await asyncio.gather(
+        *(
+            TRACER.adopt(parent, pds_link_dri(context, from_dri, to_dri))
+            for from_dri, to_dri in links
+        ),
+        return_exceptions=return_exceptions,
+    )
+
+
+async def certificate_get(context, oca_schema_dri):
+    certificate = await load_multiple(
+        context,
+        table="dip.data.tda.oca_chunks.predefined." + oca_schema_dri,
+    )
+
+    if len(certificate) == 0:
+        return None
+    elif len(certificate) > 1:
+        LOGGER.warning("More than one predefined oca_schema for this dri!")
+
+    certificate = certificate[0]["content"]
+    if isinstance(certificate, str):
+        certificate = json.loads(certificate)
+    return certificate
+
+
+class LinkNode:
+    """DRI graph node, dri is known once the graph is committed"""
+
+    __slots__ = ("payload", "options", "dri")
+
+    def __init__(self, payload, options: dict):
+        self.payload = payload
+        self.options = options
+        self.dri = None
+
+
+class LinkGraph:
+    """
+    DRI link graph of one exchange, collects the nodes to save and the
+    links between DRIs or nodes, commit() saves every node concurrently
+    and then creates every link concurrently. Two round trips no matter
+    how many nodes and links there are.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.links = []
+
+    def node(self, payload, **options) -> LinkNode:
+        node = LinkNode(payload, options)
+        self.nodes.append(node)
+        return node
+
+    def link(self, from_dri, to_dri):
+        self.links.append((from_dri, to_dri))
+
+    def report(self, cred_dri, report_data_dri, exchange_id) -> LinkNode:
+        """credential -> report pointer -> report data"""
+        pointer = self.node(
+            {"dri": report_data_dri},
+            oca_schema_dri="dip.data.tda.raport." + exchange_id,
+        )
+        self.link(cred_dri, pointer)
+        self.link(pointer, report_data_dri)
+        return pointer
+
+    @staticmethod
+    def _dri(value) -> str:
+        return value.dri if isinstance(value, LinkNode) else value
+
+    async def commit(self, context):
+        if self.nodes:
+            dris = await save_many(
+                context, [(node.payload, node.options) for node in self.nodes]
+            )
+            for node, dri in zip(self.nodes, dris):
+                node.dri = dri
+        if self.links:
+            await link_many(
+                context, [(self._dri(a), self._dri(b)) for a, b in self.links]
+            )
+
+
+CERTIFICATE_TABLE = "dip.data.tda.oca_chunks."
+CERTIFICATE_TEMPLATE_TABLE = "dip.data.tda.oca_chunks.template."
+# certificates stored as a delta (certificate_delta_storage setting) are kept
+# apart, readers of CERTIFICATE_TABLE only ever see whole certificates
+CERTIFICATE_DELTA_TABLE = "dip.data.tda.oca_chunks.delta."
+CERTIFICATE_TEMPLATE_DRI = "certificate_template_dri"
+CERTIFICATE_DELTA = "certificate_delta"
+# template DRI -> template, DRIs address the content so entries never go stale
+CERTIFICATE_TEMPLATES = TTLCache(max_size=256)
+
+
+def certificate_delta(template_dri: str, delta: dict) -> dict:
+    """Certificate stored as a reference to its template and the changed fields"""
+    return {CERTIFICATE_TEMPLATE_DRI: template_dri, CERTIFICATE_DELTA: delta}
+
+
+async def certificate_load(context, dri: str):
+    """pds_load which also puts together certificates stored as a delta"""
+    data = await pds_load(context, dri)
+    if isinstance(data, str):
+        data = json.loads(data)
+    if not isinstance(data, dict) or CERTIFICATE_TEMPLATE_DRI not in data:
+        return data
+
+    template_dri = data[CERTIFICATE_TEMPLATE_DRI]
+    template = CERTIFICATE_TEMPLATES.get(template_dri)
+    if template is None:
+        template = await pds_load(context, template_dri)
+        if isinstance(template, str):
+            template = json.loads(template)
+        CERTIFICATE_TEMPLATES[template_dri] = template
+
+    certificate = copy.deepcopy(template)
+    certificate.update(data[CERTIFICATE_DELTA])
+    return certificate
+
+
+async def link_report(context, cred_dri, report_data_dri, exchange_id):
+    graph = LinkGraph()
+    graph.report(cred_dri, report_data_dri, exchange_id)
+    await graph.commit(context)
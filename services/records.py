@@ -0,0 +1,131 @@
+from aries_cloudagent.messaging.models.base_record import BaseRecord
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.messaging.util import time_now
+
+from abc import abstractmethod
+from typing import Mapping, Any
+import hashlib
+import json
+
+from .metrics import timed, STORAGE_LATENCY
+from .tracing import traced
+
+
+class PluginRecord(BaseRecord):
+    """Base of the plugin records, measures and traces every storage call"""
+
+    @classmethod
+    def storage_timer(cls, call: str):
+        return traced(
+            "storage." + call,
+            timed(STORAGE_LATENCY, call=call, record_type=cls.RECORD_TYPE),
+            record_type=cls.RECORD_TYPE,
+        )
+
+    @classmethod
+    async def retrieve_by_id(cls, context, record_id, *args, **kwargs):
+        async with cls.storage_timer("retrieve_by_id"):
+            return await super().retrieve_by_id(context, record_id, *args, **kwargs)
+
+    @classmethod
+    async def retrieve_by_tag_filter(cls, context, tag_filter, *args, **kwargs):
+        async with cls.storage_timer("retrieve_by_tag_filter"):
+            return await super().retrieve_by_tag_filter(
+                context, tag_filter, *args, **kwargs
+            )
+
+    @classmethod
+    async def query(cls, context, *args, **kwargs):
+        async with cls.storage_timer("query"):
+            return await super().query(context, *args, **kwargs)
+
+    async def save(self, context, **kwargs) -> str:
+        async with self.storage_timer("save"):
+            return await super().save(context, **kwargs)
+
+    async def delete_record(self, context):
+        async with self.storage_timer("delete_record"):
+            return await super().delete_record(context)
+
+
+class HashIdRecord(PluginRecord):
+    """
+    Record which id is a hash of unique_record_values instead of an uuid,
+    saving a second record with the same unique values is rejected by
+    the storage with StorageDuplicateError
+    """
+
+    @property
+    @abstractmethod
+    def unique_record_values(self) -> dict:
+        """Hash id of a record is based on those values"""
+
+    @staticmethod
+    def hash_id(unique_record_values: dict) -> str:
+        unique_record_value = json.dumps(unique_record_values)
+        return hashlib.sha256(unique_record_value.encode("UTF-8")).hexdigest()
+
+    async def save(
+        self,
+        context: InjectionContext,
+        *,
+        reason: str = None,
+        log_params: Mapping[str, Any] = None,
+        log_override: bool = False,
+        webhook: bool = None,
+    ) -> str:
+        """Persist the record to storage.
+
+        Args:
+            context: The injection context to use
+            reason: A reason to add to the log
+            log_params: Additional parameters to log
+            webhook: Flag to override whether the webhook is sent
+
+         NOTE: only deviation from the standard
+               is in id generation (hash based)
+        """
+        async with self.storage_timer("save"):
+            return await self._save(
+                context,
+                reason=reason,
+                log_params=log_params,
+                log_override=log_override,
+                webhook=webhook,
+            )
+
+    async def _save(self, context, *, reason, log_params, log_override, webhook):
+        new_record = None
+        log_reason = reason or ("Updated record" if self._id else "Created record")
+        try:
+            self.updated_at = time_now()
+            storage: BaseStorage = await context.inject(BaseStorage)
+            if not self._id:
+                # NOTE: only change here, calculating id
+                self._id = self.hash_id(self.unique_record_values)
+
+                self.created_at = self.updated_at
+                try:
+                    await storage.add_record(self.storage_record)
+                except Exception:
+                    self._id = None
+                    raise
+                new_record = True
+            else:
+                record = self.storage_record
+                await storage.update_record_value(record, record.value)
+                await storage.update_record_tags(record, record.tags)
+                new_record = False
+        finally:
+            params = {self.RECORD_TYPE: self.serialize()}
+            if log_params:
+                params.update(log_params)
+            if new_record is None:
+                log_reason = f"FAILED: {log_reason}"
+            self.log_state(context, log_reason, params, override=log_override)
+
+        await self.post_save(context, new_record, self._last_state, webhook)
+        self._last_state = self.state
+
+        return self._id
@@ -1,14 +1,119 @@
+from importlib import import_module
+import asyncio
+
 from aiohttp import web
+from aiohttp_apispec import docs
 
-from .issue.routes import *
-from .discovery.routes import *
-from .consents.routes import *
+from .webhooks import WEBHOOK_QUEUE
+from .metrics import metrics_middleware, get_metrics
+from .tracing import TRACER, get_traces
 
 # NOTE: define functions in sub routes files (i.e issue.routes) and register
-# them here
+# them here, sub routes modules are imported when routes get registered
+# so that importing the plugin stays cheap
+ROUTE_MODULES = (
+    ".issue.routes",
+    ".discovery.routes",
+    ".consents.routes",
+    ".catalog.routes",
+)
+
+
+def __getattr__(name):
+    """Lazily resolve route functions from the sub routes modules"""
+    for module_name in ROUTE_MODULES:
+        module = import_module(module_name, __package__)
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Outbound webhook queue depth and delivery counters",
+)
+async def webhook_queue_stats(request: web.BaseRequest):
+    return web.json_response(
+        {
+            "success": True,
+            "result": {"depth": WEBHOOK_QUEUE.depth, **WEBHOOK_QUEUE.stats},
+        }
+    )
+
+
+@web.middleware
+async def pds_change_middleware(request: web.BaseRequest, handler):
+    """The agent /pds admin routes can change the active PDS"""
+    from .pds import ACTIVE_PDS
+
+    try:
+        return await handler(request)
+    finally:
+        if request.method != "GET" and request.path.startswith("/pds"):
+            ACTIVE_PDS.invalidate()
 
 
 async def register(app: web.Application):
+    from .issue.routes import (
+        apply,
+        get_issue_self,
+        get_issue_by_id,
+        query_report,
+        process_application,
+        get_issue_stats,
+        rebuild_issue_stats,
+        get_recent_issues,
+        set_decision_policy,
+        get_decision_policy,
+        get_credential_data,
+    )
+    from .discovery.routes import (
+        add_service,
+        request_services_list,
+        self_service_list,
+        get_service,
+        DEBUGrequest_services_list,
+        search_services,
+    )
+    from .consents.routes import add_consent, get_consents, get_consents_given
+    from .catalog.routes import (
+        import_catalog,
+        export_catalog_snapshot,
+        import_catalog_snapshot,
+        load_catalog_snapshot,
+    )
+
+    from .local_pds import LocalPDS, local_pds_from_settings
+    from .pds import PDS_BATCHER, ACTIVE_PDS
+    from .issue.archive import ISSUE_ARCHIVER
+    from .catalog.cache import CATALOG_CACHE
+    from .issue.index import warm_up_issue_views
+    from .issue.handlers import configure_application_dedup, configure_proof_cache
+    from .issue.admission import APPLICATION_ADMISSION
+    from .issue.intake import APPLICATION_INTAKE
+
+    context = app.get("request_context")
+    WEBHOOK_QUEUE.configure(context.settings if context else None)
+    TRACER.configure(context.settings if context else None)
+    PDS_BATCHER.configure(context.settings if context else None)
+    ACTIVE_PDS.configure(context.settings if context else None)
+    CATALOG_CACHE.configure(context.settings if context else None)
+    ISSUE_ARCHIVER.configure(context.settings if context else None)
+    configure_application_dedup(context.settings if context else None)
+    configure_proof_cache(context.settings if context else None)
+    APPLICATION_ADMISSION.configure(context.settings if context else None)
+    APPLICATION_INTAKE.configure(context.settings if context else None)
+    if context:
+        local_pds = local_pds_from_settings(context.settings)
+        if local_pds is not None:
+            context.injector.bind_instance(LocalPDS, local_pds)
+        await load_catalog_snapshot(context)
+        asyncio.ensure_future(warm_up_issue_views(context))
+        ISSUE_ARCHIVER.start(context)
+
+    app.middlewares.append(metrics_middleware)
+    app.middlewares.append(pds_change_middleware)
+
     app.add_routes(
         [
             web.post("/verifiable-services/add", add_service),
@@ -22,6 +127,20 @@ async def register(app: web.Application):
                 get_issue_by_id,
                 allow_head=False,
             ),
+            web.get(
+                "/verifiable-services/issue-stats",
+                get_issue_stats,
+                allow_head=False,
+            ),
+            web.post(
+                "/verifiable-services/issue-stats/rebuild",
+                rebuild_issue_stats,
+            ),
+            web.get(
+                "/verifiable-services/issues/recent",
+                get_recent_issues,
+                allow_head=False,
+            ),
             web.get(
                 "/verifiable-services/report/{associatedReportID}",
                 query_report,
@@ -31,6 +150,20 @@ async def register(app: web.Application):
                 "/verifiable-services/process-application",
                 process_application,
             ),
+            web.get(
+                "/verifiable-services/credential-data/{data_dri}",
+                get_credential_data,
+                allow_head=False,
+            ),
+            web.post(
+                "/verifiable-services/decision-policy",
+                set_decision_policy,
+            ),
+            web.get(
+                "/verifiable-services/decision-policy/{service_id}",
+                get_decision_policy,
+                allow_head=False,
+            ),
             web.get(
                 "/verifiable-services/request-service-list/{connection_id}",
                 request_services_list,
@@ -46,18 +179,40 @@ async def register(app: web.Application):
                 get_service,
                 allow_head=False,
             ),
+            web.get(
+                "/verifiable-services/services/search",
+                search_services,
+                allow_head=False,
+            ),
             web.get(
                 "/verifiable-services/DEBUGrequest/{connection_id}",
                 DEBUGrequest_services_list,
                 allow_head=False,
             ),
             web.post("/verifiable-services/consents", add_consent),
+            web.post("/verifiable-services/catalog/import", import_catalog),
+            web.get(
+                "/verifiable-services/catalog/snapshot",
+                export_catalog_snapshot,
+                allow_head=False,
+            ),
+            web.post(
+                "/verifiable-services/catalog/snapshot",
+                import_catalog_snapshot,
+            ),
             web.get("/verifiable-services/consents", get_consents, allow_head=False),
             web.get(
                 "/verifiable-services/given-consents",
                 get_consents_given,
                 allow_head=False,
             ),
+            web.get(
+                "/verifiable-services/webhook-queue",
+                webhook_queue_stats,
+                allow_head=False,
+            ),
+            web.get("/verifiable-services/metrics", get_metrics, allow_head=False),
+            web.get("/verifiable-services/traces", get_traces, allow_head=False),
             # web.get(
             #     "/verifiable-services/get-credential-data/{data_dri}",
             #     DEBUGget_credential_data,
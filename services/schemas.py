@@ -0,0 +1,30 @@
+from marshmallow import fields, Schema
+
+# NOTE: plain marshmallow schemas shared by message types and records,
+# kept apart from models so that loading message types stays cheap
+
+
+class ConsentContentSchema(Schema):
+    expiration = fields.Str(required=True)
+    limitation = fields.Str(required=True)
+    dictatedBy = fields.Str(required=True)
+    validityTTL = fields.Str(required=True)
+
+
+class ConsentSchema(Schema):
+    # dri - decentralized resource identifier
+    oca_schema_dri = fields.Str(required=False)
+    oca_schema_namespace = fields.Str(required=False)
+    oca_data_dri = fields.Str(required=False)
+    oca_data = fields.Dict()
+    usage_policy = fields.Str(required=False)
+
+
+class ServiceSchema(Schema):
+    oca_schema_dri = fields.Str(required=True)
+    oca_schema_namespace = fields.Str(required=True)
+
+
+class OcaSchema(Schema):
+    oca_schema_dri = fields.Str(required=False)
+    oca_schema_namespace = fields.Str(required=False)
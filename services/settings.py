@@ -0,0 +1,27 @@
+import os
+
+# Plugin settings can be passed to acapy as regular settings
+# (i.e. "verifiable_services.webhook_queue_size") or through the
+# environment (i.e. VERIFIABLE_SERVICES_WEBHOOK_QUEUE_SIZE)
+SETTINGS_PREFIX = "verifiable_services."
+ENVIRONMENT_PREFIX = "VERIFIABLE_SERVICES_"
+
+
+def get_setting(settings, name: str, default=None):
+    """
+    Read a plugin setting, value is cast to the type of the default
+    when the default is provided.
+    """
+    value = None
+    if settings is not None:
+        value = settings.get(SETTINGS_PREFIX + name)
+    if value is None:
+        value = os.environ.get(ENVIRONMENT_PREFIX + name.upper())
+    if value is None:
+        return default
+
+    if isinstance(default, bool) and isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    if default is not None and not isinstance(value, type(default)):
+        return type(default)(value)
+    return value
@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from ..cache import TTLCache
+
+
+class TestTTLCache(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = TTLCache(max_size=2, ttl=10, clock=lambda: self.now)
+
+    def test_least_recently_used_is_dropped(self):
+        self.cache["a"] = 1
+        self.cache["b"] = 2
+        assert self.cache.get("a") == 1
+        self.cache["c"] = 3
+
+        assert "b" not in self.cache
+        assert self.cache.get("a") == 1
+        assert self.cache.get("c") == 3
+
+    def test_entries_expire(self):
+        self.cache["a"] = None
+        assert "a" in self.cache
+        assert self.cache.get("a", "missing") is None
+
+        self.now = 10.0
+        assert "a" not in self.cache
+        assert self.cache.pop("a", "missing") == "missing"
+        assert len(self.cache) == 0
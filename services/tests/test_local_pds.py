@@ -0,0 +1,55 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.pdstorage_thcf.error import PDSError, PDSRecordNotFoundError
+from asynctest import TestCase as AsyncTestCase
+
+from ..local_pds import *
+from .. import pds
+
+
+class TestLocalPDS(AsyncTestCase):
+    async def check_roundtrip(self, local):
+        dri = await local.pds_save_a({"a": 1}, table="table")
+        assert await local.pds_load(dri) == {"a": 1}
+        assert await local.pds_save_a({"a": 1}, table="table") == dri
+        assert await local.load_multiple(table="table") == [
+            {"dri": dri, "content": {"a": 1}}
+        ]
+
+        await local.pds_link_dri(dri, "other")
+        assert local.links_from(dri) == ["other"]
+
+        with self.assertRaises(PDSRecordNotFoundError):
+            await local.pds_load("missing")
+
+    async def test_memory(self):
+        await self.check_roundtrip(MemoryPDS())
+
+    async def test_sqlite(self):
+        await self.check_roundtrip(SQLitePDS())
+
+    async def test_error_injection(self):
+        local = MemoryPDS(error_rate={"pds_load": 1.0})
+        dri = await local.pds_save_a("payload")
+        with self.assertRaises(PDSError):
+            await local.pds_load(dri)
+        assert local.calls == {"pds_save_a": 1, "pds_load": 1}
+
+    async def test_bound_in_context(self):
+        context = InjectionContext()
+        local = MemoryPDS()
+        context.injector.bind_instance(LocalPDS, local)
+
+        dri = await pds.pds_save_a(context, {"a": 1}, oca_schema_dri="schema")
+        assert await pds.pds_load(context, dri) == {"a": 1}
+        assert await pds.pds_get_active_name(context) == MemoryPDS.NAME
+
+    def test_from_settings(self):
+        assert local_pds_from_settings({}) is None
+        local = local_pds_from_settings(
+            {
+                "verifiable_services.local_pds": "sqlite::memory:",
+                "verifiable_services.local_pds_latency": "0.01",
+            }
+        )
+        assert isinstance(local, SQLitePDS)
+        assert local.latency == 0.01
@@ -0,0 +1,45 @@
+from asynctest import TestCase as AsyncTestCase
+
+from ..metrics import *
+
+
+class TestMetrics(AsyncTestCase):
+    def test_histogram_render(self):
+        histogram = Histogram(
+            "test_seconds", "Test", ("call", "outcome"), buckets=(0.1, 1.0)
+        )
+        histogram.observe(0.05, call="load", outcome="success")
+        histogram.observe(0.5, call="load", outcome="success")
+        histogram.observe(5.0, call="load", outcome="success")
+
+        lines = histogram.render()
+        assert "# TYPE test_seconds histogram" in lines
+        labels = 'call="load",outcome="success"'
+        assert f'test_seconds_bucket{{{labels},le="0.1"}} 1' in lines
+        assert f'test_seconds_bucket{{{labels},le="1.0"}} 2' in lines
+        assert f'test_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f"test_seconds_count{{{labels}}} 3" in lines
+
+    def test_label_escaping(self):
+        assert format_labels({"route": 'a"b\\c'}) == '{route="a\\"b\\\\c"}'
+
+    async def test_timed_labels_outcome(self):
+        histogram = Histogram("test_seconds", "Test", ("call", "outcome"))
+
+        async with timed(histogram, call="save"):
+            pass
+        with self.assertRaises(ValueError):
+            async with timed(histogram, call="save"):
+                raise ValueError()
+
+        assert histogram.series[("save", OUTCOME_SUCCESS)][-1] == 1
+        assert histogram.series[("save", OUTCOME_ERROR)][-1] == 1
+
+    def test_registry_render(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test", ("outcome",)).inc(outcome="success")
+        registry.gauge("test_depth", "Test", lambda: 3)
+
+        text = registry.render()
+        assert 'test_total{outcome="success"} 1' in text
+        assert "test_depth 3" in text
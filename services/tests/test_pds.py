@@ -0,0 +1,140 @@
+from aries_cloudagent.config.injection_context import InjectionContext
+from aries_cloudagent.pdstorage_thcf.error import PDSRecordNotFoundError
+from aries_cloudagent.storage.base import BaseStorage
+from aries_cloudagent.storage.basic import BasicStorage
+from asynctest import TestCase as AsyncTestCase
+
+import asyncio
+
+from ..local_pds import LocalPDS, MemoryPDS
+from ..pds import *
+from ..tracing import TRACER
+
+
+class TestPDSBatching(AsyncTestCase):
+    async def setUp(self):
+        self.context = InjectionContext()
+        self.local = MemoryPDS()
+        self.context.injector.bind_instance(LocalPDS, self.local)
+        self.dris = [await self.local.pds_save_a({"index": i}) for i in range(3)]
+
+    async def test_load_many_coalesces_within_tick(self):
+        first, second = await asyncio.gather(
+            load_many(self.context, self.dris),
+            load_many(self.context, self.dris[:2] + self.dris[:1]),
+        )
+
+        assert first == [{"index": 0}, {"index": 1}, {"index": 2}]
+        assert second == [{"index": 0}, {"index": 1}, {"index": 0}]
+        assert self.local.calls["pds_load"] == 3
+
+    async def test_load_many_batches_per_pds(self):
+        # another storage can have another active PDS
+        other = InjectionContext()
+        other.injector.bind_instance(BaseStorage, BasicStorage())
+        other.injector.bind_instance(LocalPDS, self.local)
+
+        batches = PDS_BATCHER.stats["batches"]
+        await asyncio.gather(
+            load_many(self.context, self.dris[:1]), load_many(other, self.dris[:1])
+        )
+        assert PDS_BATCHER.stats["batches"] == batches + 2
+        assert self.local.calls["pds_load"] == 2
+
+    async def test_load_many_errors(self):
+        result = await load_many(
+            self.context, [self.dris[0], "missing"], return_exceptions=True
+        )
+        assert result[0] == {"index": 0}
+        assert isinstance(result[1], PDSRecordNotFoundError)
+
+        with self.assertRaises(PDSRecordNotFoundError):
+            await load_many(self.context, ["missing"])
+
+    async def test_save_and_link_many(self):
+        dris = await save_many(
+            self.context, [({"a": 1}, {"table": "t"}), ({"b": 2}, {"table": "t"})]
+        )
+        assert len(await self.local.load_multiple(table="t")) == 2
+
+        await link_many(self.context, [(dris[0], dris[1])])
+        assert self.local.links_from(dris[0]) == [dris[1]]
+
+    async def test_spans_of_concurrent_calls(self):
+        TRACER.configure({"verifiable_services.tracing": "memory"})
+        try:
+            async with TRACER.span("apply", exchange_id="exchange") as apply:
+                dris = await save_many(
+                    self.context, [({"a": 1}, {"table": "t"}), ({"b": 2}, {})]
+                )
+                await link_many(self.context, [(dris[0], dris[1])])
+                await load_many(self.context, self.dris[:2])
+            spans = TRACER.exporter.find("exchange")
+        finally:
+            TRACER.configure({})
+
+        children = [span for span in spans if span["spanId"] != apply.span_id]
+        assert sorted(span["name"] for span in children) == [
+            "pds.pds_link_dri",
+            "pds.pds_load",
+            "pds.pds_load",
+            "pds.pds_save_a",
+            "pds.pds_save_a",
+        ]
+        assert all(span["parentSpanId"] == apply.span_id for span in children)
+
+    async def test_link_graph(self):
+        graph = LinkGraph()
+        credential = graph.node({"credential": 1})
+        graph.link(self.dris[0], credential)
+        pointer = graph.report(credential, self.dris[1], "exchange")
+        await graph.commit(self.context)
+
+        assert self.local.links_from(self.dris[0]) == [credential.dri]
+        assert self.local.links_from(credential.dri) == [pointer.dri]
+        assert self.local.links_from(pointer.dri) == [self.dris[1]]
+        assert await self.local.pds_load(pointer.dri) == {"dri": self.dris[1]}
+
+    async def test_certificate_delta(self):
+        template_dri = self.dris[0]
+        dri = await self.local.pds_save_a(
+            certificate_delta(template_dri, {"associatedReportID": "exchange"})
+        )
+
+        certificate = await certificate_load(self.context, dri)
+        assert certificate == {"index": 0, "associatedReportID": "exchange"}
+        assert await certificate_load(self.context, self.dris[1]) == {"index": 1}
+
+    async def test_active_pds_metadata_cached(self):
+        ACTIVE_PDS.invalidate()
+        names = await asyncio.gather(
+            pds_get_active_name(self.context), pds_get_active_name(self.context)
+        )
+        assert names == [self.local.NAME, self.local.NAME]
+        assert await pds_get_active_name(self.context) == self.local.NAME
+
+        self.local.NAME = "changed"
+        assert await pds_get_active_name(self.context) != "changed"
+        ACTIVE_PDS.invalidate()
+        assert await pds_get_active_name(self.context) == "changed"
+
+    async def test_concurrency_cap(self):
+        in_flight = []
+        peak = []
+        load = self.local.pds_load
+
+        async def slow_load(dri):
+            in_flight.append(dri)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(dri)
+            return await load(dri)
+
+        self.local.pds_load = slow_load
+        PDS_BATCHER.configure({"verifiable_services.pds_max_concurrency": 2})
+        try:
+            await load_many(self.context, self.dris)
+        finally:
+            PDS_BATCHER.configure({"verifiable_services.pds_max_concurrency": 32})
+
+        assert max(peak) == 2
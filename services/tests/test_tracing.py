@@ -0,0 +1,65 @@
+from asynctest import TestCase as AsyncTestCase
+
+import json
+import os
+import tempfile
+
+from ..tracing import *
+
+
+class TestTracing(AsyncTestCase):
+    def setUp(self):
+        TRACER.configure({"verifiable_services.tracing": "memory"})
+
+    def tearDown(self):
+        TRACER.configure({})
+
+    async def test_spans_of_exchange_share_trace(self):
+        async with TRACER.span("apply", exchange_id="exchange"):
+            async with TRACER.span("pds.pds_save_a"):
+                pass
+        async with TRACER.span("process_application", exchange_id="exchange"):
+            pass
+        async with TRACER.span("apply", exchange_id="other"):
+            pass
+
+        spans = TRACER.exporter.find("exchange")
+        assert [span["name"] for span in spans] == [
+            "pds.pds_save_a",
+            "apply",
+            "process_application",
+        ]
+        assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+        assert spans[1]["parentSpanId"] == ""
+        assert spans[0]["traceId"] == trace_id_for_exchange("exchange")
+
+        otlp = TRACER.exporter.to_otlp("exchange")
+        otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert len(otlp_spans) == 3
+        assert {"key": "exchange_id", "value": {"stringValue": "exchange"}} in (
+            otlp_spans[1]["attributes"]
+        )
+
+    async def test_no_span_outside_of_exchange(self):
+        async with TRACER.span("pds.pds_load"):
+            pass
+        assert TRACER.exporter.find() == []
+
+    async def test_error_status(self):
+        with self.assertRaises(ValueError):
+            async with TRACER.span("apply", exchange_id="exchange"):
+                raise ValueError("bad")
+
+        span = TRACER.exporter.find("exchange")[0]
+        assert span["status"]["code"] == STATUS_ERROR
+
+    async def test_json_lines_exporter(self):
+        path = os.path.join(tempfile.mkdtemp(), "spans.jsonl")
+        TRACER.configure({"verifiable_services.tracing": "jsonl:" + path})
+        async with TRACER.span("apply", exchange_id="exchange"):
+            pass
+        TRACER.configure({})
+
+        with open(path) as file:
+            spans = [json.loads(line) for line in file]
+        assert spans[0]["name"] == "apply"
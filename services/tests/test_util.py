@@ -0,0 +1,51 @@
+from asynctest import TestCase as AsyncTestCase
+from marshmallow import fields
+
+from ..util import generate_model_schema, compile_init, generic_init
+
+
+SCHEMA = {
+    "exchange_id": fields.Str(required=True),
+    "state": fields.Str(required=True),
+}
+
+# the schemas are looked up by name in the module of the model
+CompiledMessage, CompiledMessageSchema = generate_model_schema(
+    name="CompiledMessage",
+    handler="services.issue.handlers.ConfirmationHandler",
+    msg_type="did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/test/1.0/test",
+    schema=SCHEMA,
+)
+GenericMessage, GenericMessageSchema = generate_model_schema(
+    name="GenericMessage",
+    handler="services.issue.handlers.ConfirmationHandler",
+    msg_type="did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/test/1.0/test",
+    schema=SCHEMA,
+    init=generic_init,
+)
+
+
+class TestGenerateModelSchema(AsyncTestCase):
+    def test_compiled_init(self):
+        assert CompiledMessage.__init__ is not generic_init
+
+        message = CompiledMessage(exchange_id="1234", _id="abcd")
+        assert message.exchange_id == "1234"
+        assert message.state is None
+        assert message._id == "abcd"
+
+    def test_compiled_init_matches_generic_init(self):
+        compiled = CompiledMessage(exchange_id="1234", state="pending", _id="abcd")
+        generic = GenericMessage(exchange_id="1234", state="pending", _id="abcd")
+        assert compiled.serialize() == generic.serialize()
+
+    def test_round_trip(self):
+        message = CompiledMessage(exchange_id="1234", state="pending")
+        result = CompiledMessage.deserialize(message.serialize())
+        assert result.exchange_id == "1234"
+        assert result.state == "pending"
+
+    def test_fallback_to_generic_init(self):
+        assert compile_init("Test", ["self"]) is generic_init
+        assert compile_init("Test", ["class"]) is generic_init
+        assert compile_init("Test", ["not-valid"]) is generic_init
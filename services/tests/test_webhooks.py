@@ -0,0 +1,64 @@
+from aries_cloudagent.messaging.responder import MockResponder
+from asynctest import TestCase as AsyncTestCase
+
+from ..webhooks import WebhookQueue
+
+
+class FailingResponder(MockResponder):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    async def send_webhook(self, topic, payload):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("controller is down")
+        await super().send_webhook(topic, payload)
+
+
+class TestWebhookQueue(AsyncTestCase):
+    topic = "verifiable-services/issue-state-update"
+    payload = {"state": "pending"}
+
+    async def test_enqueue_and_deliver(self):
+        queue = WebhookQueue()
+        responder = MockResponder()
+
+        assert queue.enqueue(responder, self.topic, self.payload)
+        await queue.join()
+
+        assert responder.webhooks == [(self.topic, self.payload)]
+        assert queue.stats["enqueued"] == 1
+        assert queue.stats["sent"] == 1
+
+    async def test_overflow_is_dropped(self):
+        queue = WebhookQueue(max_size=1)
+        responder = MockResponder()
+
+        assert queue.enqueue(responder, self.topic, self.payload)
+        assert not queue.enqueue(responder, self.topic, self.payload)
+        await queue.join()
+
+        assert len(responder.webhooks) == 1
+        assert queue.stats["dropped"] == 1
+
+    async def test_retry_with_backoff(self):
+        queue = WebhookQueue(max_retries=2, backoff=0.01)
+        responder = FailingResponder(failures=2)
+
+        queue.enqueue(responder, self.topic, self.payload)
+        await queue.join()
+
+        assert len(responder.webhooks) == 1
+        assert queue.stats["retried"] == 2
+        assert queue.stats["failed"] == 0
+
+    async def test_give_up_after_retries(self):
+        queue = WebhookQueue(max_retries=1, backoff=0.01)
+        responder = FailingResponder(failures=5)
+
+        queue.enqueue(responder, self.topic, self.payload)
+        await queue.join()
+
+        assert responder.webhooks == []
+        assert queue.stats["failed"] == 1
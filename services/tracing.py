@@ -0,0 +1,308 @@
+"""
+Optional span instrumentation of service exchanges.
+
+Spans share a trace id derived from the exchange_id, so every step of one
+exchange (apply, ApplicationHandler, process_application,
+ApplicationResponseHandler) ends up in the same trace. Calls made while a
+span is active (PDS, storage, credential issuance, outbound sends) become
+its children. Spans are written to a JSON lines file or kept in memory
+and served in OTLP JSON form by the traces admin route.
+
+Tracing is off unless verifiable_services.tracing is set to "memory" or
+to "jsonl:<path>".
+"""
+from aiohttp import web
+from aiohttp_apispec import docs, querystring_schema
+from marshmallow import fields, Schema
+
+from collections import deque
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+import weakref
+
+from .settings import get_setting
+
+LOGGER = logging.getLogger(__name__)
+
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+
+def trace_id_for_exchange(exchange_id: str) -> str:
+    return hashlib.sha256(str(exchange_id).encode("UTF-8")).hexdigest()[:32]
+
+
+def now_ns() -> int:
+    if hasattr(time, "time_ns"):
+        return time.time_ns()
+    return int(time.time() * 1e9)
+
+
+def current_task():
+    try:
+        return asyncio.current_task()
+    except AttributeError:
+        return asyncio.Task.current_task()
+    except RuntimeError:
+        return None
+
+
+class JsonLinesExporter:
+    """Appends every finished span as a line of JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", buffering=1)
+
+    def export(self, span: dict):
+        self.file.write(json.dumps(span, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class InMemoryCollector:
+    """Keeps the last max_spans spans, serves them in OTLP JSON form"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span: dict):
+        self.spans.append(span)
+
+    def find(self, exchange_id: str = None) -> list:
+        if exchange_id is None:
+            return list(self.spans)
+        trace_id = trace_id_for_exchange(exchange_id)
+        return [span for span in self.spans if span["traceId"] == trace_id]
+
+    def to_otlp(self, exchange_id: str = None) -> dict:
+        spans = []
+        for span in self.find(exchange_id):
+            span = dict(span)
+            span["attributes"] = [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in span["attributes"].items()
+            ]
+            spans.append(span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "verifiable-services"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "services.tracing"}, "spans": spans}
+                    ],
+                }
+            ]
+        }
+
+    def close(self):
+        pass
+
+
+class Span:
+    def __init__(self, tracer, name: str, trace_id: str, parent, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.start = None
+        self.task = None
+
+    async def __aenter__(self):
+        self.start = now_ns()
+        self.task = current_task()
+        self.tracer.push(self.task, self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        end = now_ns()
+        self.tracer.pop(self.task, self)
+        status = {"code": STATUS_OK}
+        if exc_type is not None:
+            status = {"code": STATUS_ERROR, "message": f"{exc_type.__name__}: {exc}"}
+
+        self.tracer.export(
+            {
+                "traceId": self.trace_id,
+                "spanId": self.span_id,
+                "parentSpanId": self.parent.span_id if self.parent else "",
+                "name": self.name,
+                "startTimeUnixNano": self.start,
+                "endTimeUnixNano": end,
+                "attributes": self.attributes,
+                "status": status,
+            }
+        )
+        return False
+
+
+class NoopSpan:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.exporter = None
+        # task -> stack of active spans
+        self._active = weakref.WeakKeyDictionary()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, settings):
+        target = get_setting(settings, "tracing")
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+        if not target:
+            return
+        if target == "memory":
+            self.exporter = InMemoryCollector(
+                get_setting(settings, "tracing_max_spans", 10000)
+            )
+        elif target.startswith("jsonl:"):
+            self.exporter = JsonLinesExporter(target[len("jsonl:") :])
+        else:
+            LOGGER.warning("Unknown tracing target %s, tracing stays off", target)
+
+    def active_span(self):
+        stack = self._active.get(current_task()) if self.enabled else None
+        return stack[-1] if stack else None
+
+    def push(self, task, span):
+        if task is not None:
+            self._active.setdefault(task, []).append(span)
+
+    def pop(self, task, span):
+        stack = self._active.get(task)
+        if stack and stack[-1] is span:
+            stack.pop()
+
+    async def adopt(self, parent, coroutine):
+        """
+        Awaits the coroutine with parent as its active span, the stacks are
+        kept per task so the tasks started by gather or call_soon don't see
+        the span of the caller otherwise
+        """
+        task = current_task()
+        if parent is None or task is None:
+            return await coroutine
+        self.push(task, parent)
+        try:
+            return await coroutine
+        finally:
+            self.pop(task, parent)
+
+    def export(self, span: dict):
+        try:
+            self.exporter.export(span)
+        except Exception as err:
+            LOGGER.warning("Exporting span %s failed: %s", span["name"], err)
+
+    def span(self, name: str, exchange_id: str = None, **attributes):
+        """
+        Span of a step, exchange_id starts (or joins) the trace of an
+        exchange, without it the span is a child of the active span and
+        nothing is recorded when there is none.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+
+        parent = self.active_span()
+        if exchange_id is not None:
+            trace_id = trace_id_for_exchange(exchange_id)
+            attributes["exchange_id"] = exchange_id
+            if parent is not None and parent.trace_id != trace_id:
+                parent = None
+        elif parent is not None:
+            trace_id = parent.trace_id
+        else:
+            return NOOP_SPAN
+
+        return Span(self, name, trace_id, parent, attributes)
+
+
+TRACER = Tracer()
+
+
+class traced:
+    """
+    Async context manager, runs the block inside of another context manager
+    (a metrics timer usually) and a child span of the active span
+    """
+
+    def __init__(self, name: str, inner, **attributes):
+        self.span = TRACER.span(name, **attributes)
+        self.inner = inner
+
+    async def __aenter__(self):
+        await self.span.__aenter__()
+        try:
+            return await self.inner.__aenter__()
+        except BaseException as err:
+            await self.span.__aexit__(type(err), err, err.__traceback__)
+            raise
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        try:
+            return await self.inner.__aexit__(exc_type, exc, traceback)
+        finally:
+            await self.span.__aexit__(exc_type, exc, traceback)
+
+
+def traced_handler(handle):
+    """Decorator for BaseHandler.handle, traces messages with an exchange_id"""
+
+    @functools.wraps(handle)
+    async def wrapper(self, context, responder):
+        exchange_id = getattr(context.message, "exchange_id", None)
+        if exchange_id is None:
+            return await handle(self, context, responder)
+        async with TRACER.span(type(self).__name__, exchange_id=exchange_id):
+            return await handle(self, context, responder)
+
+    return wrapper
+
+
+class TracesQuerySchema(Schema):
+    exchange_id = fields.Str(required=False)
+
+
+@docs(
+    tags=["Verifiable Services"],
+    summary="Spans kept by the in-memory collector, in OTLP JSON form",
+)
+@querystring_schema(TracesQuerySchema())
+async def get_traces(request: web.BaseRequest):
+    exporter = TRACER.exporter
+    if not isinstance(exporter, InMemoryCollector):
+        raise web.HTTPNotFound(reason="In-memory trace collector is not enabled")
+    return web.json_response(exporter.to_otlp(request.query.get("exchange_id")))
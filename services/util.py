@@ -1,14 +1,15 @@
+import keyword
 import sys
 from aiohttp import web
 
 from aries_cloudagent.storage.error import *
 from aries_cloudagent.messaging.agent_message import AgentMessage, AgentMessageSchema
-from .issue.models import ServiceIssueRecord
-from .models import ServiceRecord
 
 
 
 async def retrieve_service_issue(context, issue_id):
+    from .issue.models import ServiceIssueRecord
+
     try:
         issue: ServiceIssueRecord = await ServiceIssueRecord.retrieve_by_id(
             context, issue_id
@@ -26,6 +27,8 @@ async def retrieve_service_issue(context, issue_id):
 
 
 async def retrieve_service(context, service_id):
+    from .models import ServiceRecord
+
     try:
         service: ServiceRecord = await ServiceRecord.retrieve_by_id(context, service_id)
     except StorageNotFoundError as err:
@@ -49,6 +52,29 @@ def generic_init(instance, **kwargs):
     super(type(instance), instance).__init__(**kwargs)
 
 
+def compile_init(name: str, slots: list):
+    """
+    Build an __init__ with an explicit keyword argument for every slot,
+    so instantiation doesn't loop over slots and kwargs like generic_init.
+    Falls back to generic_init if the slots can't be argument names.
+    """
+    reserved = {"self", "kwargs", "_base_init"}
+    for slot in slots:
+        if not slot.isidentifier() or keyword.iskeyword(slot) or slot in reserved:
+            return generic_init
+
+    arguments = "".join(f"{slot}=None, " for slot in slots)
+    source = f"def __init__(self, {'*, ' if slots else ''}{arguments}**kwargs):\n"
+    source += "".join(f"    self.{slot} = {slot}\n" for slot in slots)
+    source += "    _base_init(self, **kwargs)\n"
+
+    namespace = {"_base_init": AgentMessage.__init__}
+    exec(source, namespace)
+    init = namespace["__init__"]
+    init.__qualname__ = name + ".__init__"
+    return init
+
+
 def generate_model_schema(
     name: str, handler: str, msg_type: str, schema: dict, *, init: callable = None
 ):
@@ -115,7 +141,7 @@ def generate_model_schema(
         __qualname__ = name
         __name__ = name
         __module__ = sys._getframe(2).f_globals["__name__"]
-        __init__ = init if init else generic_init
+        __init__ = init if init else compile_init(name, slots)
 
         class Meta:
             """Generated Meta."""
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+
+from .settings import get_setting
+from .metrics import REGISTRY
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WebhookQueue:
+    """
+    Bounded queue of outbound webhooks, handlers put the webhook on the queue
+    and return, a single worker delivers them to the controller in order.
+
+    When the queue is full new webhooks are dropped, failed deliveries are
+    retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 1000,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+    ):
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "dropped": 0,
+        }
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    def configure(self, settings):
+        self.max_size = get_setting(settings, "webhook_queue_size", self.max_size)
+        self.max_retries = get_setting(
+            settings, "webhook_max_retries", self.max_retries
+        )
+        self.backoff = get_setting(settings, "webhook_backoff", self.backoff)
+        self.max_backoff = get_setting(
+            settings, "webhook_max_backoff", self.max_backoff
+        )
+        # pick up the new size on the next enqueue
+        if self._queue is not None and self._queue.empty():
+            if self._worker is not None:
+                self._worker.cancel()
+            self._queue = None
+            self._worker = None
+            self._loop = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    def enqueue(self, responder, topic: str, payload: dict) -> bool:
+        """Put a webhook on the queue, returns False if it was dropped"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((responder, topic, payload))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            LOGGER.warning(
+                "Webhook queue is full (%s), dropping webhook %s", self.max_size, topic
+            )
+            return False
+
+        self.stats["enqueued"] += 1
+        return True
+
+    async def join(self):
+        """Wait until every queued webhook is delivered or given up on"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self):
+        while True:
+            responder, topic, payload = await self._queue.get()
+            try:
+                await self._deliver(responder, topic, payload)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, responder, topic, payload):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                await responder.send_webhook(topic, payload)
+                self.stats["sent"] += 1
+                return
+            except Exception as err:
+                if attempt >= self.max_retries:
+                    self.stats["failed"] += 1
+                    LOGGER.error("Webhook %s failed, giving up: %s", topic, err)
+                    return
+
+                self.stats["retried"] += 1
+                LOGGER.warning(
+                    "Webhook %s failed, retrying in %ss: %s", topic, delay, err
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+
+WEBHOOK_QUEUE = WebhookQueue()
+
+REGISTRY.gauge(
+    "verifiable_services_webhook_queue_depth",
+    "Webhooks waiting for delivery",
+    lambda: WEBHOOK_QUEUE.depth,
+)
+REGISTRY.gauge(
+    "verifiable_services_webhooks_total",
+    "Webhooks by delivery outcome",
+    lambda: dict(WEBHOOK_QUEUE.stats),
+    labelnames=("outcome",),
+    metric_type="counter",
+)
+
+
+def enqueue_webhook(responder, topic: str, payload: dict) -> bool:
+    return WEBHOOK_QUEUE.enqueue(responder, topic, payload)